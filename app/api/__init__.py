@@ -1,3 +1,4 @@
 from .auth_routes import router as auth_router
 from .movie_routes import router as movie_router
 from .user_routes import router as user_router
+from .admin_routes import router as admin_router
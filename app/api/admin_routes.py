@@ -0,0 +1,177 @@
+import logging
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import recommendation_cache
+from app.config import settings
+from app.db import engine, get_db
+from app.db.dialect import is_sqlite
+from app.db.monitoring import describe, explain, query_stats
+from app.db.indexes import get_vector_index_definition, rebuild_vector_index, rebuild_status
+from app.embedding_executor import embedding_batcher, query_batcher
+from app.movie_details import movie_detail_cache
+from app.reembed import catalog_versions, reembed_status, run_reembed
+from app.schemas import DBSyncRequest
+from app.search import query_cache, query_cache_hit_rate
+from app.sync import run_sync, source_url, sync_status
+from app.utils import embedding_version, get_current_admin, get_embedding_cache
+from app.vector_store import vector_store
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    dependencies=[Depends(get_current_admin)])
+
+logger = logging.getLogger("uvicorn.error")
+
+@router.get("/embedding-cache")
+async def get_embedding_cache_stats():
+    """
+    Report embedding cache usage: entries, hits, misses, evictions and hit ratio.
+    """
+    embedding_cache = get_embedding_cache()
+    if embedding_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **embedding_cache.stats()}
+
+@router.get("/embedding-executor")
+async def get_embedding_executor_stats():
+    """
+    Report embedding executor queue depth and micro-batch sizes.
+    """
+    return {**embedding_batcher.stats(), "queries": query_batcher.stats()}
+
+@router.get("/movie-cache")
+async def get_movie_cache_stats():
+    """
+    Report the movie detail cache: entries, bytes used against MOVIE_CACHE_MAX_BYTES, hits, misses and evictions.
+    """
+    return movie_detail_cache.stats()
+
+@router.get("/query-cache")
+async def get_query_cache_stats():
+    """
+    Report search query embedding cache entries, hits, misses, evictions and hit ratio.
+    """
+    return {
+        "entries": len(query_cache),
+        "max_entries": query_cache.max_entries,
+        "hits": query_cache.hits,
+        "misses": query_cache.misses,
+        "evictions": query_cache.evictions,
+        "hit_ratio": query_cache_hit_rate(),
+    }
+
+@router.get("/recommendation-cache")
+async def get_recommendation_cache_stats():
+    """
+    Report recommendation cache hits, misses, hit ratio and evictions.
+    """
+    return recommendation_cache.stats()
+
+@router.get("/vector-index")
+async def get_vector_index():
+    """
+    Show the configured vector index, its current definition in Postgres and the last rebuild status.
+    """
+    async with engine.connect() as conn:
+        definition = await get_vector_index_definition(conn)
+    return {
+        "type": settings.VECTOR_INDEX_TYPE,
+        "metric": settings.VECTOR_METRIC,
+        "store": vector_store.name,
+        "definition": definition,
+        "rebuild": rebuild_status,
+    }
+
+@router.post("/vector-index/rebuild", status_code=202)
+async def rebuild_index(background_tasks: BackgroundTasks):
+    """
+    Rebuild the pgvector index concurrently, e.g. after a large catalog load.
+    The rebuild runs in the background; poll GET /admin/vector-index for progress.
+    """
+    if settings.VECTOR_INDEX_TYPE == "none":
+        raise HTTPException(status_code=400, detail="VECTOR_INDEX_TYPE is none.")
+    if is_sqlite(engine):
+        raise HTTPException(status_code=400, detail="SQLite has no database vector index; search runs in process.")
+    if rebuild_status["state"] in ("queued", "running"):
+        raise HTTPException(status_code=409, detail="A rebuild is already running.")
+    rebuild_status["state"] = "queued"
+    background_tasks.add_task(rebuild_vector_index, engine)
+    return {"message": "Vector index rebuild started"}
+
+@router.post("/sync", status_code=202)
+async def start_sync(request: DBSyncRequest, background_tasks: BackgroundTasks):
+    """
+    Pull the movies table of another database (postgresql or a sqlite file) into the catalog.
+    Only new movies and movies whose text changed are re-embedded; poll GET /admin/sync for progress.
+    """
+    try:
+        source_url(request)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if sync_status["state"] in ("queued", "running"):
+        raise HTTPException(status_code=409, detail="A sync is already running.")
+    sync_status["state"] = "queued"
+    background_tasks.add_task(run_sync, request)
+    return {"message": "Catalog sync started"}
+
+@router.get("/sync")
+async def get_sync_status():
+    """
+    Report the last catalog sync: rows scanned, new / updated / unchanged, embedded and rows per second.
+    """
+    return sync_status
+
+@router.get("/reembed")
+async def get_reembed_status(db: AsyncSession = Depends(get_db)):
+    """
+    Show the embedding version new vectors get, how many movies are stored at each version,
+    and the last re-embedding job.
+    """
+    return {
+        "version": embedding_version(),
+        "catalog": await catalog_versions(db),
+        "job": reembed_status,
+    }
+
+@router.post("/reembed", status_code=202)
+async def start_reembed(background_tasks: BackgroundTasks):
+    """
+    Re-embed movies stored at another embedding version into a shadow column, then switch
+    every movie to its new vector in one transaction and recompute user tastes. Re-posting after
+    a crash resumes from the last batch; poll GET /admin/reembed for progress.
+    """
+    if reembed_status["state"] in ("queued", "running", "switching"):
+        raise HTTPException(status_code=409, detail="Re-embedding is already running.")
+    reembed_status["state"] = "queued"
+    background_tasks.add_task(run_reembed)
+    return {"message": "Re-embedding started"}
+
+@router.get("/db")
+async def get_db_stats(
+    explain_plans: bool = Query(False, alias="explain", description="Re-run captured SELECTs under EXPLAIN (ANALYZE, BUFFERS)"),
+    limit: int = Query(20, ge=1, le=1000, description="Max slow queries to return, newest first")):
+    """
+    Report pool status, statement timing, pool checkout wait and the slow-query log
+    (statements over SLOW_QUERY_MS, with their parameters shortened).
+    With **explain**=true each returned SELECT is executed again to attach its plan.
+    """
+    entries = query_stats.recent_slow()[:limit]
+    slow = [describe(entry) for entry in entries]
+    if explain_plans:
+        for entry, shown in zip(entries, slow):
+            try:
+                async with engine.connect() as conn:
+                    shown["plan"] = await explain(conn, entry)
+            except Exception as e:
+                shown["plan_error"] = str(e)
+    return {"pool": engine.pool.status(), **query_stats.stats(), "slow_query_log": slow}
+
+@router.post("/db/reset", status_code=204)
+async def reset_db_stats():
+    """
+    Clear statement and pool timing counters and the slow-query log.
+    """
+    query_stats.reset()
@@ -1,16 +1,28 @@
+import json
 import logging
 from uuid import UUID
 
 import numpy as np
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select, text
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import get_db, Movie as MovieTable
 from app.schemas import *
-from app.recommendation import recommend
-from app.utils import get_current_admin, vectorize
+from app.recommendation import HYBRID_SOURCES, recommend, recommend_batch
+from app.facet_index import ensure_facet_index, facet_index
+from app.search import search_movies
+from app.serialization import MOVIE_FIELDS, VECTOR_ENCODINGS, dumps, parse_fields, project_rows
+from app.movie_details import etag_matches, invalidate_details, movie_details
+from app.pagination import LOOKUP_ORDERS, InvalidCursor, encode_cursor, keyset_lookup
+from app.cache import recommendation_cache
+from app.config import settings
+from app.embedding_executor import embedding_batcher
+from app.utils import embedding_version, get_current_admin, movie_content_hash
+from app.vector_index import vector_index
+from app.vector_store import vector_store
 
 logger = logging.getLogger("uvicorn.error")
  
@@ -24,6 +36,7 @@ router = APIRouter(
 @router.post("/recommend", response_model=List[MovieLite])
 async def get_recommendations(
     request: MovieRecommendationRequest, 
+    response: Response,
     db: AsyncSession = Depends(get_db), 
     limit: int = Query(10, ge=1, le=100),
     by: str = Query("content", description="Recommendation method: content, latest, popularity, user_based, hybrid")):
@@ -33,8 +46,11 @@ async def get_recommendations(
     - **liked_movie_ids**: List of UUIDs for movies the user liked.
     - **limit**: Max number of recommendations to return (default 10, max 100).
     - **by**: Recommendation method: "content", "latest", "popularity", "user_based", or "hybrid" (default "content").
+    - **weights**: Hybrid only. Per-source weights for "content", "popularity" and "cooccurrence"; unset sources use HYBRID_WEIGHT_*.
+    - **fusion**: Hybrid only. "rrf" (reciprocal rank) or "weighted" (normalized scores); defaults to HYBRID_FUSION.
 
     Returns a list of recommended movies based on the selected method.
+    Hybrid responses carry a Server-Timing header with per-source latencies.
     Raises errors for invalid input or no recommendations found.
     """
 
@@ -47,8 +63,28 @@ async def get_recommendations(
     except ValueError as ve:
         logger.warning(f"Invalid UUID in request: {request.liked_movie_ids}")
         raise HTTPException(status_code=422, detail="All liked_movie_ids must be valid UUIDs.")
+    if request.weights and (set(request.weights) - set(HYBRID_SOURCES) or min(request.weights.values()) < 0):
+        raise HTTPException(status_code=422, detail=f"weights must be non-negative and keyed by {', '.join(HYBRID_SOURCES)}.")
+    if request.fusion not in (None, "rrf", "weighted"):
+        raise HTTPException(status_code=422, detail='fusion must be "rrf" or "weighted".')
+    variant = ""
+    if by == "hybrid" and (request.weights or request.fusion):
+        variant = f":{request.fusion or ''}:{sorted((request.weights or {}).items())}"
+
     try:
-        recommendations = await recommend(valid_ids, db, limit, by=by)
+        timings = {}
+        cache_key = await recommendation_cache.key(valid_ids, by, limit, variant)
+        recommendations = await recommendation_cache.get(cache_key)
+        if recommendations is None:
+            recommendations = await recommend(
+                valid_ids, db, limit, by=by, weights=request.weights, fusion=request.fusion, timings=timings
+            )
+            if recommendations:
+                await recommendation_cache.set(cache_key, recommendations)
+        else:
+            response.headers["Server-Timing"] = "cache;desc=hit"
+        if timings:
+            response.headers["Server-Timing"] = ", ".join(f"{name};dur={ms:.1f}" for name, ms in timings.items())
         if not recommendations:
             raise HTTPException(status_code=404, detail="No recommendations found for provided movies.")
         return recommendations
@@ -59,87 +95,241 @@ async def get_recommendations(
         raise HTTPException(status_code=500, detail="Internal server error while generating recommendations.")
 
 
-@router.get("/movies", response_model=List[Movie])
-async def list_movies(
-    genre: str | None = Query(None, description="Filter by genre"),
+@router.post("/recommend/batch")
+async def get_batch_recommendations(
+    request: BatchRecommendationRequest,
+    db: AsyncSession = Depends(get_db),
+    limit: int = Query(10, ge=1, le=100)):
+    """
+    Recommend movies for many users in one call.
+
+    - **entries**: List of objects with either **user_id** (likes are read from the database) or **liked_movie_ids**.
+    - **limit**: Max number of recommendations per entry (default 10, max 100).
+
+    Streams NDJSON: one line per entry, in input order, with **index**, **user_id** and **recommendations**.
+    Entries without usable liked movies get an empty list and an **error** message.
+    """
+
+    if not request.entries:
+        raise HTTPException(status_code=400, detail="entries must be a non-empty list.")
+    if len(request.entries) > settings.BATCH_RECOMMEND_MAX_ENTRIES:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BATCH_RECOMMEND_MAX_ENTRIES} entries per batch.")
+    if any(entry.user_id is None and entry.liked_movie_ids is None for entry in request.entries):
+        raise HTTPException(status_code=422, detail="Each entry needs user_id or liked_movie_ids.")
+
+    async def lines():
+        async for item in recommend_batch(request.entries, db, limit):
+            yield json.dumps(item, default=str) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+async def movie_filters(
+    genre: List[str] = Query([], description="Filter by genre (repeatable)"),
+    tag: List[str] = Query([], description="Filter by tag (repeatable)"),
+    actor: List[str] = Query([], description="Filter by actor (repeatable)"),
+    director: List[str] = Query([], description="Filter by director (repeatable)"),
+    match: str = Query("all", description="Combine repeated values of one filter with all (AND) or any (OR)"),
     year: int | None = Query(None, description="Filter by release year"),
-    tag: str | None = Query(None, description="Filter by tag"),
+    year_min: int | None = Query(None, description="Earliest release year"),
+    year_max: int | None = Query(None, description="Latest release year"),
+) -> dict:
+    if match not in ("all", "any"):
+        raise HTTPException(status_code=422, detail='match must be "all" or "any".')
+    if year is not None:
+        year_min = year_max = year
+    return {
+        "filters": {"genres": genre, "tags": tag, "actors": actor, "director": director},
+        "match": match,
+        "year_min": year_min,
+        "year_max": year_max,
+    }
+
+@router.get("/movies")
+async def list_movies(
+    filters: dict = Depends(movie_filters),
     limit: int = Query(50, gt=0, le=100, description="Max number of movies to return"),
+    fields: Optional[List[str]] = Query(None, description=f"Fields to return (repeat or comma-separate): {', '.join(MOVIE_FIELDS)}"),
+    vector_encoding: str = Query("f32", description="float (JSON array), f32 or f16 (base64 little-endian)"),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Get movies filtered by genre, year, and tags with a limit.
+    Get movies filtered by genre, tag, actor, director and release year, with a limit.
+
+    Filters are answered from the in-process facet index. Repeated values of one filter are
+    combined with **match** (all/any); different filters always narrow the result.
+
+    **fields** selects the returned (and queried) columns; `id` is always included and `vector`
+    only when requested, encoded per **vector_encoding**.
 
     Returns a list of movies matching filters.
     Returns 404 if no movies found.
     """
     try:
-        query = select(MovieTable)
-
-        if genre:
-            query = query.where(MovieTable.genres.any(genre))
-        if year:
-            query = query.where(MovieTable.release_year == year)
-        if tag:
-            query = query.where(MovieTable.tags.any(tag))
-
-        query = query.limit(limit)
-
-        result = await db.execute(query)
-        movies = result.scalars().all()
-
-        if not movies:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if vector_encoding not in VECTOR_ENCODINGS:
+        raise HTTPException(status_code=422, detail=f"vector_encoding must be one of {', '.join(VECTOR_ENCODINGS)}.")
+    try:
+        index = await ensure_facet_index(db)
+        ids = index.filter(limit=limit, **filters)
+        if not ids:
             raise HTTPException(status_code=404, detail="No movies found.")
 
-        return movies
+        result = await db.execute(
+            select(*[getattr(MovieTable, field) for field in selected]).where(MovieTable.id.in_(ids))
+        )
+        movies = {item["id"]: item for item in project_rows(result.all(), selected, vector_encoding)}
+        return Response(dumps([movies[mid] for mid in ids if mid in movies]), media_type="application/json")
     except SQLAlchemyError:
         logger.exception("Database error while listing movies.")
         raise HTTPException(status_code=500, detail="Database error while listing movies.")
 
-@router.get("/movie", response_model=MovieBase)
+@router.get("/movies/facets")
+async def get_movie_facets(
+    filters: dict = Depends(movie_filters),
+    facet_limit: int = Query(50, ge=1, le=1000, description="Max values returned per facet"),
+    db: AsyncSession = Depends(get_db)):
+    """
+    Per-value movie counts for genres, tags, actors and director under the given filters.
+
+    Accepts the same filters as **/movies/movies**. Returns the number of matching movies as
+    **total** and, per facet, the **facet_limit** most frequent values with their counts.
+    """
+    try:
+        index = await ensure_facet_index(db)
+    except SQLAlchemyError:
+        logger.exception("Database error while building the facet index.")
+        raise HTTPException(status_code=500, detail="Database error while computing facets.")
+    mask = index.mask(**filters)
+    return {"total": int(mask.sum()), "facets": index.facets(mask, limit=facet_limit)}
+
+@router.get("/search", response_model=MovieSearchResponse)
+async def search(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=512, description="Free-text description of what to watch"),
+    filters: dict = Depends(movie_filters),
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)):
+    """
+    Semantic search: embed **q** with the catalog's embedding model and return the nearest movies.
+
+    Accepts the same genre/tag/actor/director/year filters as **/movies/movies**.
+    Query embeddings are kept in an LRU cache (QUERY_CACHE_SIZE), so repeated queries skip the model.
+    The response reports embedding and search time, whether the query embedding was cached,
+    and the cache's overall hit rate; timings are also sent as a Server-Timing header.
+    """
+    if not q.strip():
+        raise HTTPException(status_code=422, detail="q must not be blank.")
+    try:
+        result = await search_movies(q, db, limit, filters)
+    except SQLAlchemyError:
+        logger.exception("Database error during search.")
+        raise HTTPException(status_code=500, detail="Database error during search.")
+    response.headers["Server-Timing"] = (
+        f"embedding;dur={result['embedding_ms']:.1f};desc={'hit' if result['query_cache_hit'] else 'miss'}, "
+        f"search;dur={result['search_ms']:.1f}"
+    )
+    return result
+
+@router.get("/movie", response_model=MovieDetail)
 async def get_movie_by_idx(
     movie_id: UUID = Query(...), 
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db)):
     """
     Retrieve detailed info for a movie by its UUID.
 
     - **movie_id**: UUID of the requested movie.
 
+    Responses carry a strong **ETag**; a request whose **If-None-Match** matches it gets 304.
+    Payloads are cached in process (MOVIE_CACHE_MAX_BYTES), so cached movies and 304s skip the database.
+
     Returns the movie details or 404 if not found.
     """
 
     try:
-        query = text("""
-            SELECT id, title, description, genres, tags, release_year, director, actors 
-            FROM movies 
-            WHERE id = :id
-        """)
-        result = (await db.execute(query, {"id": str(movie_id)})).first()
-        if not result:
-            raise HTTPException(status_code=404, detail="Movie not found")
-        return dict(result._mapping)
+        detail = (await movie_details([movie_id], db)).get(movie_id)
     except SQLAlchemyError as e:
         logger.exception(f"DB error fetching movie with id {movie_id}")
         raise HTTPException(status_code=500, detail="Database error")
+    if detail is None:
+        raise HTTPException(status_code=404, detail="Movie not found")
+
+    body, etag = detail
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+@router.post("/movies/batch", response_model=List[MovieDetail])
+async def get_movies_batch(
+    request: MovieBatchRequest,
+    db: AsyncSession = Depends(get_db)):
+    """
+    Details for up to MOVIE_BATCH_MAX_IDS movies in one call, e.g. for list pages.
 
-
+    Movies are returned in request order; unknown ids are skipped. Cached payloads are reused
+    and the rest are fetched with a single query.
+    """
+    if len(request.ids) > settings.MOVIE_BATCH_MAX_IDS:
+        raise HTTPException(status_code=422, detail=f"At most {settings.MOVIE_BATCH_MAX_IDS} ids per request.")
+    ids = list(dict.fromkeys(request.ids))
+    try:
+        details = await movie_details(ids, db)
+    except SQLAlchemyError:
+        logger.exception("Database error while fetching movie details.")
+        raise HTTPException(status_code=500, detail="Database error")
+    body = b"[" + b",".join(details[mid][0] for mid in ids if mid in details) + b"]"
+    return Response(body, media_type="application/json")
 
 @router.get("/movies/lookup", response_model=List[MovieLite])
 async def get_movies_lookup(
+    response: Response,
+    limit: int = Query(settings.LOOKUP_PAGE_SIZE, ge=1, le=settings.LOOKUP_MAX_PAGE_SIZE, description="Page size"),
+    cursor: str | None = Query(None, description="X-Next-Cursor value from the previous page"),
+    order: str = Query("title", description="Sort order: title (title, id) or id"),
+    stream: bool = Query(False, description="Stream every remaining row as NDJSON instead of one page"),
     db: AsyncSession = Depends(get_db)):
     """
     Get lightweight movie lookup data.
 
-    Returns a list of movies with id, title, and release year.
+    Returns a page of movies with id, title, and release year, in a stable keyset order.
+    When more rows follow, the X-Next-Cursor response header holds the cursor for the next page.
+    With **stream**=true, every row after **cursor** is streamed as NDJSON (**limit** is ignored)
+    using a server-side cursor, so memory use does not grow with the catalog.
     Used for fast lookup or selection lists.
     Returns 404 if no movies available.
     """
 
+    if order not in LOOKUP_ORDERS:
+        raise HTTPException(status_code=422, detail=f"order must be one of {', '.join(LOOKUP_ORDERS)}.")
+    try:
+        stmt = keyset_lookup(order, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if stream:
+        async def lines():
+            result = await db.stream(stmt.execution_options(yield_per=settings.LOOKUP_STREAM_BATCH_SIZE))
+            async for partition in result.partitions():
+                yield "".join(
+                    json.dumps({"id": str(mid), "title": title, "release_year": year}) + "\n"
+                    for mid, title, year in partition
+                )
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
     try:
-        result = await db.execute(select(MovieTable.id, MovieTable.title, MovieTable.release_year))
+        result = await db.execute(stmt.limit(limit + 1))
         lookup = result.all()
-        if not lookup:
+        if not lookup and cursor is None:
             raise HTTPException(status_code=404, detail="No movies available for lookup.")
+        if len(lookup) > limit:
+            lookup = lookup[:limit]
+            last = lookup[-1]
+            response.headers["X-Next-Cursor"] = encode_cursor(order, last.id, last.title)
         return lookup
     except SQLAlchemyError as e:
         logger.exception("Error fetching movie lookup data.")
@@ -164,11 +354,25 @@ async def create_movie(
         if not movie.title or not movie.description:
             raise HTTPException(status_code=400, detail="Title and description are required.")
         
-        vector = vectorize(movie)
-        db_movie = MovieTable(**movie.model_dump(), vector=vector)
+        vector = await embedding_batcher.embed(movie)
+        db_movie = MovieTable(
+            **movie.model_dump(),
+            vector=vector,
+            content_hash=movie_content_hash(movie),
+            embedding_version=embedding_version(),
+        )
         db.add(db_movie)
         await db.commit()
         await db.refresh(db_movie)
+        if settings.ANN_ENABLED:
+            vector_index.add(db_movie.id, vector)
+        vector_store.add(db_movie.id, vector)
+        invalidate_details([db_movie.id])
+        if facet_index.ready:
+            facet_index.add(
+                db_movie.id, db_movie.release_year, db_movie.genres, db_movie.tags, db_movie.actors, db_movie.director
+            )
+        await recommendation_cache.invalidate_catalog()
         return db_movie
 
     except HTTPException:
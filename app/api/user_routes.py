@@ -1,12 +1,21 @@
+import json
 import logging
+from datetime import datetime
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import get_db, UserLikedMovie, Movie as MovieTable
+from app.db import get_db, User, UserLikedMovie, Movie as MovieTable
 from app.schemas import *
+from app.cache import recommendation_cache
+from app.config import settings
+from app.cooccurrence import cooccurrence_index, liked_movie_ids
+from app.ingest import IngestReport, ingest_batch, parse_event, read_ndjson
+from app.popularity import apply_like_counts, change_like_counts, unlike_weight
+from app.recommendation import nearest_movies
+from app.taste import add_like, remove_like, rebuild_taste, taste_vector
 from app.utils import get_current_admin
 logger = logging.getLogger("uvicorn.error")
 
@@ -16,6 +25,53 @@ router = APIRouter(
     dependencies=[Depends(get_current_admin)])
 
 
+async def get_or_create_user(session: AsyncSession, user_id: UUID) -> User:
+    """Load the user row locked for update, creating it on first use."""
+    user = await session.get(User, user_id, with_for_update=True)
+    if user is None:
+        user = User(id=user_id, taste_count=0, taste_decayed_weight=0.0)
+        session.add(user)
+    return user
+
+
+@router.post("/likes/bulk")
+async def ingest_likes(request: Request, session: AsyncSession = Depends(get_db)):
+    """
+    Bulk-apply like/unlike events for many users.
+    Request body: NDJSON (Content-Type application/x-ndjson) or a JSON array of objects with
+    user_id, movie_id, action ("like" or "unlike", default "like") and an optional timestamp.
+    Missing users are created. Events are idempotent: re-sent likes and unlikes of absent likes
+    count as duplicates. Invalid events and unknown movies are rejected without failing the batch.
+    Returns accepted/liked/unliked/duplicate/rejected counts and the first few errors.
+    """
+
+    report = IngestReport()
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        events = read_ndjson(request.stream(), report)
+    else:
+        try:
+            body = json.loads(await request.body())
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON.")
+        if not isinstance(body, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON.")
+
+        async def array_events():
+            for line, raw in enumerate(body, start=1):
+                event = parse_event(raw, line, report)
+                if event is not None:
+                    yield line, event
+        events = array_events()
+
+    batch = []
+    async for item in events:
+        batch.append(item)
+        if len(batch) >= settings.INGEST_BATCH_SIZE:
+            await ingest_batch(session, batch, report)
+            batch = []
+    if batch:
+        await ingest_batch(session, batch, report)
+    return report.as_dict()
 
 @router.post("/{user_id}/likes", status_code=201)
 async def add_liked_movie(
@@ -37,9 +93,17 @@ async def add_liked_movie(
     exists = await session.get(UserLikedMovie, (user_id, movie_id))
     if exists:
         raise HTTPException(status_code=400, detail="Movie already liked")
-    liked = UserLikedMovie(user_id=user_id, movie_id=movie_id)
+    user = await get_or_create_user(session, user_id)
+    other_liked = await liked_movie_ids(session, user_id) if cooccurrence_index.ready else []
+    liked = UserLikedMovie(user_id=user_id, movie_id=movie_id, liked_at=datetime.utcnow())
+    add_like(user, movie.vector, liked.liked_at)
     session.add(liked)
+    counts = await change_like_counts(session, [movie_id], +1)
     await session.commit()
+    apply_like_counts(counts, +1)
+    if cooccurrence_index.ready:
+        cooccurrence_index.add_like(user_id, other_liked, movie_id)
+    await recommendation_cache.invalidate_likes()
     return {"message": "Movie liked"}
 
 @router.delete("/{user_id}/likes/{movie_id}", status_code=204)
@@ -56,8 +120,18 @@ async def remove_liked_movie(
     liked = await session.get(UserLikedMovie, (user_id, movie_id))
     if not liked:
         raise HTTPException(status_code=404, detail="Liked movie not found")
+    user = await session.get(User, user_id, with_for_update=True)
+    movie = await session.get(MovieTable, movie_id)
+    if user is not None and movie is not None:
+        remove_like(user, movie.vector, liked.liked_at)
     await session.delete(liked)
+    weight = unlike_weight(liked.liked_at)
+    counts = await change_like_counts(session, [movie_id], -1, -weight)
     await session.commit()
+    apply_like_counts(counts, -weight)
+    if cooccurrence_index.ready:
+        cooccurrence_index.remove_like(user_id, await liked_movie_ids(session, user_id), movie_id)
+    await recommendation_cache.invalidate_likes()
 
 @router.get("/{user_id}/likes", response_model=List[UUID])
 async def list_liked_movies(user_id: UUID, session: AsyncSession = Depends(get_db)):
@@ -77,12 +151,52 @@ async def update_liked_movies(user_id: UUID, movie_ids: List[UUID], session: Asy
     Request body: JSON array of movie IDs (UUID).
     Returns confirmation message.
     """
-    # Delete existing
-    await session.execute(
-        UserLikedMovie.__table__.delete().where(UserLikedMovie.user_id == user_id)
+    movie_ids = list(dict.fromkeys(movie_ids))
+    user = await get_or_create_user(session, user_id)
+    result = await session.execute(
+        select(UserLikedMovie.movie_id, UserLikedMovie.liked_at).where(UserLikedMovie.user_id == user_id)
     )
-    # Add new liked movies
-    liked_list = [UserLikedMovie(user_id=user_id, movie_id=mid) for mid in movie_ids]
-    session.add_all(liked_list)
+    liked_at = dict(result.all())
+    old_liked = list(liked_at)
+    # Kept likes keep their row and liked_at; only the difference is written.
+    removed = {mid: -unlike_weight(liked_at[mid]) for mid in set(old_liked) - set(movie_ids)}
+    added = [mid for mid in movie_ids if mid not in liked_at]
+    if removed:
+        await session.execute(
+            UserLikedMovie.__table__.delete()
+            .where(UserLikedMovie.user_id == user_id, UserLikedMovie.movie_id.in_(list(removed)))
+        )
+    now = datetime.utcnow()
+    session.add_all(UserLikedMovie(user_id=user_id, movie_id=mid, liked_at=now) for mid in added)
+    await session.flush()
+    await rebuild_taste(session, user)
+    removed_counts = await change_like_counts(session, list(removed), -1, removed)
+    added_counts = await change_like_counts(session, added, +1)
     await session.commit()
-    return {"message": "Liked movies updated"}
\ No newline at end of file
+    apply_like_counts(removed_counts, -1)
+    apply_like_counts(added_counts, +1)
+    if cooccurrence_index.ready:
+        cooccurrence_index.replace_likes(user_id, old_liked, movie_ids)
+    await recommendation_cache.invalidate_likes()
+    return {"message": "Liked movies updated"}
+
+@router.get("/{user_id}/recommendations", response_model=List[MovieLite])
+async def get_user_recommendations(
+    user_id: UUID,
+    limit: int = Query(10, ge=1, le=100),
+    decayed: bool = Query(False, description="Weight recent likes more (see TASTE_DECAY_HALF_LIFE_DAYS)"),
+    session: AsyncSession = Depends(get_db)):
+    """
+    Content recommendations from the user's stored taste vector.
+    Excludes movies the user already liked.
+    Returns 404 if the user has no likes with vectors.
+    """
+
+    user = await session.get(User, user_id)
+    vector = taste_vector(user, decayed=decayed) if user else None
+    if vector is None:
+        raise HTTPException(status_code=404, detail="No taste vector for this user.")
+    recommendations = await nearest_movies(vector, session, limit, exclude_user_id=user_id)
+    if not recommendations:
+        raise HTTPException(status_code=404, detail="No recommendations found.")
+    return recommendations
@@ -0,0 +1,267 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+from app.config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class TTLCache:
+    """
+    Thread-safe in-process LRU cache with an optional per-entry time to live.
+
+    With `max_bytes`, entries are also evicted (least recently used first) to keep the sum of
+    `sizeof(value)` under that budget. Counts hits, misses and evictions (LRU evictions plus
+    expired entries).
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = len,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            value, expires_at, size = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                self.bytes -= size
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl else None
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._data[key] = (value, expires_at, size)
+            self.bytes += size
+            while len(self._data) > self.max_entries or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                _, (_, _, evicted) = self._data.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            **({"bytes": self.bytes, "max_bytes": self.max_bytes} if self.max_bytes is not None else {}),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class MemoryBackend:
+    """Per-process backend built on TTLCache."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.cache = TTLCache(max_entries, ttl_seconds)
+        self._counters = {}
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self.cache.get(key)
+
+    async def set(self, key: str, value: Any):
+        self.cache.set(key, value)
+
+    async def get_counter(self, name: str) -> int:
+        return self._counters.get(name, 0)
+
+    async def incr(self, name: str) -> int:
+        self._counters[name] = self._counters.get(name, 0) + 1
+        return self._counters[name]
+
+    def stats(self) -> dict:
+        return {"evictions": self.cache.evictions, "entries": len(self.cache)}
+
+
+class RedisBackend:
+    """
+    Shared backend so all workers see the same entries and invalidations.
+
+    Entries expire through Redis TTLs; LRU bounds come from the server's maxmemory policy.
+    Requires the optional `redis` package.
+    """
+
+    def __init__(self, url: str, ttl_seconds: float, prefix: str = "recapi:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("REC_CACHE_BACKEND=redis requires the `redis` package.") from e
+        self.client = redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any):
+        await self.client.set(self.prefix + key, json.dumps(value, default=str), ex=int(self.ttl_seconds))
+
+    async def get_counter(self, name: str) -> int:
+        raw = await self.client.get(self.prefix + name)
+        return int(raw) if raw is not None else 0
+
+    async def incr(self, name: str) -> int:
+        return await self.client.incr(self.prefix + name)
+
+    def stats(self) -> dict:
+        return {"evictions": None, "entries": None}
+
+
+class RecommendationCache:
+    """
+    Caches recommendation results keyed by (sorted liked ids, by, limit).
+
+    Invalidation is generation based: every key embeds the catalog generation, and keys of
+    strategies that read user_liked_movies also embed the likes generation. Bumping a
+    generation makes exactly the affected entries unreachable in O(1); they then age out
+    through the backend's TTL/LRU bounds.
+    """
+
+    LIKE_DEPENDENT = {"popularity", "user_based", "hybrid"}
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    async def key(self, liked_movie_ids: Iterable, by: str, limit: int, variant: str = "") -> str:
+        """
+        Cache key under the current generations; `variant` distinguishes results of the same
+        strategy under different options. Compute it before computing the result and pass the
+        same key to `set`, so a result computed across an invalidation is stored unreachable.
+        """
+        digest = hashlib.sha1(",".join(sorted(str(mid) for mid in liked_movie_ids)).encode()).hexdigest()
+        catalog_gen = await self.backend.get_counter("gen:catalog")
+        likes_gen = await self.backend.get_counter("gen:likes") if by in self.LIKE_DEPENDENT else 0
+        return f"rec:{catalog_gen}:{likes_gen}:{by}{variant}:{limit}:{digest}"
+
+    async def get(self, key: str) -> Optional[list]:
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: list):
+        await self.backend.set(key, value)
+
+    async def invalidate_likes(self):
+        """Call after any change to user_liked_movies."""
+        await self.backend.incr("gen:likes")
+
+    async def invalidate_catalog(self):
+        """Call after any change to the movies table."""
+        await self.backend.incr("gen:catalog")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            **self.backend.stats(),
+        }
+
+
+class NullRecommendationCache:
+    """Used when REC_CACHE_BACKEND is "none"."""
+
+    async def key(self, *args) -> str:
+        return ""
+
+    async def get(self, key: str) -> None:
+        return None
+
+    async def set(self, key: str, value: list):
+        pass
+
+    async def invalidate_likes(self):
+        pass
+
+    async def invalidate_catalog(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": None}
+
+
+def check_cache_backend(workers: int) -> bool:
+    """
+    Warn when several worker processes each keep their own memory cache: a like or catalog
+    change handled by one worker does not invalidate the others, which serve stale
+    recommendations until REC_CACHE_TTL_SECONDS. Returns False in that case.
+    """
+    if workers > 1 and settings.REC_CACHE_BACKEND == "memory":
+        logger.warning(
+            f"REC_CACHE_BACKEND=memory with {workers} workers: invalidation is per process, so other workers "
+            f"may serve stale recommendations for up to {settings.REC_CACHE_TTL_SECONDS}s. Use REC_CACHE_BACKEND=redis."
+        )
+        return False
+    return True
+
+
+def make_recommendation_cache():
+    backend = settings.REC_CACHE_BACKEND
+    if backend == "none":
+        return NullRecommendationCache()
+    if backend == "redis":
+        return RecommendationCache(RedisBackend(settings.REDIS_URL, settings.REC_CACHE_TTL_SECONDS))
+    if backend == "memory":
+        return RecommendationCache(MemoryBackend(settings.REC_CACHE_MAX_ENTRIES, settings.REC_CACHE_TTL_SECONDS))
+    raise ValueError(f"Unknown REC_CACHE_BACKEND {backend!r}")
+
+
+recommendation_cache = make_recommendation_cache()
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import UserLikedMovie
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class CooccurrenceIndex:
+    """
+    Item-item co-like counts: entry (i, j) is the number of users who liked both movies,
+    and the diagonal holds each movie's like count.
+
+    The bulk of the counts lives in a compacted CSR matrix built from user_liked_movies.
+    Like/unlike/replace events are applied as +1/-1 pair updates to a small per-row delta,
+    which `compact()` periodically folds into the CSR matrix. Scoring a liked set sums
+    the liked rows (CSR rows plus their deltas) into one dense vector over all movies.
+
+    A rebuild reads the database while events keep arriving. Between `begin_rebuild()` and the
+    swap in `build()`, each event also records the user's new like set; after the swap every
+    such user is moved from their state in the snapshot to that set, so events the snapshot
+    missed are applied once and events it already contains are not counted twice.
+    """
+
+    def __init__(self, normalize: str = "none"):
+        self.normalize = normalize
+        self.ids: List[UUID] = []
+        self.row_of: Dict[UUID, int] = {}
+        self.base = sp.csr_matrix((0, 0), dtype=np.float32)
+        self.delta: Dict[int, Counter] = defaultdict(Counter)
+        self.ready = False
+        self._journal: Optional[Dict[UUID, set]] = None
+        self._lock = threading.Lock()
+
+    def begin_rebuild(self):
+        """Start recording events; call before reading the likes passed to `build`."""
+        with self._lock:
+            self._journal = {}
+
+    def abort_rebuild(self):
+        with self._lock:
+            self._journal = None
+
+    def _record(self, user_id: UUID, liked: Iterable[UUID]):
+        if self._journal is not None:
+            self._journal[user_id] = set(liked)
+
+    def build(self, likes: Iterable[Tuple[UUID, UUID]]):
+        """Rebuild from (user_id, movie_id) pairs as C = U^T U, U the binary user x movie matrix."""
+        user_rows: Dict[UUID, int] = {}
+        ids: List[UUID] = []
+        row_of: Dict[UUID, int] = {}
+        rows, cols = [], []
+        for user_id, movie_id in likes:
+            rows.append(user_rows.setdefault(user_id, len(user_rows)))
+            if movie_id not in row_of:
+                row_of[movie_id] = len(ids)
+                ids.append(movie_id)
+            cols.append(row_of[movie_id])
+        users = sp.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(len(user_rows), len(ids))
+        )
+        base = (users.T @ users).tocsr()
+        with self._lock:
+            self.ids, self.row_of, self.base = ids, row_of, base
+            self.delta = defaultdict(Counter)
+            journal, self._journal = self._journal or {}, None
+            for user_id, liked in journal.items():
+                row = user_rows.get(user_id)
+                snapshot = {ids[col] for col in users[row].indices} if row is not None else set()
+                self._replace(snapshot, liked)
+            self.ready = True
+        logger.info(f"Co-occurrence index built: {len(ids)} movies, {base.nnz} non-zero pairs")
+
+    def _row(self, movie_id: UUID) -> int:
+        row = self.row_of.get(movie_id)
+        if row is None:
+            row = self.row_of[movie_id] = len(self.ids)
+            self.ids.append(movie_id)
+        return row
+
+    def _bump(self, movies: Sequence[UUID], others: Sequence[UUID], sign: int):
+        """Add `sign` to every pair (m, o) and (o, m), plus the diagonal of each m."""
+        for movie_id in movies:
+            i = self._row(movie_id)
+            self.delta[i][i] += sign
+            for other in others:
+                if other == movie_id:
+                    continue
+                j = self._row(other)
+                self.delta[i][j] += sign
+                self.delta[j][i] += sign
+
+    def add_like(self, user_id: UUID, other_liked: Sequence[UUID], movie_id: UUID):
+        """`other_liked`: the user's likes before this one."""
+        with self._lock:
+            self._bump([movie_id], other_liked, +1)
+            self._record(user_id, [*other_liked, movie_id])
+
+    def remove_like(self, user_id: UUID, remaining_liked: Sequence[UUID], movie_id: UUID):
+        """`remaining_liked`: the user's likes after removing this one."""
+        with self._lock:
+            self._bump([movie_id], remaining_liked, -1)
+            self._record(user_id, remaining_liked)
+
+    def replace_likes(self, user_id: UUID, old: Iterable[UUID], new: Iterable[UUID]):
+        with self._lock:
+            new = set(new)
+            self._replace(set(old), new)
+            self._record(user_id, new)
+
+    def _replace(self, old: set, new: set):
+        removed, added, kept = old - new, new - old, old & new
+        # drop every pair involving a removed movie, counting removed-removed pairs once
+        removed_list = list(removed)
+        for n, movie_id in enumerate(removed_list):
+            self._bump([movie_id], list(kept) + removed_list[:n], -1)
+        added_list = list(added)
+        for n, movie_id in enumerate(added_list):
+            self._bump([movie_id], list(kept) + added_list[:n], +1)
+
+    def compact(self):
+        """Fold pending deltas into the CSR matrix."""
+        with self._lock:
+            n = len(self.ids)
+            if not self.delta and self.base.shape == (n, n):
+                return
+            rows, cols, values = [], [], []
+            for i, counter in self.delta.items():
+                for j, value in counter.items():
+                    if value:
+                        rows.append(i)
+                        cols.append(j)
+                        values.append(value)
+            base = self.base
+            if base.shape != (n, n):
+                base = sp.csr_matrix((base.data, base.indices, base.indptr), shape=(base.shape[0], n))
+                base = sp.vstack([base, sp.csr_matrix((n - base.shape[0], n), dtype=np.float32)]).tocsr()
+            update = sp.csr_matrix((np.asarray(values, dtype=np.float32), (rows, cols)), shape=(n, n))
+            merged = (base + update).tocsr()
+            merged.eliminate_zeros()
+            self.base = merged
+            self.delta = defaultdict(Counter)
+
+    def _diagonal(self) -> np.ndarray:
+        n = len(self.ids)
+        diag = np.zeros(n, dtype=np.float32)
+        base_diag = self.base.diagonal()
+        diag[:len(base_diag)] = base_diag
+        for i, counter in self.delta.items():
+            diag[i] += counter.get(i, 0)
+        return diag
+
+    def score(self, liked_movie_ids: Iterable[UUID], limit: int) -> List[Tuple[UUID, float]]:
+        """Top `limit` (movie_id, score) by summed co-like counts, excluding the liked movies."""
+        with self._lock:
+            liked_rows = [self.row_of[m] for m in liked_movie_ids if m in self.row_of]
+            if not liked_rows:
+                return []
+            n = len(self.ids)
+            scores = np.zeros(n, dtype=np.float32)
+            base_rows = [r for r in liked_rows if r < self.base.shape[0]]
+            if base_rows:
+                summed = np.asarray(self.base[base_rows].sum(axis=0)).ravel()
+                scores[:len(summed)] += summed
+            for r in liked_rows:
+                for j, value in self.delta.get(r, {}).items():
+                    scores[j] += value
+            if self.normalize == "cosine":
+                diag = self._diagonal()
+                scores = scores / np.sqrt(np.maximum(diag, 1))
+
+        scores[liked_rows] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if not len(candidates):
+            return []
+        limit = min(limit, len(candidates))
+        top = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.ids[i], float(scores[i])) for i in top]
+
+    def pending(self) -> int:
+        return sum(len(counter) for counter in self.delta.values())
+
+
+async def liked_movie_ids(session: AsyncSession, user_id: UUID) -> List[UUID]:
+    result = await session.execute(select(UserLikedMovie.movie_id).where(UserLikedMovie.user_id == user_id))
+    return list(result.scalars().all())
+
+
+async def build_cooccurrence_index(session: AsyncSession, index: Optional[CooccurrenceIndex] = None):
+    if index is None:
+        index = cooccurrence_index
+    index.begin_rebuild()
+    try:
+        result = await session.stream(select(UserLikedMovie.user_id, UserLikedMovie.movie_id))
+        likes = [(user_id, movie_id) async for user_id, movie_id in result]
+        await asyncio.to_thread(index.build, likes)
+    except BaseException:
+        index.abort_rebuild()
+        raise
+
+
+async def maintain_cooccurrence_index(session_factory, index: Optional[CooccurrenceIndex] = None):
+    """Background loop: compact deltas often, rebuild from the database now and then."""
+    if index is None:
+        index = cooccurrence_index
+    since_rebuild = 0.0
+    while True:
+        await asyncio.sleep(settings.COOCCURRENCE_COMPACT_SECONDS)
+        since_rebuild += settings.COOCCURRENCE_COMPACT_SECONDS
+        try:
+            if settings.COOCCURRENCE_REBUILD_SECONDS and since_rebuild >= settings.COOCCURRENCE_REBUILD_SECONDS:
+                async with session_factory() as session:
+                    await build_cooccurrence_index(session, index)
+                since_rebuild = 0.0
+            elif index.pending():
+                await asyncio.to_thread(index.compact)
+        except Exception:
+            logger.exception("Co-occurrence maintenance failed.")
+
+
+cooccurrence_index = CooccurrenceIndex(normalize=settings.COOCCURRENCE_NORMALIZE)
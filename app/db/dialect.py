@@ -0,0 +1,81 @@
+"""
+The few places where PostgreSQL and SQLite need different SQL or column types.
+
+PostgreSQL stores vectors with pgvector; SQLite stores them as raw float32 blobs, and
+nearest-neighbour search is done in process (see app.vector_store).
+"""
+import math
+
+import numpy as np
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import LargeBinary
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.types import TypeDecorator
+
+
+class FloatBlob(TypeDecorator):
+    """A fixed-size float32 vector stored as bytes; loads as a numpy array like pgvector does."""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, dim: int):
+        super().__init__()
+        self.dim = dim
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return np.asarray(value, dtype=np.float32).reshape(self.dim).tobytes()
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return np.frombuffer(value, dtype=np.float32).copy()
+
+
+def vector_type(dim: int):
+    return Vector(dim).with_variant(FloatBlob(dim), "sqlite")
+
+
+def dialect_name(bind) -> str:
+    """Dialect of an engine, connection or session ("postgresql", "sqlite")."""
+    if hasattr(bind, "dialect"):
+        return bind.dialect.name
+    return bind.bind.dialect.name
+
+
+def is_sqlite(bind) -> bool:
+    return dialect_name(bind) == "sqlite"
+
+
+def insert_ignore(bind, model, index_elements):
+    """`INSERT ... ON CONFLICT (index_elements) DO NOTHING` for the bind's dialect."""
+    insert = sqlite.insert if is_sqlite(bind) else postgresql.insert
+    return insert(model).on_conflict_do_nothing(index_elements=index_elements)
+
+
+def upsert(bind, model, index_elements, update_columns):
+    """`INSERT ... ON CONFLICT (index_elements) DO UPDATE` of `update_columns` for the bind's dialect."""
+    insert = sqlite.insert if is_sqlite(bind) else postgresql.insert
+    stmt = insert(model)
+    return stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={column: stmt.excluded[column] for column in update_columns},
+    )
+
+
+def seconds_since(column, bind):
+    """SQL expression for the age of a UTC timestamp column in seconds."""
+    if is_sqlite(bind):
+        return f"((julianday('now') - julianday({column})) * 86400.0)"
+    return f"EXTRACT(EPOCH FROM (now() AT TIME ZONE 'utc') - {column})"
+
+
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    """WAL lets readers run next to the single writer; exp() is missing from some SQLite builds."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+    dbapi_connection.create_function("exp", 1, math.exp)
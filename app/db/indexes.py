@@ -0,0 +1,116 @@
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from app.config import settings
+from app.db.dialect import is_sqlite
+
+logger = logging.getLogger("uvicorn.error")
+
+VECTOR_INDEX_NAME = "movies_vector_idx"
+
+# metric -> (operator class, distance operator used in ORDER BY)
+VECTOR_METRICS = {
+    "l2": ("vector_l2_ops", "<->"),
+    "cosine": ("vector_cosine_ops", "<=>"),
+}
+
+rebuild_status = {"state": "idle", "started_at": None, "finished_at": None, "error": None}
+
+
+def distance_operator() -> str:
+    return VECTOR_METRICS[settings.VECTOR_METRIC][1]
+
+
+def vector_index_sql(name: str = VECTOR_INDEX_NAME, concurrently: bool = False) -> Optional[str]:
+    """CREATE INDEX statement for the configured index type, or None when disabled."""
+    index_type = settings.VECTOR_INDEX_TYPE
+    if index_type == "none":
+        return None
+    opclass, _ = VECTOR_METRICS[settings.VECTOR_METRIC]
+    if index_type == "hnsw":
+        params = f"m = {int(settings.HNSW_M)}, ef_construction = {int(settings.HNSW_EF_CONSTRUCTION)}"
+    elif index_type == "ivfflat":
+        params = f"lists = {int(settings.IVFFLAT_LISTS)}"
+    else:
+        raise ValueError(f"Unknown VECTOR_INDEX_TYPE {index_type!r}")
+    return (
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {name} "
+        f"ON movies USING {index_type} (vector {opclass}) WITH ({params})"
+    )
+
+
+async def get_vector_index_definition(conn: AsyncConnection, name: str = VECTOR_INDEX_NAME) -> Optional[str]:
+    if is_sqlite(conn):
+        return None
+    result = await conn.execute(
+        text("SELECT indexdef FROM pg_indexes WHERE tablename = 'movies' AND indexname = :name"),
+        {"name": name},
+    )
+    return result.scalar_one_or_none()
+
+
+async def has_vectors(conn: AsyncConnection) -> bool:
+    result = await conn.execute(text("SELECT EXISTS (SELECT 1 FROM movies WHERE vector IS NOT NULL)"))
+    return bool(result.scalar())
+
+
+async def ensure_vector_index(conn: AsyncConnection):
+    """Create the vector index if it is missing and warn when it no longer matches the settings."""
+    sql = vector_index_sql()
+    if sql is None or is_sqlite(conn):
+        return
+    existing = await get_vector_index_definition(conn)
+    if existing is None:
+        if settings.VECTOR_INDEX_TYPE == "ivfflat" and not await has_vectors(conn):
+            # ivfflat picks its list centroids from the rows present at build time.
+            logger.warning(
+                "Not creating the ivfflat vector index on an empty catalog; "
+                "it is created on the next startup, or call POST /admin/vector-index/rebuild after loading movies."
+            )
+            return
+        await conn.execute(text(sql))
+        logger.info(f"Created vector index: {sql}")
+        return
+    opclass, _ = VECTOR_METRICS[settings.VECTOR_METRIC]
+    if f"USING {settings.VECTOR_INDEX_TYPE}" not in existing or opclass not in existing:
+        logger.warning(
+            f"Vector index {VECTOR_INDEX_NAME} does not match settings "
+            f"({settings.VECTOR_INDEX_TYPE}/{settings.VECTOR_METRIC}); call POST /admin/vector-index/rebuild."
+        )
+
+
+async def apply_search_settings(db: AsyncSession):
+    """Set per-transaction ANN search parameters for the configured index type."""
+    if settings.VECTOR_INDEX_TYPE == "hnsw":
+        await db.execute(text(f"SET LOCAL hnsw.ef_search = {int(settings.HNSW_EF_SEARCH)}"))
+    elif settings.VECTOR_INDEX_TYPE == "ivfflat":
+        await db.execute(text(f"SET LOCAL ivfflat.probes = {int(settings.IVFFLAT_PROBES)}"))
+
+
+async def rebuild_vector_index(engine: AsyncEngine):
+    """
+    Rebuild the vector index without blocking reads or writes.
+
+    The new index is built CONCURRENTLY under a temporary name, then swapped in place of the old one,
+    so queries keep using the old index until the new one is ready.
+    """
+    sql = vector_index_sql(f"{VECTOR_INDEX_NAME}_new", concurrently=True)
+    if sql is None:
+        return
+    rebuild_status.update(state="running", started_at=time.time(), finished_at=None, error=None)
+    try:
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {VECTOR_INDEX_NAME}_new"))
+            await conn.execute(text(sql))
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {VECTOR_INDEX_NAME}"))
+            await conn.execute(text(f"ALTER INDEX {VECTOR_INDEX_NAME}_new RENAME TO {VECTOR_INDEX_NAME}"))
+        rebuild_status.update(state="done", finished_at=time.time())
+        logger.info("Vector index rebuilt.")
+    except Exception as e:
+        logger.exception("Vector index rebuild failed.")
+        rebuild_status.update(state="failed", finished_at=time.time(), error=str(e))
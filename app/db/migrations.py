@@ -0,0 +1,70 @@
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.db.dialect import is_sqlite
+
+logger = logging.getLogger("uvicorn.error")
+
+# Columns added after the first release. `create_all` only creates missing tables,
+# so existing databases get these through idempotent ALTER TABLE statements.
+ADDED_COLUMNS = [
+    ("users", "taste_sum", "vector(384)"),
+    ("users", "taste_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("users", "taste_decayed", "vector(384)"),
+    ("users", "taste_decayed_weight", "DOUBLE PRECISION NOT NULL DEFAULT 0"),
+    ("users", "taste_updated_at", "TIMESTAMP"),
+    ("user_liked_movies", "liked_at", "TIMESTAMP NOT NULL DEFAULT now()"),
+    ("movies", "like_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("movies", "popularity_score", "DOUBLE PRECISION NOT NULL DEFAULT 0"),
+    ("movies", "content_hash", "VARCHAR(64)"),
+    ("movies", "embedding_version", "VARCHAR(128)"),
+    ("movies", "vector_next", "vector(384)"),
+    ("movies", "vector_next_version", "VARCHAR(128)"),
+]
+
+# Columns added after SQLite support, with SQLite DDL.
+SQLITE_ADDED_COLUMNS = [
+    ("movies", "content_hash", "VARCHAR(64)"),
+    ("movies", "embedding_version", "VARCHAR(128)"),
+    ("movies", "vector_next", "BLOB"),
+    ("movies", "vector_next_version", "VARCHAR(128)"),
+]
+
+ADDED_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_movies_like_count ON movies (like_count)",
+    "CREATE INDEX IF NOT EXISTS ix_movies_popularity_score ON movies (popularity_score)",
+    "CREATE INDEX IF NOT EXISTS ix_movies_title_id ON movies (title, id)",
+]
+
+
+async def add_missing_columns(conn: AsyncConnection) -> set:
+    """Add missing columns and indexes; returns the (table, column) pairs that were added."""
+    if is_sqlite(conn):
+        return await add_missing_sqlite_columns(conn)
+    result = await conn.execute(
+        text("SELECT table_name, column_name FROM information_schema.columns WHERE table_schema = current_schema()")
+    )
+    existing = {tuple(row) for row in result.all()}
+    added = set()
+    for table, column, ddl in ADDED_COLUMNS:
+        if (table, column) not in existing:
+            await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {ddl}"))
+            added.add((table, column))
+    for statement in ADDED_INDEXES:
+        await conn.execute(text(statement))
+    return added
+
+
+async def add_missing_sqlite_columns(conn: AsyncConnection) -> set:
+    """SQLite variant of add_missing_columns (no information_schema, no IF NOT EXISTS)."""
+    added = set()
+    for table, column, ddl in SQLITE_ADDED_COLUMNS:
+        result = await conn.execute(text(f"PRAGMA table_info({table})"))
+        if column not in {row[1] for row in result.all()}:
+            await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+            added.add((table, column))
+    for statement in ADDED_INDEXES:
+        await conn.execute(text(statement))
+    return added
@@ -1,17 +1,17 @@
 from uuid import uuid4
-from sqlalchemy import Column, String, Integer, ARRAY, Float, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, ARRAY, Float, ForeignKey, DateTime, Index, Uuid
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import JSON
 from sqlalchemy.orm import relationship
-from pgvector.sqlalchemy import Vector
+from app.db.dialect import vector_type
 
 Base = declarative_base()
 
 class Movie(Base):
     __tablename__ = "movies"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid4)
     title = Column(String, nullable=False)
     description = Column(String)
     genres = Column(JSON)
@@ -19,15 +19,29 @@ class Movie(Base):
     release_year = Column(Integer)
     director = Column(String)
     actors = Column(JSON)
-    vector = Column(Vector(384)) 
+    vector = Column(vector_type(384)) 
+    like_count = Column(Integer, nullable=False, default=0, index=True)
+    popularity_score = Column(Float, nullable=False, default=0.0, index=True)
+    content_hash = Column(String(64))  # sha256 of build_movie_text, to skip re-embedding unchanged movies
+    embedding_version = Column(String(128))  # app.utils.embedding_version() of `vector`
+    vector_next = Column(vector_type(384))  # shadow vector written by a re-embedding job (app.reembed)
+    vector_next_version = Column(String(128))
+
+    __table_args__ = (Index("ix_movies_title_id", "title", "id"),)
 
 class User(Base):
     __tablename__ = "users"
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid4)
+    taste_sum = Column(vector_type(384))
+    taste_count = Column(Integer, nullable=False, default=0)
+    taste_decayed = Column(vector_type(384))
+    taste_decayed_weight = Column(Float, nullable=False, default=0.0)
+    taste_updated_at = Column(DateTime)
     liked_movies = relationship("UserLikedMovie", back_populates="user", cascade="all, delete-orphan")
 
 class UserLikedMovie(Base):
     __tablename__ = "user_liked_movies"
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
-    movie_id = Column(UUID(as_uuid=True), primary_key=True)
+    user_id = Column(Uuid(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    movie_id = Column(Uuid(as_uuid=True), primary_key=True)
+    liked_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     user = relationship("User", back_populates="liked_movies")
\ No newline at end of file
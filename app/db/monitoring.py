@@ -0,0 +1,142 @@
+"""
+Statement timing, pool checkout wait and slow-query capture for the async engine.
+
+`install(engine)` registers cursor execute hooks that time every statement; statements slower
+than SLOW_QUERY_MS are kept in a ring buffer with their parameters. `TimedQueuePool` times
+how long each connection checkout waited for the pool. Captured SELECTs can be re-run under
+`EXPLAIN (ANALYZE, BUFFERS)` on demand from the admin API.
+"""
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.config import settings
+from app.metrics import DB_QUERY_SECONDS, statement_label
+
+MAX_PARAMETERS_REPR = 500
+# Bound parameters are kept (for EXPLAIN) only up to this size; larger ones are dropped.
+MAX_KEPT_PARAMETERS_REPR = 20000
+
+
+class QueryStats:
+    def __init__(self, slow_ms: float = 200.0, log_size: int = 100):
+        self.slow_ms = slow_ms
+        self.statements = 0
+        self.statement_seconds = 0.0
+        self.max_statement_seconds = 0.0
+        self.checkouts = 0
+        self.checkout_wait_seconds = 0.0
+        self.max_checkout_wait_seconds = 0.0
+        self.slow_queries: deque = deque(maxlen=log_size)
+        self._lock = threading.Lock()
+
+    def record_statement(self, statement: str, parameters, seconds: float):
+        with self._lock:
+            self.statements += 1
+            self.statement_seconds += seconds
+            self.max_statement_seconds = max(self.max_statement_seconds, seconds)
+            if seconds * 1000 >= self.slow_ms and not statement.lstrip().upper().startswith("EXPLAIN"):
+                shown = repr(parameters)
+                entry = {
+                    "at": datetime.utcnow().isoformat(),
+                    "duration_ms": round(seconds * 1000, 2),
+                    "statement": statement,
+                    "parameters": shown[:MAX_PARAMETERS_REPR],
+                }
+                if len(shown) <= MAX_KEPT_PARAMETERS_REPR:
+                    entry["bound"] = parameters
+                self.slow_queries.append(entry)
+
+    def record_checkout(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_wait_seconds += seconds
+            self.max_checkout_wait_seconds = max(self.max_checkout_wait_seconds, seconds)
+
+    def recent_slow(self) -> List[dict]:
+        """Captured slow queries, newest first."""
+        with self._lock:
+            return list(reversed(self.slow_queries))
+
+    def reset(self):
+        with self._lock:
+            self.statements = self.checkouts = 0
+            self.statement_seconds = self.max_statement_seconds = 0.0
+            self.checkout_wait_seconds = self.max_checkout_wait_seconds = 0.0
+            self.slow_queries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "statements": self.statements,
+            "avg_statement_ms": self.statement_seconds / self.statements * 1000 if self.statements else 0.0,
+            "max_statement_ms": self.max_statement_seconds * 1000,
+            "checkouts": self.checkouts,
+            "avg_checkout_wait_ms": self.checkout_wait_seconds / self.checkouts * 1000 if self.checkouts else 0.0,
+            "max_checkout_wait_ms": self.max_checkout_wait_seconds * 1000,
+            "slow_query_ms": self.slow_ms,
+            "slow_queries": len(self.slow_queries),
+        }
+
+
+query_stats = QueryStats(slow_ms=settings.SLOW_QUERY_MS, log_size=settings.SLOW_QUERY_LOG_SIZE)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a free connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            query_stats.record_checkout(time.perf_counter() - started)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, which is discarded with a failed statement.
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - context._query_started
+    DB_QUERY_SECONDS.labels(statement_label(statement)).observe(seconds)
+    query_stats.record_statement(statement, parameters, seconds)
+
+
+def install(engine: AsyncEngine):
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def describe(entry: dict) -> dict:
+    """A slow query entry for display, without its bound parameters (only their shortened repr)."""
+    return {key: value for key, value in entry.items() if key != "bound"}
+
+
+async def explain(conn: AsyncConnection, entry: dict) -> Optional[str]:
+    """
+    Plan for a captured query, or None for other statements and for queries whose parameters
+    were too large to keep. Plain SELECTs run under EXPLAIN (ANALYZE, BUFFERS), which executes
+    them; WITH queries may modify data, so they are only planned. Always rolled back.
+    """
+    statement = entry["statement"]
+    head = statement.lstrip().upper()
+    if not head.startswith(("SELECT", "WITH")) or "bound" not in entry:
+        return None
+    parameters = entry["bound"] or ()
+    async with conn.begin() as transaction:
+        try:
+            if conn.dialect.name == "sqlite":
+                result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                return "\n".join(row[-1] for row in result.all())
+            analyze = "(ANALYZE, BUFFERS) " if head.startswith("SELECT") else ""
+            result = await conn.exec_driver_sql(f"EXPLAIN {analyze}{statement}", parameters)
+            return "\n".join(row[0] for row in result.all())
+        finally:
+            await transaction.rollback()
@@ -1,8 +1,51 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from app.config import settings
+from app.db import monitoring
+from app.db.dialect import configure_sqlite_connection
 
-engine = create_async_engine(settings.PG_DB_URL, echo=True)
+def database_url() -> str:
+    return settings.SQLITE_DB_URL if settings.DB_BACKEND == "sqlite" else settings.PG_DB_URL
+
+def make_engine(url: str):
+    """Async engine with pool sizing, pre-ping, recycle, statement timeout and echo from Settings."""
+    if make_url(url).get_backend_name() == "sqlite":
+        if make_url(url).database in (None, "", ":memory:"):
+            # Every connection to an in-memory database is a new, empty database.
+            pool_options = {"poolclass": StaticPool}
+        else:
+            pool_options = {
+                "poolclass": monitoring.TimedQueuePool,
+                "pool_size": settings.DB_POOL_SIZE,
+                "max_overflow": settings.DB_MAX_OVERFLOW,
+                "pool_timeout": settings.DB_POOL_TIMEOUT,
+            }
+        engine = create_async_engine(url, echo=settings.DB_ECHO, **pool_options)
+        event.listen(engine.sync_engine, "connect", configure_sqlite_connection)
+        monitoring.install(engine)
+        return engine
+
+    connect_args = {}
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+    engine = create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        poolclass=monitoring.TimedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+    monitoring.install(engine)
+    return engine
+
+engine = make_engine(database_url())
 AsyncSessionLocal = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
 async def get_db():
@@ -10,4 +53,4 @@ async def get_db():
         try:
             yield session
         finally:
-            await session.close() 
\ No newline at end of file
+            await session.close()
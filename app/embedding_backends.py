@@ -0,0 +1,125 @@
+"""
+Embedding inference backends for `app.utils.vectorize`.
+
+- torch: the reference PyTorch SentenceTransformer.
+- onnx: the same model exported to ONNX and run with ONNX Runtime.
+- onnx-int8: the ONNX model with int8 dynamic quantization, exported once into
+  EMBEDDING_ONNX_DIR and reused on later boots.
+
+Compare backends on a deployment with:
+    python -m app.embedding_backends [--csv processed_movies.csv] [--samples 256]
+"""
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def model_id(backend: str = None) -> str:
+    """Identifies the vectors a backend produces; used to key cached embeddings."""
+    backend = backend or settings.EMBEDDING_BACKEND
+    if backend == "onnx-int8":
+        return f"{settings.EMBEDDING_MODEL_NAME}:{backend}-{settings.EMBEDDING_QUANTIZATION}"
+    return f"{settings.EMBEDDING_MODEL_NAME}:{backend}"
+
+
+def load_model(backend: str = None):
+    """Build a SentenceTransformer for `backend` (defaults to EMBEDDING_BACKEND)."""
+    from sentence_transformers import SentenceTransformer
+
+    backend = backend or settings.EMBEDDING_BACKEND
+    if backend == "torch":
+        return SentenceTransformer(settings.EMBEDDING_MODEL_NAME)
+    if backend == "onnx":
+        return SentenceTransformer(settings.EMBEDDING_MODEL_NAME, backend="onnx")
+    if backend == "onnx-int8":
+        return _load_quantized()
+    raise ValueError(f"Unknown EMBEDDING_BACKEND {backend!r}, expected one of {BACKENDS}")
+
+
+def _load_quantized():
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    directory = Path(settings.EMBEDDING_ONNX_DIR)
+    file_name = f"onnx/model_qint8_{settings.EMBEDDING_QUANTIZATION}.onnx"
+    if not (directory / file_name).exists():
+        logger.info(f"Exporting int8 ONNX model to {directory / file_name}")
+        onnx_model = SentenceTransformer(settings.EMBEDDING_MODEL_NAME, backend="onnx")
+        onnx_model.save(str(directory))
+        export_dynamic_quantized_onnx_model(onnx_model, settings.EMBEDDING_QUANTIZATION, str(directory))
+    return SentenceTransformer(
+        str(directory), backend="onnx", model_kwargs={"file_name": file_name}
+    )
+
+
+def cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Row-wise cosine similarity between two matrices of the same shape."""
+    norms = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    return (a * b).sum(axis=1) / np.where(norms == 0, 1, norms)
+
+
+def compare_backends(texts: List[str], backends=BACKENDS, batch_size: int = 64) -> dict:
+    """
+    Encode `texts` with every backend and report parity against torch and throughput.
+    """
+    report = {"samples": len(texts), "batch_size": batch_size, "backends": {}}
+    reference = None
+    for backend in ("torch",) + tuple(b for b in backends if b != "torch"):
+        started = time.perf_counter()
+        model = load_model(backend)
+        load_seconds = time.perf_counter() - started
+
+        model.encode(texts[:batch_size], batch_size=batch_size)  # warm-up
+        started = time.perf_counter()
+        vectors = model.encode(texts, batch_size=batch_size)
+        seconds = time.perf_counter() - started
+
+        entry = {
+            "load_seconds": round(load_seconds, 3),
+            "encode_seconds": round(seconds, 3),
+            "texts_per_second": round(len(texts) / seconds, 1),
+        }
+        if reference is None:
+            reference = vectors
+        else:
+            cosine = cosine_rows(reference, vectors)
+            entry.update(
+                cosine_mean=float(cosine.mean()),
+                cosine_min=float(cosine.min()),
+                speedup_vs_torch=round(report["backends"]["torch"]["encode_seconds"] / seconds, 2),
+            )
+        report["backends"][backend] = entry
+    return report
+
+
+def sample_texts(csv_path: str, samples: int) -> List[str]:
+    from app.seed import read_chunks
+    from app.utils import build_movie_text
+
+    texts = []
+    for movies in read_chunks(csv_path, chunk_size=samples):
+        texts.extend(build_movie_text(movie) for movie in movies)
+        break
+    return texts[:samples]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare embedding backends for parity and throughput.")
+    parser.add_argument("--csv", default=settings.SEED_CSV_PATH)
+    parser.add_argument("--samples", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    texts = sample_texts(args.csv, args.samples)
+    print(json.dumps(compare_backends(texts, tuple(args.backends), args.batch_size), indent=2))
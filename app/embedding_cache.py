@@ -0,0 +1,147 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger("uvicorn.error")
+
+KEY_BYTES = 32
+
+
+class EmbeddingCache:
+    """
+    Embedding cache keyed by sha256(model name + text), persisted on disk.
+
+    Vectors live in a memory-mapped float32 matrix (`vectors.f32`) with one row per slot.
+    A second memmap (`keys.u8`) stores the key digest of each slot and `index.json` keeps the
+    key -> slot mapping in LRU order. Restarted processes and new workers load the index and
+    read vectors straight from the mapped file instead of running the model.
+
+    A lookup only hits when the digest stored in the slot matches the key, so a slot that was
+    overwritten by another worker degrades to a miss rather than returning a wrong vector.
+    When all slots are used, the least recently used entry is evicted.
+    """
+
+    def __init__(self, directory: str, model_name: str, dim: int, capacity: int, flush_every: int = 256):
+        self.directory = Path(directory)
+        self.model_name = model_name
+        self.dim = dim
+        self.capacity = capacity
+        self.flush_every = flush_every
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._slots: "OrderedDict[str, int]" = OrderedDict()
+        self._dirty = 0
+        self._open()
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.directory / "vectors.f32"
+
+    @property
+    def _keys_path(self) -> Path:
+        return self.directory / "keys.u8"
+
+    @property
+    def _index_path(self) -> Path:
+        return self.directory / "index.json"
+
+    def _open(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        meta = self._read_index()
+        fresh = meta is None or meta.get("dim") != self.dim or meta.get("capacity") != self.capacity
+        if fresh and meta is not None:
+            logger.warning("Embedding cache layout changed, starting with an empty cache.")
+        mode = "w+" if fresh or not self._vectors_path.exists() or not self._keys_path.exists() else "r+"
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode=mode, shape=(self.capacity, self.dim))
+        self._keys = np.memmap(self._keys_path, dtype=np.uint8, mode=mode, shape=(self.capacity, KEY_BYTES))
+        if mode == "r+":
+            self._slots = OrderedDict((key, slot) for key, slot in meta["slots"])
+        used = set(self._slots.values())
+        self._free = [slot for slot in range(self.capacity - 1, -1, -1) if slot not in used]
+
+    def _read_index(self) -> Optional[dict]:
+        if not self._index_path.exists():
+            return None
+        try:
+            return json.loads(self._index_path.read_text())
+        except (OSError, ValueError):
+            logger.warning("Embedding cache index is unreadable, starting with an empty cache.")
+            return None
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = self.key(text)
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is not None and bytes(self._keys[slot]) == bytes.fromhex(key):
+                self._slots.move_to_end(key)
+                self.hits += 1
+                return np.array(self._vectors[slot])
+            if slot is not None:
+                del self._slots[key]
+                self._free.append(slot)
+            self.misses += 1
+            return None
+
+    def put(self, text: str, vector: np.ndarray):
+        key = self.key(text)
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                if self._free:
+                    slot = self._free.pop()
+                else:
+                    _, slot = self._slots.popitem(last=False)
+                    self.evictions += 1
+                self._slots[key] = slot
+            else:
+                self._slots.move_to_end(key)
+            self._vectors[slot] = np.asarray(vector, dtype=np.float32)
+            self._keys[slot] = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+            self._dirty += 1
+            if self._dirty >= self.flush_every:
+                self._flush_locked()
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        return [self.get(text) for text in texts]
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._vectors.flush()
+        self._keys.flush()
+        payload = {
+            "model": self.model_name,
+            "dim": self.dim,
+            "capacity": self.capacity,
+            "slots": list(self._slots.items()),
+        }
+        tmp = self._index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(payload))
+        tmp.replace(self._index_path)
+        self._dirty = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._slots),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
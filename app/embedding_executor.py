@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from app import utils
+from app.config import settings
+from app.metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_SECONDS, record_error
+from app.schemas import MovieCreate
+from app.utils import build_movie_text, encode_queries, encode_texts
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def _init_worker_process():
+    """
+    Child processes run without the embedding cache: each would open its own copy of the same
+    directory and none is ever flushed, so their entries would be lost or overwrite each other.
+    """
+    utils.disable_embedding_cache()
+
+
+class EmbeddingBatcher:
+    """
+    Runs embedding off the event loop and coalesces concurrent callers into micro-batches.
+
+    Callers enqueue texts and await a future. A collector task drains the queue into a batch
+    until it holds `max_batch_size` texts or `max_wait_ms` has passed since the first one,
+    then hands the whole batch to `encode_fn` on the executor as a single call.
+    At most `workers` batches run at once.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        workers: int = 1,
+        executor_kind: str = "thread",
+        name: str = "movies",
+    ):
+        self.encode_fn = encode_fn
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.workers = workers
+        self.executor_kind = executor_kind
+
+        self.batches = 0
+        self.items = 0
+        self.max_observed_batch = 0
+        self.encode_seconds = 0.0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight = set()
+
+    @property
+    def running(self) -> bool:
+        return self._collector is not None and not self._collector.done()
+
+    async def start(self):
+        if self.running:
+            return
+        if self.executor_kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker_process)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="embedding")
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._collector = asyncio.create_task(self._collect())
+
+    async def stop(self):
+        if self._collector is not None:
+            self._collector.cancel()
+            try:
+                await self._collector
+            except asyncio.CancelledError:
+                pass
+            self._collector = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def embed_texts(self, texts: List[str]) -> np.ndarray:
+        if not self.running:
+            await self.start()
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in texts]
+        for text, future in zip(texts, futures):
+            self._queue.put_nowait((text, future))
+        return np.stack(await asyncio.gather(*futures))
+
+    async def embed(self, movie: MovieCreate) -> np.ndarray:
+        return (await self.embed_texts([build_movie_text(movie)]))[0]
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._slots.acquire()
+            task = asyncio.create_task(self._run(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _run(self, batch):
+        texts = [text for text, _ in batch]
+        started = time.perf_counter()
+        try:
+            vectors = await asyncio.get_running_loop().run_in_executor(self._executor, self.encode_fn, texts)
+        except Exception as e:
+            logger.exception("Embedding batch failed.")
+            record_error(f"embedding_{self.name}", e)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+        seconds = time.perf_counter() - started
+        EMBEDDING_SECONDS.labels(self.name).observe(seconds)
+        EMBEDDING_BATCH_SIZE.labels(self.name).observe(len(batch))
+        self.encode_seconds += seconds
+        self.batches += 1
+        self.items += len(batch)
+        self.max_observed_batch = max(self.max_observed_batch, len(batch))
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "running": self.running,
+            "executor": self.executor_kind,
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "inflight_batches": len(self._inflight),
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_observed_batch,
+            "avg_batch_seconds": self.encode_seconds / self.batches if self.batches else 0.0,
+        }
+
+
+embedding_batcher = EmbeddingBatcher(
+    encode_texts,
+    max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+    max_wait_ms=settings.EMBEDDING_MAX_WAIT_MS,
+    workers=settings.EMBEDDING_WORKERS,
+    executor_kind=settings.EMBEDDING_EXECUTOR,
+)
+
+query_batcher = EmbeddingBatcher(
+    encode_queries,
+    max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+    max_wait_ms=settings.EMBEDDING_MAX_WAIT_MS,
+    workers=1,
+    name="queries",
+)
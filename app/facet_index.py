@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence
+from uuid import UUID
+
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import Movie
+from app.schemas import parse_stringified_list
+
+logger = logging.getLogger("uvicorn.error")
+
+FACET_FIELDS = ("genres", "tags", "actors", "director")
+
+
+def facet_values(value) -> List[str]:
+    """Normalize a genres/tags/actors list (or a director string) into a list of labels."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        parsed = parse_stringified_list(value) if value.startswith("[") else [value]
+        value = parsed if isinstance(parsed, list) else [value]
+    return [str(v).strip() for v in value if v is not None and str(v).strip()]
+
+
+class FacetIndex:
+    """
+    In-process inverted index from genre, tag, actor and director values to movie rows.
+
+    Each field keeps a posting list (movie rows) per value, matched case-insensitively.
+    A filter becomes a boolean mask over the catalog: values of one field are combined with
+    AND (`match="all"`) or OR (`match="any"`), different fields and the year range always
+    with AND. Facet counts for a mask are one sparse (values x movies) @ mask product per
+    field, so every value of every field is counted in a single pass.
+    """
+
+    def __init__(self):
+        self.ids: List[UUID] = []
+        self.row_of: Dict[UUID, int] = {}
+        self.years = np.empty(0, dtype=np.float64)
+        self.postings: Dict[str, Dict[str, List[int]]] = {f: defaultdict(list) for f in FACET_FIELDS}
+        self.labels: Dict[str, Dict[str, str]] = {f: {} for f in FACET_FIELDS}
+        self.ready = False
+        self._matrices: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def build(self, movies: Iterable[tuple]):
+        """Rebuild from (id, release_year, genres, tags, actors, director) rows."""
+        fresh = FacetIndex()
+        years = []
+        for movie_id, year, *fields in movies:
+            fresh._append(movie_id, fields)
+            years.append(np.nan if year is None else year)
+        fresh.years = np.asarray(years, dtype=np.float64)
+        with self._lock:
+            self.ids, self.row_of, self.years = fresh.ids, fresh.row_of, fresh.years
+            self.postings, self.labels = fresh.postings, fresh.labels
+            self._matrices = {}
+            self.ready = True
+        logger.info(f"Facet index built: {len(self.ids)} movies, "
+                    + ", ".join(f"{len(self.postings[f])} {f}" for f in FACET_FIELDS))
+
+    def _append(self, movie_id: UUID, fields: Sequence):
+        row = self.row_of[movie_id] = len(self.ids)
+        self.ids.append(movie_id)
+        for field, value in zip(FACET_FIELDS, fields):
+            for label in facet_values(value):
+                key = label.casefold()
+                postings = self.postings[field][key]
+                if not postings or postings[-1] != row:
+                    postings.append(row)
+                self.labels[field].setdefault(key, label)
+
+    def add(self, movie_id: UUID, release_year: Optional[int], genres, tags, actors, director):
+        with self._lock:
+            if movie_id in self.row_of:
+                return
+            self._append(movie_id, (genres, tags, actors, director))
+            self.years = np.append(self.years, np.nan if release_year is None else release_year)
+            self._matrices = {}
+
+    def _postings_mask(self, field: str, value: str) -> np.ndarray:
+        mask = np.zeros(len(self.ids), dtype=bool)
+        rows = self.postings[field].get(value.strip().casefold())
+        if rows:
+            mask[rows] = True
+        return mask
+
+    def mask(
+        self,
+        filters: Dict[str, Sequence[str]],
+        match: str = "all",
+        year_min: Optional[int] = None,
+        year_max: Optional[int] = None,
+    ) -> np.ndarray:
+        """Boolean mask over catalog rows for `filters` ({field: [values]}) and the year range."""
+        with self._lock:
+            result = np.ones(len(self.ids), dtype=bool)
+            for field, values in filters.items():
+                if not values:
+                    continue
+                masks = [self._postings_mask(field, value) for value in values]
+                combined = np.logical_and.reduce(masks) if match == "all" else np.logical_or.reduce(masks)
+                result &= combined
+            if year_min is not None:
+                result &= self.years >= year_min
+            if year_max is not None:
+                result &= self.years <= year_max
+        return result
+
+    def filter(self, filters: Dict[str, Sequence[str]], limit: int, **kwargs) -> List[UUID]:
+        """First `limit` movie ids (catalog order) matching `filters`; kwargs as for `mask`."""
+        rows = np.flatnonzero(self.mask(filters, **kwargs))[:limit]
+        return [self.ids[row] for row in rows]
+
+    def _matrix(self, field: str):
+        """(CSR values x movies matrix, value keys) for `field`, rebuilt after changes."""
+        cached = self._matrices.get(field)
+        if cached is not None and cached[0].shape[1] == len(self.ids):
+            return cached
+        keys = list(self.postings[field])
+        lengths = [len(self.postings[field][key]) for key in keys]
+        indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        indices = np.fromiter(
+            (row for key in keys for row in self.postings[field][key]), dtype=np.int64, count=int(indptr[-1])
+        )
+        matrix = sp.csr_matrix(
+            (np.ones(len(indices), dtype=np.int32), indices, indptr), shape=(len(keys), len(self.ids))
+        )
+        self._matrices[field] = (matrix, keys)
+        return self._matrices[field]
+
+    def facets(self, mask: np.ndarray, fields: Sequence[str] = FACET_FIELDS, limit: int = 50) -> Dict[str, Dict[str, int]]:
+        """Top `limit` values per field by number of movies in `mask`."""
+        selected = mask.astype(np.int32)
+        result = {}
+        with self._lock:
+            for field in fields:
+                matrix, keys = self._matrix(field)
+                counts = matrix @ selected
+                nonzero = np.flatnonzero(counts)
+                top = nonzero[np.argsort(-counts[nonzero], kind="stable")][:limit]
+                result[field] = {self.labels[field][keys[i]]: int(counts[i]) for i in top}
+        return result
+
+
+_build_lock = asyncio.Lock()
+
+
+async def build_facet_index(session: AsyncSession, index: Optional[FacetIndex] = None):
+    if index is None:
+        index = facet_index
+    result = await session.stream(
+        select(Movie.id, Movie.release_year, Movie.genres, Movie.tags, Movie.actors, Movie.director)
+        .order_by(Movie.title, Movie.id)
+    )
+    movies = [tuple(row) async for row in result]
+    await asyncio.to_thread(index.build, movies)
+
+
+async def maintain_facet_index(session_factory, index: Optional[FacetIndex] = None):
+    """
+    Background loop: rebuild the index from the database. Movies created by another worker or
+    written by sync, ingest or re-embedding in another process only reach this process this way.
+    """
+    if index is None:
+        index = facet_index
+    while True:
+        await asyncio.sleep(settings.FACET_REFRESH_SECONDS)
+        try:
+            async with session_factory() as session:
+                await build_facet_index(session, index)
+        except Exception:
+            logger.exception("Facet index refresh failed.")
+
+
+async def ensure_facet_index(session: AsyncSession) -> FacetIndex:
+    """Build the shared index on first use if startup did not."""
+    if not facet_index.ready:
+        async with _build_lock:
+            if not facet_index.ready:
+                await build_facet_index(session)
+    return facet_index
+
+
+facet_index = FacetIndex()
@@ -0,0 +1,205 @@
+"""
+Bulk ingestion of like/unlike events.
+
+Events are applied in batches: one existence query for the batch's movies, one upsert for
+missing users, one `INSERT ... ON CONFLICT DO NOTHING` for likes and one `DELETE ... RETURNING`
+for unlikes, then a single commit. Taste vectors, like counters, the co-occurrence index and
+the recommendation cache are updated once per batch rather than once per event.
+"""
+import json
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Iterable, List, Tuple
+from uuid import UUID
+
+from pydantic import ValidationError
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import recommendation_cache
+from app.cooccurrence import cooccurrence_index
+from app.db import Movie, User, UserLikedMovie
+from app.db.dialect import insert_ignore
+from app.popularity import apply_like_counts, change_like_counts, unlike_weight
+from app.schemas import LikeEvent
+from app.taste import add_like, remove_like
+
+MAX_REPORTED_ERRORS = 20
+
+
+class IngestReport:
+    def __init__(self):
+        self.liked = 0
+        self.unliked = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.errors: List[dict] = []
+
+    def reject(self, line: int, error: str):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def as_dict(self) -> dict:
+        return {
+            "accepted": self.liked + self.unliked,
+            "liked": self.liked,
+            "unliked": self.unliked,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
+
+
+def parse_event(raw, line: int, report: IngestReport):
+    """Validate one decoded event; returns a LikeEvent or None (counted as rejected)."""
+    try:
+        event = LikeEvent.model_validate(raw)
+    except ValidationError as e:
+        report.reject(line, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+        return None
+    if event.timestamp is not None and event.timestamp.tzinfo is not None:
+        event.timestamp = event.timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return event
+
+
+async def read_ndjson(chunks: AsyncIterator[bytes], report: IngestReport) -> AsyncIterator[Tuple[int, LikeEvent]]:
+    """Yield (line number, event) from an NDJSON byte stream without buffering the whole body."""
+    buffer = b""
+    line = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for raw in lines:
+            line += 1
+            event = decode_line(raw, line, report)
+            if event is not None:
+                yield line, event
+    if buffer.strip():
+        line += 1
+        event = decode_line(buffer, line, report)
+        if event is not None:
+            yield line, event
+
+
+def decode_line(raw: bytes, line: int, report: IngestReport):
+    if not raw.strip():
+        return None
+    try:
+        return parse_event(json.loads(raw), line, report)
+    except json.JSONDecodeError as e:
+        report.reject(line, f"invalid JSON: {e.msg}")
+        return None
+
+
+def collapse(events: Iterable[Tuple[int, LikeEvent]], report: IngestReport) -> Dict[Tuple[UUID, UUID], Tuple[int, LikeEvent]]:
+    """Keep the latest event per (user, movie); earlier ones in the batch count as duplicates."""
+    latest: Dict[Tuple[UUID, UUID], Tuple[int, LikeEvent]] = {}
+    for line, event in events:
+        key = (event.user_id, event.movie_id)
+        current = latest.get(key)
+        if current is not None:
+            report.duplicates += 1
+            if event.timestamp and current[1].timestamp and event.timestamp < current[1].timestamp:
+                continue
+        latest[key] = (line, event)
+    return latest
+
+
+async def ingest_batch(session: AsyncSession, events: List[Tuple[int, LikeEvent]], report: IngestReport):
+    """Apply one batch of events in a single transaction and update derived state after commit."""
+    latest = collapse(events, report)
+    if not latest:
+        return
+
+    movie_ids = {movie_id for _, movie_id in latest}
+    result = await session.execute(select(Movie.id, Movie.vector).where(Movie.id.in_(movie_ids)))
+    vectors = {movie_id: vector for movie_id, vector in result.all()}
+    valid = {}
+    for key, (line, event) in latest.items():
+        if event.movie_id not in vectors:
+            report.reject(line, f"movie {event.movie_id} not found")
+        else:
+            valid[key] = event
+    if not valid:
+        return
+
+    user_ids = {user_id for user_id, _ in valid}
+    await session.execute(
+        insert_ignore(session, User, [User.id]),
+        [{"id": user_id, "taste_count": 0, "taste_decayed_weight": 0.0} for user_id in user_ids],
+    )
+    old_liked: Dict[UUID, set] = defaultdict(set)
+    if cooccurrence_index.ready:
+        result = await session.execute(
+            select(UserLikedMovie.user_id, UserLikedMovie.movie_id).where(UserLikedMovie.user_id.in_(user_ids))
+        )
+        for user_id, movie_id in result.all():
+            old_liked[user_id].add(movie_id)
+
+    now = datetime.utcnow()
+    likes = [e for e in valid.values() if e.action == "like"]
+    unlikes = [e for e in valid.values() if e.action == "unlike"]
+
+    added: List[Tuple[UUID, UUID, datetime]] = []
+    if likes:
+        result = await session.execute(
+            insert_ignore(session, UserLikedMovie, [UserLikedMovie.user_id, UserLikedMovie.movie_id])
+            .returning(UserLikedMovie.user_id, UserLikedMovie.movie_id, UserLikedMovie.liked_at),
+            [{"user_id": e.user_id, "movie_id": e.movie_id, "liked_at": e.timestamp or now} for e in likes],
+        )
+        added = [tuple(row) for row in result.all()]
+    removed: List[Tuple[UUID, UUID, datetime]] = []
+    if unlikes:
+        result = await session.execute(
+            delete(UserLikedMovie)
+            .where(tuple_(UserLikedMovie.user_id, UserLikedMovie.movie_id).in_([(e.user_id, e.movie_id) for e in unlikes]))
+            .returning(UserLikedMovie.user_id, UserLikedMovie.movie_id, UserLikedMovie.liked_at)
+        )
+        removed = [tuple(row) for row in result.all()]
+    report.liked += len(added)
+    report.unliked += len(removed)
+    report.duplicates += len(likes) - len(added) + len(unlikes) - len(removed)
+    if not added and not removed:
+        await session.commit()
+        return
+
+    changed_users = {user_id for user_id, _, _ in added + removed}
+    result = await session.execute(select(User).where(User.id.in_(changed_users)).with_for_update())
+    users = {user.id: user for user in result.scalars().all()}
+    for user_id, movie_id, liked_at in sorted(added, key=lambda row: row[2]):
+        add_like(users[user_id], vectors[movie_id], liked_at)
+    for user_id, movie_id, liked_at in removed:
+        remove_like(users[user_id], vectors[movie_id], liked_at)
+
+    # Historical events move the decayed score by what the like is still worth today.
+    net: Dict[UUID, int] = defaultdict(int)
+    score: Dict[UUID, float] = defaultdict(float)
+    for _, movie_id, liked_at in added:
+        net[movie_id] += 1
+        score[movie_id] += unlike_weight(liked_at)
+    for _, movie_id, liked_at in removed:
+        net[movie_id] -= 1
+        score[movie_id] -= unlike_weight(liked_at)
+    by_delta: Dict[int, List[UUID]] = defaultdict(list)
+    for movie_id, delta in net.items():
+        if delta or score[movie_id]:
+            by_delta[delta].append(movie_id)
+    counts = [
+        (delta, await change_like_counts(session, ids, delta, {movie_id: score[movie_id] for movie_id in ids}))
+        for delta, ids in by_delta.items()
+    ]
+
+    await session.commit()
+
+    for delta, rows in counts:
+        apply_like_counts(rows, delta)
+    if cooccurrence_index.ready:
+        new_liked = {user_id: set(old_liked[user_id]) for user_id in changed_users}
+        for user_id, movie_id, _ in added:
+            new_liked[user_id].add(movie_id)
+        for user_id, movie_id, _ in removed:
+            new_liked[user_id].discard(movie_id)
+        for user_id in changed_users:
+            cooccurrence_index.replace_likes(user_id, old_liked[user_id], new_liked[user_id])
+    await recommendation_cache.invalidate_likes()
@@ -1,15 +1,38 @@
-import pandas as pd
-from uuid import uuid4
+import time
+_import_started = time.perf_counter()
+
+import asyncio
 import os
+import logging
 from pathlib import Path
 
 from fastapi import FastAPI
-from sqlalchemy import select, text
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import text
 from app.config import settings
 from app.api import *
-from app.db import engine, AsyncSessionLocal, Base, Movie as DBMovie
-from app.schemas import Movie, MovieCreate, parse_stringified_list
-from app.utils import vectorize
+from app.db import engine, AsyncSessionLocal, Base
+from app.db.dialect import is_sqlite
+from app.db.indexes import ensure_vector_index
+from app.db.migrations import add_missing_columns
+from app.seed import seed_if_empty
+from app.embedding_executor import embedding_batcher, query_batcher
+from app.utils import flush_embedding_cache, get_model, model_loaded, warm_model_in_background
+import app.utils as utils
+from app.vector_index import build_vector_index
+from app.vector_store import vector_store
+from app.cache import check_cache_backend
+from app.cooccurrence import build_cooccurrence_index, maintain_cooccurrence_index
+from app.facet_index import build_facet_index, maintain_facet_index
+from app.metrics import MetricsMiddleware, render as render_metrics
+from app.popularity import load_popularity_snapshot, maintain_popularity, recount_likes
+from app.reembed import count_stale, run_reembed, stamp_unversioned_vectors
+
+logger = logging.getLogger("uvicorn.error")
+
+startup_timings = {"import": time.perf_counter() - _import_started}
+startup_complete = False
+background_tasks = []
 
 DB_PATH = Path(__file__).resolve().parent.parent / "movies.db"
 
@@ -19,41 +42,134 @@ app = FastAPI(
     version=settings.VERSION,
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus scrape endpoint."""
+        body, content_type = render_metrics()
+        return Response(body, headers={"Content-Type": content_type})
+
 @app.get("/")
 async def root():
     return {"code" : 200, "message": "success"}
-    
+
+@app.get("/health/live")
+async def liveness():
+    """The process is up and serving requests."""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    The app can serve every route: startup finished and the embedding model is loaded
+    (unless MODEL_WARMUP is lazy). Returns 503 until then.
+    """
+    ready = startup_complete and (model_loaded() or settings.MODEL_WARMUP == "lazy")
+    body = {
+        "status": "ready" if ready else "starting",
+        "startup_complete": startup_complete,
+        "model_loaded": model_loaded(),
+        "timings": {**startup_timings, "model_load": utils.model_load_seconds},
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
 @app.on_event("startup")
 async def startup():
+    global startup_complete
+
+    # uvicorn and gunicorn read WEB_CONCURRENCY as their default worker count.
+    check_cache_backend(int(os.environ.get("WEB_CONCURRENCY", "1")))
+
+    if settings.MODEL_WARMUP == "background":
+        warm_model_in_background()
+    elif settings.MODEL_WARMUP == "eager":
+        started = time.perf_counter()
+        await asyncio.to_thread(get_model)
+        startup_timings["model_load"] = time.perf_counter() - started
+
+    started = time.perf_counter()
     async with engine.begin() as conn:
-        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector;"))
+        if not is_sqlite(conn):
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector;"))
         await conn.run_sync(Base.metadata.create_all)
+        added_columns = await add_missing_columns(conn)
+    startup_timings["db_init"] = time.perf_counter() - started
 
-    df = pd.read_csv("processed_movies.csv")
-    for col in ['genres', 'tags', 'actors']:
-        df[col] = df[col].apply(parse_stringified_list)
+    if settings.SEED_ON_STARTUP:
+        started = time.perf_counter()
+        await seed_if_empty()
+        startup_timings["seeding"] = time.perf_counter() - started
 
+    # After seeding, so ivfflat is trained on the catalog rather than an empty table.
+    async with engine.begin() as conn:
+        await ensure_vector_index(conn)
+
+    if settings.ANN_ENABLED:
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as session:
+            await build_vector_index(session)
+        startup_timings["vector_index"] = time.perf_counter() - started
+
+    if vector_store.in_process:
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as session:
+            await vector_store.load(session)
+        startup_timings["vector_store"] = time.perf_counter() - started
+
+    started = time.perf_counter()
     async with AsyncSessionLocal() as session:
-        result = await session.execute(select(DBMovie).limit(1))
-        exists = result.scalar_one_or_none()
-        if exists:
-            return
-        for _, row in df.iterrows():
-            movie_data = row.to_dict()
-            movie_create = MovieCreate(**movie_data)
-            db_movie = DBMovie(
-                id=uuid4(),
-                title=row['title'],
-                description=row['description'],
-                genres=row['genres'],
-                tags=row['tags'],
-                release_year=row['release_year'],
-                director=row['director'],
-                actors=row['actors'],
-                vector=vectorize(movie_create)
-            )
-            session.add(db_movie)
-        await session.commit()
+        await build_facet_index(session)
+    startup_timings["facet_index"] = time.perf_counter() - started
+    if settings.FACET_REFRESH_SECONDS:
+        background_tasks.append(asyncio.create_task(maintain_facet_index(AsyncSessionLocal)))
+
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as session:
+        if ("movies", "like_count") in added_columns:
+            await recount_likes(session)
+        await load_popularity_snapshot(session)
+    startup_timings["popularity"] = time.perf_counter() - started
+    background_tasks.append(asyncio.create_task(maintain_popularity(AsyncSessionLocal)))
+
+    if settings.COOCCURRENCE_ENABLED:
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as session:
+            await build_cooccurrence_index(session)
+        startup_timings["cooccurrence_index"] = time.perf_counter() - started
+        background_tasks.append(asyncio.create_task(maintain_cooccurrence_index(AsyncSessionLocal)))
+
+    async with AsyncSessionLocal() as session:
+        if ("movies", "embedding_version") in added_columns:
+            await stamp_unversioned_vectors(session)
+        stale = await count_stale(session)
+    if stale and settings.REEMBED_ON_STARTUP:
+        background_tasks.append(asyncio.create_task(run_reembed()))
+    elif stale:
+        logger.warning(
+            f"{stale} movies were embedded with another model or text format; "
+            "POST /admin/reembed to re-embed them."
+        )
+
+    await embedding_batcher.start()
+    await query_batcher.start()
+    startup_complete = True
+    logger.info(
+        "Startup timings: " + ", ".join(f"{name}={seconds:.2f}s" for name, seconds in startup_timings.items())
+        + ("" if model_loaded() else " (model still loading)")
+    )
+
+@app.on_event("shutdown")
+async def shutdown():
+    for task in background_tasks:
+        task.cancel()
+    await embedding_batcher.stop()
+    await query_batcher.stop()
+    vector_store.close()
+    flush_embedding_cache()
+
 app.include_router(user_router)
 app.include_router(movie_router)
-app.include_router(auth_router) 
\ No newline at end of file
+app.include_router(auth_router)
+app.include_router(admin_router) 
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+Prometheus metrics, exposed at GET /metrics.
+
+Label values are restricted to small fixed sets (route templates, known strategies,
+statement verbs, exception class names) so series counts stay bounded under load.
+"""
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+STRATEGIES = ("content", "latest", "popularity", "user_based", "hybrid")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+REQUEST_SECONDS = Histogram(
+    "recapi_request_seconds", "HTTP request latency.",
+    ["method", "route", "by", "status"], buckets=LATENCY_BUCKETS,
+)
+RECOMMEND_SECONDS = Histogram(
+    "recapi_recommend_seconds", "recommend() latency by strategy.",
+    ["by"], buckets=LATENCY_BUCKETS,
+)
+HYBRID_SOURCE_SECONDS = Histogram(
+    "recapi_hybrid_source_seconds", "Hybrid candidate fetch latency by source.",
+    ["source"], buckets=LATENCY_BUCKETS,
+)
+CANDIDATES = Histogram(
+    "recapi_candidates", "Candidate set size by strategy or hybrid source.",
+    ["source"], buckets=SIZE_BUCKETS,
+)
+EMBEDDING_SECONDS = Histogram(
+    "recapi_embedding_batch_seconds", "Embedding model call latency per micro-batch.",
+    ["batcher"], buckets=LATENCY_BUCKETS,
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "recapi_embedding_batch_size", "Texts per embedding micro-batch.",
+    ["batcher"], buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+DB_QUERY_SECONDS = Histogram(
+    "recapi_db_query_seconds", "Database statement latency by statement verb.",
+    ["statement"], buckets=LATENCY_BUCKETS,
+)
+ERRORS = Counter(
+    "recapi_errors", "Errors by component and exception class, including ones that are handled.",
+    ["component", "exception"],
+)
+
+DB_VERBS = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+def strategy_label(by) -> str:
+    return by if by in STRATEGIES else "other"
+
+
+def statement_label(statement: str) -> str:
+    verb = statement.lstrip()[:6].upper()
+    return verb if verb in DB_VERBS else "OTHER"
+
+
+def record_error(component: str, exc: BaseException):
+    ERRORS.labels(component, type(exc).__name__).inc()
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing every HTTP request, labelled by route template (not the raw
+    path) and, for routes that take it, the `by` strategy. 5xx responses and unhandled
+    exceptions are also counted as errors.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            record_error("http", e)
+            raise
+        finally:
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            by = ""
+            if b"by=" in scope.get("query_string", b""):
+                for pair in scope["query_string"].decode("latin-1").split("&"):
+                    if pair.startswith("by="):
+                        by = strategy_label(pair[3:])
+            REQUEST_SECONDS.labels(scope["method"], template, by, str(status["code"])).observe(
+                time.perf_counter() - started
+            )
+            if status["code"] >= 500:
+                ERRORS.labels("http", str(status["code"])).inc()
+
+
+def render() -> tuple:
+    """(body, content type) for the /metrics endpoint."""
+    return generate_latest(), CONTENT_TYPE_LATEST
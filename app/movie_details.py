@@ -0,0 +1,76 @@
+"""
+Serialized movie detail payloads for GET /movies/movie and POST /movies/movies/batch.
+
+Movie metadata rarely changes after it is created, so each movie's JSON body is rendered once
+and kept in a byte-bounded LRU cache with a strong ETag (a hash of the body). A conditional
+request whose If-None-Match matches a cached ETag is answered without touching the database.
+"""
+import hashlib
+import sys
+from typing import Dict, Iterable, List, Tuple
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import TTLCache
+from app.config import settings
+from app.db import Movie
+from app.schemas import MovieDetail
+
+DETAIL_COLUMNS = (
+    Movie.id, Movie.title, Movie.description, Movie.genres, Movie.tags,
+    Movie.release_year, Movie.director, Movie.actors,
+)
+
+# Rough per-entry cost of the key, tuple and str/bytes headers on top of the payload itself.
+ENTRY_OVERHEAD = 200
+
+
+def entry_size(entry: Tuple[bytes, str]) -> int:
+    body, etag = entry
+    return len(body) + len(etag) + ENTRY_OVERHEAD
+
+
+movie_detail_cache = TTLCache(
+    max_entries=sys.maxsize,  # bounded by MOVIE_CACHE_MAX_BYTES instead
+    ttl_seconds=settings.MOVIE_CACHE_TTL_SECONDS,
+    max_bytes=settings.MOVIE_CACHE_MAX_BYTES,
+    sizeof=entry_size,
+)
+
+
+def render_detail(row) -> Tuple[bytes, str]:
+    """JSON body and strong ETag for one row of DETAIL_COLUMNS."""
+    body = MovieDetail.model_validate(dict(row._mapping)).model_dump_json().encode()
+    return body, '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+async def movie_details(movie_ids: Iterable[UUID], db: AsyncSession) -> Dict[UUID, Tuple[bytes, str]]:
+    """(body, etag) per found movie; cache misses are loaded with one query and cached."""
+    details, missing = {}, []
+    for movie_id in movie_ids:
+        entry = movie_detail_cache.get(movie_id)
+        if entry is None:
+            missing.append(movie_id)
+        else:
+            details[movie_id] = entry
+    if missing:
+        result = await db.execute(select(*DETAIL_COLUMNS).where(Movie.id.in_(missing)))
+        for row in result.all():
+            entry = render_detail(row)
+            movie_detail_cache.set(row.id, entry)
+            details[row.id] = entry
+    return details
+
+
+def invalidate_details(movie_ids: Iterable[UUID]):
+    """Call after a movie's metadata is created or changed."""
+    for movie_id in movie_ids:
+        movie_detail_cache.delete(movie_id)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 requires for this header)."""
+    candidates: List[str] = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
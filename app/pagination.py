@@ -0,0 +1,56 @@
+import base64
+import binascii
+import json
+from typing import Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import Select, select, tuple_
+
+from app.db import Movie
+
+LOOKUP_ORDERS = ("title", "id")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(order: str, movie_id: UUID, title: Optional[str] = None) -> str:
+    """Opaque token for the position right after (title, id), or (id), in the given order."""
+    payload = {"o": order, "i": str(movie_id)}
+    if order == "title":
+        payload["t"] = title
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, order: str) -> Tuple[Optional[str], UUID]:
+    """Returns (title, id); raises InvalidCursor for malformed tokens or tokens from another order."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        cursor_order, title, movie_id = payload["o"], payload.get("t"), UUID(payload["i"])
+    except (binascii.Error, UnicodeDecodeError, KeyError, TypeError, ValueError) as e:
+        raise InvalidCursor("Malformed cursor.") from e
+    if cursor_order != order or (order == "title" and not isinstance(title, str)):
+        raise InvalidCursor(f"Cursor does not match order={order}.")
+    return title, movie_id
+
+
+def keyset_lookup(order: str, cursor: Optional[str] = None) -> Select:
+    """
+    id/title/release_year in a stable keyset order, starting after `cursor`.
+
+    Each page is an index range scan on (title, id) or the primary key, so deep pages cost
+    the same as the first one, unlike OFFSET.
+    """
+    stmt = select(Movie.id, Movie.title, Movie.release_year)
+    if order == "title":
+        stmt = stmt.order_by(Movie.title, Movie.id)
+        if cursor:
+            title, movie_id = decode_cursor(cursor, order)
+            stmt = stmt.where(tuple_(Movie.title, Movie.id) > tuple_(title, movie_id))
+    else:
+        stmt = stmt.order_by(Movie.id)
+        if cursor:
+            _, movie_id = decode_cursor(cursor, order)
+            stmt = stmt.where(Movie.id > movie_id)
+    return stmt
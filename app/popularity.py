@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import math
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+from uuid import UUID
+
+from sqlalchemy import case, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import Movie
+from app.db.dialect import seconds_since
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def decay_rate() -> float:
+    """Per-second decay rate for POPULARITY_HALF_LIFE_DAYS."""
+    return math.log(2) / (settings.POPULARITY_HALF_LIFE_DAYS * 86400)
+
+
+class PopularityStore:
+    """
+    In-memory top-N snapshot of the most liked movies.
+
+    `movies.like_count` is the source of truth and is updated in the same transaction as each
+    like. `movies.popularity_score` is an exponentially time-decayed like count refreshed in the
+    background. The snapshot holds the top `size` movies by the configured mode ("count" or
+    "decayed"); like events adjust it in place and the background refresh reloads it, so the
+    popularity strategies never aggregate user_liked_movies.
+    """
+
+    def __init__(self, size: int = 1000, mode: str = "count"):
+        self.size = size
+        self.mode = mode
+        self.entries: Dict[UUID, dict] = {}
+        self.ready = False
+        self._sorted: Optional[List[dict]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def order_column(self):
+        return Movie.popularity_score if self.mode == "decayed" else Movie.like_count
+
+    def load(self, rows: Iterable):
+        """Replace the snapshot with (id, title, release_year, score) rows."""
+        with self._lock:
+            self.entries = {
+                mid: {"id": mid, "title": title, "release_year": year, "score": float(score)}
+                for mid, title, year, score in rows
+            }
+            self._sorted = None
+            self.ready = True
+
+    def bump(self, movie_id: UUID, delta: float, title: str = None, release_year: int = None, score: float = None):
+        """
+        Apply a like (+) or unlike (-) to the snapshot.
+
+        `score` is the movie's new absolute score when known (e.g. RETURNING like_count); a movie
+        outside the snapshot only enters when that score beats the current minimum.
+        """
+        with self._lock:
+            entry = self.entries.get(movie_id)
+            if entry is not None:
+                entry["score"] = score if score is not None else entry["score"] + delta
+            elif score is not None and title is not None:
+                floor = min((e["score"] for e in self.entries.values()), default=0.0)
+                if len(self.entries) < self.size or score > floor:
+                    self.entries[movie_id] = {"id": movie_id, "title": title, "release_year": release_year, "score": score}
+                    if len(self.entries) > self.size:
+                        lowest = min(self.entries.values(), key=lambda e: e["score"])
+                        del self.entries[lowest["id"]]
+            else:
+                return
+            self._sorted = None
+
+    def update_details(self, movie_id: UUID, title: str, release_year: Optional[int]):
+        """Refresh the title and year of a snapshot entry after the movie was edited."""
+        with self._lock:
+            entry = self.entries.get(movie_id)
+            if entry is not None:
+                entry["title"], entry["release_year"] = title, release_year
+
+    def ranked(self, limit: int, exclude: Sequence = ()) -> List[dict]:
+        """Snapshot entries with a positive score, best first."""
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(self.entries.values(), key=lambda e: e["score"], reverse=True)
+            ranked = self._sorted
+        excluded = set(exclude)
+        result = []
+        for entry in ranked:
+            if entry["score"] <= 0:
+                break
+            if entry["id"] in excluded:
+                continue
+            result.append(entry)
+            if len(result) == limit:
+                break
+        return result
+
+    def top(self, limit: int, exclude: Sequence = ()) -> List[dict]:
+        return [
+            {"id": e["id"], "title": e["title"], "release_year": e["release_year"]}
+            for e in self.ranked(limit, exclude)
+        ]
+
+    def can_serve(self, limit: int, exclude: Sequence = ()) -> bool:
+        return self.ready and limit + len(exclude) <= self.size
+
+
+async def popular_movies(db: AsyncSession, limit: int, exclude: Sequence = ()) -> List[dict]:
+    """Most popular movies from the snapshot, or from the indexed counter column."""
+    if popularity_store.can_serve(limit, exclude):
+        return popularity_store.top(limit, exclude)
+    column = popularity_store.order_column
+    stmt = select(Movie.id, Movie.title, Movie.release_year).where(column > 0).order_by(column.desc()).limit(limit)
+    if exclude:
+        stmt = stmt.where(~Movie.id.in_(exclude))
+    result = await db.execute(stmt)
+    return [{"id": mid, "title": title, "release_year": year} for mid, title, year in result.all()]
+
+
+async def popular_movie_scores(db: AsyncSession, limit: int, exclude: Sequence = ()) -> List[Tuple[UUID, float]]:
+    """Like popular_movies, but (movie_id, score) pairs for score fusion."""
+    if popularity_store.can_serve(limit, exclude):
+        return [(e["id"], e["score"]) for e in popularity_store.ranked(limit, exclude)]
+    column = popularity_store.order_column
+    stmt = select(Movie.id, column).where(column > 0).order_by(column.desc()).limit(limit)
+    if exclude:
+        stmt = stmt.where(~Movie.id.in_(exclude))
+    result = await db.execute(stmt)
+    return [(mid, float(score)) for mid, score in result.all()]
+
+
+async def change_like_counts(
+    session: AsyncSession,
+    movie_ids: Sequence[UUID],
+    delta: int,
+    score_delta: Union[float, Mapping[UUID, float], None] = None,
+) -> List[tuple]:
+    """
+    Add `delta` to like_count and `score_delta` to popularity_score for `movie_ids` inside the
+    caller's transaction. `score_delta` defaults to `delta`; pass a mapping for per-movie deltas
+    (e.g. the decayed weight of each removed like). The decayed score is only approximated here;
+    the background refresh recomputes it exactly.
+
+    Returns (id, title, release_year, like_count, popularity_score) rows so the snapshot can be
+    updated after commit.
+    """
+    if not movie_ids:
+        return []
+    score_delta = delta if score_delta is None else score_delta
+    if isinstance(score_delta, Mapping):
+        score_delta = case(dict(score_delta), value=Movie.id, else_=0.0)
+    result = await session.execute(
+        update(Movie)
+        .where(Movie.id.in_(movie_ids))
+        .values(like_count=Movie.like_count + delta, popularity_score=Movie.popularity_score + score_delta)
+        .returning(Movie.id, Movie.title, Movie.release_year, Movie.like_count, Movie.popularity_score)
+        .execution_options(synchronize_session=False)
+    )
+    return result.all()
+
+
+def apply_like_counts(rows: Iterable[tuple], delta: float):
+    """Push rows returned by change_like_counts into the snapshot (call after commit)."""
+    for movie_id, title, year, like_count, popularity_score in rows:
+        score = float(like_count) if popularity_store.mode == "count" else float(popularity_score)
+        popularity_store.bump(movie_id, delta, title, year, score=score)
+
+
+def unlike_weight(liked_at: Optional[datetime]) -> float:
+    """What one like made at `liked_at` still contributes to the decayed score."""
+    if liked_at is None:
+        return 1.0
+    return math.exp(-decay_rate() * max((datetime.utcnow() - liked_at).total_seconds(), 0.0))
+
+
+async def recount_likes(session: AsyncSession):
+    """Backfill like_count from user_liked_movies (one full aggregation)."""
+    await session.execute(text("""
+        UPDATE movies SET like_count = (
+            SELECT COUNT(*) FROM user_liked_movies AS l WHERE l.movie_id = movies.id
+        )
+    """))
+    await session.commit()
+
+
+async def refresh_decayed_scores(session: AsyncSession):
+    """Recompute popularity_score = sum(exp(-rate * age)) over each movie's likes."""
+    await session.execute(
+        text(f"""
+            UPDATE movies SET popularity_score = COALESCE((
+                SELECT SUM(EXP(-:rate * {seconds_since("l.liked_at", session)}))
+                FROM user_liked_movies AS l WHERE l.movie_id = movies.id
+            ), 0)
+        """),
+        {"rate": decay_rate()},
+    )
+    await session.commit()
+
+
+async def load_popularity_snapshot(session: AsyncSession, store: Optional[PopularityStore] = None):
+    if store is None:
+        store = popularity_store
+    column = store.order_column
+    result = await session.execute(
+        select(Movie.id, Movie.title, Movie.release_year, column)
+        .where(column > 0)
+        .order_by(column.desc())
+        .limit(store.size)
+    )
+    store.load(result.all())
+
+
+async def maintain_popularity(session_factory, store: Optional[PopularityStore] = None):
+    """Background loop: refresh decayed scores (in decayed mode) and reload the snapshot."""
+    if store is None:
+        store = popularity_store
+    while True:
+        await asyncio.sleep(settings.POPULARITY_REFRESH_SECONDS)
+        try:
+            async with session_factory() as session:
+                if store.mode == "decayed":
+                    await refresh_decayed_scores(session)
+                await load_popularity_snapshot(session, store)
+        except Exception:
+            logger.exception("Popularity refresh failed.")
+
+
+popularity_store = PopularityStore(size=settings.POPULARITY_TOP_N, mode=settings.POPULARITY_MODE)
@@ -1,94 +1,369 @@
-from typing import List
+import asyncio
+import time
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
 import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from sqlalchemy import literal
-from sqlalchemy.orm import load_only
-from app.db import Movie
+from sqlalchemy import select, func, desc
+from sqlalchemy.orm import load_only, sessionmaker
+from app.config import settings
+from app.cooccurrence import cooccurrence_index
+from app.popularity import popular_movies, popular_movie_scores
+from app.db import Movie, UserLikedMovie
+from app.vector_index import vector_index, load_catalog_vectors
+from app.vector_store import vector_store
+from app.metrics import CANDIDATES, HYBRID_SOURCE_SECONDS, RECOMMEND_SECONDS, record_error, strategy_label
 import logging
 
 logger = logging.getLogger("uvicorn.error")
 
-async def recommend(liked_movie_ids: List[str], db: AsyncSession, limit=10, by="content") -> List[dict]:
-    
+async def fetch_lite(movie_ids: List, db: AsyncSession) -> List[dict]:
+    """Load id/title/release_year for `movie_ids`, preserving their order."""
+    if not movie_ids:
+        return []
+    result = await db.execute(
+        select(Movie.id, Movie.title, Movie.release_year).where(Movie.id.in_(movie_ids))
+    )
+    rows = {mid: {"id": mid, "title": title, "release_year": year} for mid, title, year in result.all()}
+    return [rows[mid] for mid in movie_ids if mid in rows]
+
+async def nearest_movies(
+    query_vector,
+    db: AsyncSession,
+    limit: int,
+    exclude_ids: Sequence = (),
+    exclude_user_id: Optional[UUID] = None,
+) -> List[dict]:
+    """
+    Movies closest to `query_vector`, skipping `exclude_ids` and the movies liked by `exclude_user_id`.
+
+    Uses the in-process index when ANN_ENABLED, otherwise an exact search in the vector store.
+    """
+    if settings.ANN_ENABLED and vector_index.ready:
+        exclude = list(exclude_ids)
+        if exclude_user_id is not None:
+            result = await db.execute(select(UserLikedMovie.movie_id).where(UserLikedMovie.user_id == exclude_user_id))
+            exclude.extend(result.scalars().all())
+        hits = vector_index.search(query_vector, limit, exclude=exclude)
+        return await fetch_lite([mid for mid, _ in hits], db)
+
+    if not vector_store.in_process:
+        return await vector_store.nearest_lite(query_vector, db, limit, exclude_ids, exclude_user_id)
+    hits = await vector_store.nearest(query_vector, db, limit, exclude_ids, exclude_user_id)
+    return await fetch_lite([mid for mid, _ in hits], db)
+
+async def nearest_movie_scores(
+    query_vector,
+    db: AsyncSession,
+    limit: int,
+    exclude_ids: Sequence = (),
+    allowed_ids: Optional[Sequence] = None,
+) -> List[Tuple[UUID, float]]:
+    """
+    Like nearest_movies, but (movie_id, -distance) pairs for score fusion.
+    `allowed_ids` restricts the search to those movies (always answered by the vector store).
+    """
+    if settings.ANN_ENABLED and vector_index.ready and allowed_ids is None:
+        return [(mid, -float(dist)) for mid, dist in vector_index.search(query_vector, limit, exclude=list(exclude_ids))]
+
+    hits = await vector_store.nearest(query_vector, db, limit, exclude_ids=exclude_ids, allowed_ids=allowed_ids)
+    return [(mid, -dist) for mid, dist in hits]
+
+async def liked_vectors(liked_movie_ids: Sequence, db: AsyncSession) -> list:
+    if settings.ANN_ENABLED and vector_index.ready:
+        return list(vector_index.get_vectors(liked_movie_ids))
+    if vector_store.in_process:
+        await vector_store.ensure_loaded(db)
+        return list(vector_store.get_vectors(liked_movie_ids))
+    result = await db.execute(
+        select(Movie.vector).where(Movie.id.in_(liked_movie_ids))
+    )
+    return [row[0] for row in result if row[0] is not None]
+
+def co_liked_stmt(liked_movie_ids: Sequence, limit: int):
+    """Movies liked by users who liked any of `liked_movie_ids`, by number of such users."""
+    subq = (
+        select(UserLikedMovie.user_id)
+        .where(UserLikedMovie.movie_id.in_(liked_movie_ids))
+        .subquery()
+    )
+    return (
+        select(Movie.id, Movie.title, Movie.release_year, func.count(UserLikedMovie.user_id).label("score"))
+        .join(UserLikedMovie, Movie.id == UserLikedMovie.movie_id)
+        .where(UserLikedMovie.user_id.in_(subq))
+        .where(~Movie.id.in_(liked_movie_ids))
+        .group_by(Movie.id)
+        .order_by(desc("score"))
+        .limit(limit)
+    )
+
+HYBRID_SOURCES = ("content", "popularity", "cooccurrence")
+
+def hybrid_weights(overrides: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """HYBRID_WEIGHT_* settings, with any per-request `overrides` applied on top."""
+    weights = {
+        "content": settings.HYBRID_WEIGHT_CONTENT,
+        "popularity": settings.HYBRID_WEIGHT_POPULARITY,
+        "cooccurrence": settings.HYBRID_WEIGHT_COOCCURRENCE,
+    }
+    weights.update(overrides or {})
+    return weights
+
+def fuse_scores(
+    candidates: Dict[str, List[Tuple[UUID, float]]],
+    weights: Dict[str, float],
+    limit: int,
+    method: str = "rrf",
+    rrf_k: int = 60,
+) -> List[Tuple[UUID, float]]:
+    """
+    Fuse per-source ranked (movie_id, score) lists into one top-`limit` list.
+
+    - rrf: sum over sources of weight / (rrf_k + rank), rank starting at 1.
+    - weighted: sum over sources of weight * score, scores min-max normalized per source.
+
+    A movie missing from a source contributes 0 for it. Ties keep first-seen order.
+    """
+    sources = [name for name, hits in candidates.items() if hits and weights.get(name, 0)]
+    column: Dict[UUID, int] = {}
+    for name in sources:
+        for mid, _ in candidates[name]:
+            column.setdefault(mid, len(column))
+    if not column:
+        return []
+
+    matrix = np.zeros((len(sources), len(column)), dtype=np.float64)
+    for row, name in enumerate(sources):
+        hits = candidates[name]
+        cols = np.fromiter((column[mid] for mid, _ in hits), dtype=np.int64, count=len(hits))
+        if method == "weighted":
+            scores = np.fromiter((score for _, score in hits), dtype=np.float64, count=len(hits))
+            span = scores.max() - scores.min()
+            matrix[row, cols] = (scores - scores.min()) / span if span > 0 else 1.0
+        else:
+            matrix[row, cols] = 1.0 / (rrf_k + np.arange(1, len(hits) + 1))
+
+    fused = np.array([weights[name] for name in sources]) @ matrix
+    limit = min(limit, len(fused))
+    top = np.argpartition(-fused, limit - 1)[:limit]
+    top = np.sort(top)
+    top = top[np.argsort(-fused[top], kind="stable")]
+    ids = list(column)
+    return [(ids[i], float(fused[i])) for i in top]
+
+def sibling_sessions(db: AsyncSession):
+    """
+    Session factory on the same bind as `db`, so concurrent legs use the database the request
+    uses (including get_db overrides) instead of the global engine.
+    """
+    return sessionmaker(db.bind, class_=AsyncSession, expire_on_commit=False)
+
+async def hybrid_candidates(
+    liked_movie_ids: Sequence,
+    limit: int,
+    weights: Dict[str, float],
+    session_factory,
+    timings: Optional[Dict[str, float]] = None,
+) -> Dict[str, List[Tuple[UUID, float]]]:
+    """
+    Fetch every hybrid source with a non-zero weight concurrently, each leg on its own session
+    from `session_factory` (see `sibling_sessions`).
+
+    Per-leg wall time in milliseconds is recorded into `timings` when given.
+    """
+
+    async def content(db):
+        vectors = await liked_vectors(liked_movie_ids, db)
+        if not vectors:
+            return []
+        return await nearest_movie_scores(np.mean(vectors, axis=0), db, limit, exclude_ids=liked_movie_ids)
+
+    async def popularity(db):
+        return await popular_movie_scores(db, limit, exclude=liked_movie_ids)
+
+    async def cooccurrence(db):
+        if settings.COOCCURRENCE_ENABLED and cooccurrence_index.ready:
+            return cooccurrence_index.score(liked_movie_ids, limit)
+        result = await db.execute(co_liked_stmt(liked_movie_ids, limit))
+        return [(mid, float(score)) for mid, _, _, score in result.all()]
+
+    legs = {"content": content, "popularity": popularity, "cooccurrence": cooccurrence}
+
+    async def timed(name):
+        started = time.perf_counter()
+        try:
+            async with session_factory() as db:
+                return await legs[name](db)
+        finally:
+            seconds = time.perf_counter() - started
+            HYBRID_SOURCE_SECONDS.labels(name).observe(seconds)
+            if timings is not None:
+                timings[name] = seconds * 1000
+
+    names = [name for name in HYBRID_SOURCES if weights.get(name, 0) > 0]
+    results = await asyncio.gather(*(timed(name) for name in names), return_exceptions=True)
+    candidates = {}
+    for name, hits in zip(names, results):
+        if isinstance(hits, Exception):
+            logger.error(f"Hybrid source {name} failed: {hits!r}")
+            record_error(f"hybrid_{name}", hits)
+            hits = []
+        CANDIDATES.labels(name).observe(len(hits))
+        candidates[name] = hits
+    return candidates
+
+async def recommend(
+    liked_movie_ids: List[str],
+    db: AsyncSession,
+    limit=10,
+    by="content",
+    weights: Optional[Dict[str, float]] = None,
+    fusion: Optional[str] = None,
+    timings: Optional[Dict[str, float]] = None,
+) -> List[dict]:
+    """
+    `weights` and `fusion` only apply to by="hybrid" and default to the HYBRID_* settings.
+    Hybrid per-source timings (ms) are written into `timings` when given.
+    """
+    started = time.perf_counter()
+    label = strategy_label(by)
     try:
-        if by == "content":
-            result = await db.execute(
-                select(Movie.vector).where(Movie.id.in_(liked_movie_ids))
-            )
-            vectors = [row[0] for row in result if row[0] is not None]
-            if not vectors:
-                logger.warning("No valid vectors found for liked movies.")
-                return []
-
-            avg_vector = np.mean(vectors, axis=0).tolist()
-
-            stmt = (
-                select(Movie.id, Movie.title, Movie.release_year)
-                .where(~Movie.id.in_(liked_movie_ids))
-                .order_by(Movie.vector.op('<->')(literal(avg_vector)))
-                .limit(limit)
-            )
-            result = await db.execute(stmt)
-            movies = result.all()
-            return [{"id": mid, "title": title, "release_year": year} for mid, title, year in movies]
-        if by == "latest":
-            stmt = select(Movie.id, Movie.title, Movie.release_year).order_by(Movie.release_year.desc()).limit(limit)
-            result = await db.execute(stmt) 
-            movies = result.all()
-            return [{"id": mid, "title": title, "release_year": year} for mid, title, year in movies]
-        if by == "popularity":
-        
+        movies = await _recommend(liked_movie_ids, db, limit, by, weights, fusion, timings)
+    except Exception as e:
+        logger.exception("Failed to generate recommendations")
+        record_error(f"recommend_{label}", e)
+        movies = []
+    RECOMMEND_SECONDS.labels(label).observe(time.perf_counter() - started)
+    CANDIDATES.labels(label).observe(len(movies or []))
+    return movies
+
+async def _recommend(liked_movie_ids, db, limit, by, weights, fusion, timings) -> List[dict]:
+    if by == "content":
+        vectors = await liked_vectors(liked_movie_ids, db)
+        if not vectors:
+            logger.warning("No valid vectors found for liked movies.")
+            return []
+
+        avg_vector = np.mean(vectors, axis=0)
+        return await nearest_movies(avg_vector, db, limit, exclude_ids=liked_movie_ids)
+    if by == "latest":
+        stmt = select(Movie.id, Movie.title, Movie.release_year).order_by(Movie.release_year.desc()).limit(limit)
+        result = await db.execute(stmt) 
+        movies = result.all()
+        return [{"id": mid, "title": title, "release_year": year} for mid, title, year in movies]
+    if by == "popularity":
+        return await popular_movies(db, limit)
+    if by == "user_based":
+        if settings.COOCCURRENCE_ENABLED and cooccurrence_index.ready:
+            hits = cooccurrence_index.score(liked_movie_ids, limit)
+            return await fetch_lite([mid for mid, _ in hits], db)
+
+        stmt = co_liked_stmt(liked_movie_ids, limit)
+        result = await db.execute(stmt)
+        movies = result.all()
+        return [{"id": mid, "title": title, "release_year": year} for mid, title, year, _ in movies]
+
+    if by == "hybrid":
+        weights = hybrid_weights(weights)
+        candidates = await hybrid_candidates(
+            liked_movie_ids, limit * settings.HYBRID_CANDIDATE_FACTOR, weights, sibling_sessions(db), timings
+        )
+        started = time.perf_counter()
+        fused = fuse_scores(candidates, weights, limit, fusion or settings.HYBRID_FUSION, settings.HYBRID_RRF_K)
+        if timings is not None:
+            timings["fusion"] = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        movies = await fetch_lite([mid for mid, _ in fused], db)
+        if timings is not None:
+            timings["fetch"] = (time.perf_counter() - started) * 1000
+        return movies
+
+def top_k_batch(
+    catalog: np.ndarray,
+    tastes: np.ndarray,
+    exclude_rows: Sequence[Sequence[int]],
+    k: int,
+    metric: str = "l2",
+) -> np.ndarray:
+    """
+    Rank the catalog for many taste vectors with one matrix multiply.
+
+    Returns an array of shape (len(tastes), k) with catalog row indexes, best first.
+    Rows listed in `exclude_rows[i]` are never returned for taste `i`.
+    """
+    scores = tastes @ catalog.T
+    if metric == "cosine":
+        norms = np.linalg.norm(catalog, axis=1)
+        scores = scores / np.where(norms == 0, 1, norms)
+    else:
+        # ||x - q||^2 = ||x||^2 - 2 x.q + ||q||^2, and ||q||^2 does not change the ranking
+        scores = 2 * scores - (catalog ** 2).sum(axis=1)
+    for i, rows in enumerate(exclude_rows):
+        scores[i, list(rows)] = -np.inf
+
+    k = min(k, catalog.shape[0])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    return np.where(np.isfinite(top_scores), top, -1)
+
+async def recommend_batch(entries: List, db: AsyncSession, limit: int = 10) -> AsyncIterator[dict]:
+    """
+    Recommend for many users at once, yielding one result dict per entry in input order.
+
+    Each entry has either a `user_id` (likes are read from user_liked_movies) or explicit
+    `liked_movie_ids`. Entries are scored in chunks of at most BATCH_RECOMMEND_CHUNK_SIZE, further
+    capped so the score matrix stays under BATCH_RECOMMEND_MAX_SCORES floats, which keeps memory
+    flat for very large batches.
+    """
+    if vector_index.ready:
+        catalog_ids, catalog = vector_index.ids, vector_index.vectors
+    elif vector_store.in_process:
+        await vector_store.ensure_loaded(db)
+        catalog_ids, catalog = list(vector_store.ids), vector_store.vectors
+    else:
+        catalog_ids, catalog = await load_catalog_vectors(db)
+    row_of: Dict[UUID, int] = {movie_id: row for row, movie_id in enumerate(catalog_ids)}
+    chunk_size = max(1, min(
+        settings.BATCH_RECOMMEND_CHUNK_SIZE,
+        settings.BATCH_RECOMMEND_MAX_SCORES // max(1, len(catalog_ids)),
+    ))
+
+    for start in range(0, len(entries), chunk_size):
+        chunk = entries[start:start + chunk_size]
+        user_ids = [entry.user_id for entry in chunk if entry.liked_movie_ids is None and entry.user_id]
+        likes: Dict[UUID, List[UUID]] = {user_id: [] for user_id in user_ids}
+        if user_ids:
             result = await db.execute(
-            select(Movie, func.count(UserLikedMovie.user_id).label("popularity"))
-            .join(UserLikedMovie, Movie.id == UserLikedMovie.movie_id)
-            .group_by(Movie.id)
-            .order_by(desc("popularity"))
-            .limit(limit)
-            )
-            popular_movies = result.scalars().all() 
-            return popular_movies if popular_movies else {"msg": "no user interactions yet"}
-        if by == "user_based":
-            subq = (
-                select(UserLikedMovie.user_id)
-                .where(UserLikedMovie.movie_id.in_(liked_movie_ids))
-                .subquery()
-            )
-            stmt = (
-                select(Movie.id, Movie.title, Movie.release_year, func.count(UserLikedMovie.user_id).label("score"))
-                .join(UserLikedMovie, Movie.id == UserLikedMovie.movie_id)
-                .where(UserLikedMovie.user_id.in_(subq))
-                .where(~Movie.id.in_(liked_movie_ids))
-                .group_by(Movie.id)
-                .order_by(desc("score"))
-                .limit(limit)
+                select(UserLikedMovie.user_id, UserLikedMovie.movie_id).where(UserLikedMovie.user_id.in_(user_ids))
             )
-            result = await db.execute(stmt)
-            movies = result.all()
-            return [{"id": mid, "title": title, "release_year": year} for mid, title, year, _ in movies]
-
-        if by == "hybrid":
-            content_res = await recommend(liked_movie_ids, db, limit*2, by="content")
-            content_ids = {m['id'] for m in content_res}
-            pop_stmt = (
-                select(Movie.id, Movie.title, Movie.release_year, func.count(UserLikedMovie.user_id).label("popularity"))
-                .join(UserLikedMovie, Movie.id == UserLikedMovie.movie_id)
-                .where(~Movie.id.in_(liked_movie_ids))
-                .limit(limit*2)
-                .group_by(Movie.id)
-                .order_by(desc("popularity"))
-            )
-            pop_result = await db.execute(pop_stmt)
-            pop_movies = pop_result.all()
-            
-            combined = {m['id']: m for m in content_res}
-            for mid, title, year, _ in pop_movies:
-                if mid not in combined:
-                    combined[mid] = {"id": mid, "title": title, "release_year": year}
-                if len(combined) >= limit:
-                    break
-
-            return list(combined.values())[:limit]
-    except Exception:
-        logger.exception("Failed to generate recommendations")
-        return []
\ No newline at end of file
+            for user_id, movie_id in result.all():
+                likes[user_id].append(movie_id)
+
+        liked_rows, tastes, scored = [], [], []
+        for i, entry in enumerate(chunk):
+            liked = entry.liked_movie_ids if entry.liked_movie_ids is not None else likes.get(entry.user_id, [])
+            rows = [row_of[movie_id] for movie_id in liked if movie_id in row_of]
+            if rows:
+                liked_rows.append(rows)
+                tastes.append(catalog[rows].mean(axis=0))
+                scored.append(i)
+
+        results: List[Optional[List[UUID]]] = [None] * len(chunk)
+        if scored:
+            top = top_k_batch(catalog, np.stack(tastes), liked_rows, limit, settings.VECTOR_METRIC)
+            for i, rows in zip(scored, top):
+                results[i] = [catalog_ids[row] for row in rows if row >= 0]
+
+        details = {m["id"]: m for m in await fetch_lite(
+            list({movie_id for ids in results if ids for movie_id in ids}), db
+        )}
+        for offset, (entry, ids) in enumerate(zip(chunk, results)):
+            item = {"index": start + offset, "user_id": entry.user_id}
+            if ids is None:
+                item["recommendations"] = []
+                item["error"] = "No valid vectors found for liked movies."
+            else:
+                item["recommendations"] = [details[movie_id] for movie_id in ids if movie_id in details]
+            yield item
@@ -0,0 +1,189 @@
+"""
+Background re-embedding of the catalog after the embedding model or the build_movie_text format
+changes (see `app.utils.embedding_version`).
+
+Each movie records the version of its `vector`. The job embeds stale movies in batches into the
+shadow column `vector_next`, so recommendations keep using the old, mutually consistent vectors
+meanwhile. Every committed batch is a checkpoint: a restarted job picks up the movies that still
+have no shadow vector. Between batches the job sleeps so it works at most REEMBED_DUTY_CYCLE of
+the time and leaves the CPU to live traffic.
+
+When no stale movie is left, the shadow vectors are copied into `vector` with one UPDATE in a
+single transaction, so readers see either the old or the new model, never a mix, and a crash
+leaves the old catalog untouched. After the commit user taste vectors are recomputed and the
+in-process vector store and index rebuilt and swapped in.
+
+Movies created, seeded or synced while the job runs are embedded with the new model straight
+into `vector`. Until the switch their neighbours are computed across the two models.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import recommendation_cache
+from app.config import settings
+from app.db import AsyncSessionLocal, Movie
+from app.movie_details import DETAIL_COLUMNS
+from app.sync import to_movie
+from app.taste import recompute_tastes
+from app.utils import embedding_version, vectorize_batch
+from app.vector_index import build_vector_index
+from app.vector_store import vector_store
+
+logger = logging.getLogger("uvicorn.error")
+
+reembed_status = {
+    "state": "idle", "version": None, "started_at": None, "finished_at": None, "error": None,
+    "pending": 0, "embedded": 0, "switched": 0, "rows_per_s": 0.0,
+}
+
+
+def is_stale(version: str):
+    return or_(Movie.embedding_version.is_(None), Movie.embedding_version != version)
+
+
+def is_pending(version: str):
+    """Stale and not yet re-embedded into the shadow column."""
+    return and_(
+        is_stale(version),
+        or_(Movie.vector_next_version.is_(None), Movie.vector_next_version != version),
+    )
+
+
+async def catalog_versions(session: AsyncSession) -> Dict[Optional[str], int]:
+    result = await session.execute(
+        select(Movie.embedding_version, func.count()).group_by(Movie.embedding_version)
+    )
+    return dict(result.all())
+
+
+async def count_stale(session: AsyncSession, version: str = None) -> int:
+    version = version or embedding_version()
+    return (await session.execute(select(func.count()).select_from(Movie).where(is_stale(version)))).scalar_one()
+
+
+async def stamp_unversioned_vectors(session: AsyncSession) -> int:
+    """
+    Attribute vectors stored before versions were recorded to the configured model, so upgrading
+    does not trigger a full re-embed. Called once, when the column is added.
+    """
+    result = await session.execute(
+        update(Movie)
+        .where(Movie.embedding_version.is_(None), Movie.vector.isnot(None))
+        .values(embedding_version=embedding_version())
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    return result.rowcount
+
+
+async def reembed_batch(
+    session: AsyncSession, version: str, after: Optional[UUID], batch_size: int
+) -> Tuple[Optional[UUID], int]:
+    """Embed the next `batch_size` pending movies (by id) into `vector_next` and commit."""
+    query = select(*DETAIL_COLUMNS).where(is_pending(version)).order_by(Movie.id).limit(batch_size)
+    if after is not None:
+        query = query.where(Movie.id > after)
+    rows = (await session.execute(query)).all()
+    if not rows:
+        return after, 0
+
+    vectors = await asyncio.to_thread(
+        vectorize_batch, [to_movie(row) for row in rows], settings.SEED_ENCODE_BATCH_SIZE
+    )
+    await session.execute(
+        update(Movie),
+        [
+            {"id": row.id, "vector_next": vector, "vector_next_version": version}
+            for row, vector in zip(rows, vectors)
+        ],
+    )
+    await session.commit()
+    return rows[-1].id, len(rows)
+
+
+async def switch_vectors(session_factory, version: str, status: dict) -> int:
+    """Copy every shadow vector into `vector` in one transaction; returns how many movies switched."""
+    async with session_factory() as session:
+        result = await session.execute(
+            update(Movie)
+            .where(Movie.vector_next_version == version, is_stale(version))
+            .values(vector=Movie.vector_next, embedding_version=Movie.vector_next_version)
+            .execution_options(synchronize_session=False)
+        )
+        # Also drops shadow vectors of movies rewritten at the new version while the job ran.
+        await session.execute(
+            update(Movie)
+            .where(Movie.vector_next_version.isnot(None))
+            .values(vector_next=None, vector_next_version=None)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+    switched = status["switched"] = result.rowcount
+    if not switched:
+        return 0
+
+    async with session_factory() as session:
+        users = await recompute_tastes(session)
+    async with session_factory() as session:
+        if settings.ANN_ENABLED:
+            await build_vector_index(session)
+        if vector_store.in_process:
+            await vector_store.load(session)
+    logger.info(f"Switched {switched} movie vectors to {version}; {users} taste vectors recomputed")
+    return switched
+
+
+async def run_reembed(
+    batch_size: int = None, duty_cycle: float = None, session_factory=None, status: dict = None
+):
+    """Background job: re-embed every stale movie, then switch. Safe to re-run after a crash."""
+    if batch_size is None:
+        batch_size = settings.REEMBED_BATCH_SIZE
+    if duty_cycle is None:
+        duty_cycle = settings.REEMBED_DUTY_CYCLE
+    if session_factory is None:
+        session_factory = AsyncSessionLocal
+    if status is None:
+        status = reembed_status
+
+    version = embedding_version()
+    status.update(
+        state="running", version=version, started_at=time.time(), finished_at=None, error=None,
+        embedded=0, switched=0, rows_per_s=0.0,
+    )
+    try:
+        async with session_factory() as session:
+            status["pending"] = (
+                await session.execute(select(func.count()).select_from(Movie).where(is_pending(version)))
+            ).scalar_one()
+        logger.info(f"Re-embedding {status['pending']} movies with {version}")
+
+        started, after = time.perf_counter(), None
+        while True:
+            batch_started = time.perf_counter()
+            async with session_factory() as session:
+                after, count = await reembed_batch(session, version, after, batch_size)
+            if not count:
+                break
+            status["embedded"] += count
+            status["pending"] = max(status["pending"] - count, 0)
+            status["rows_per_s"] = status["embedded"] / (time.perf_counter() - started)
+            logger.info(f"Re-embed: {status['embedded']} movies embedded, {status['pending']} pending")
+            if duty_cycle < 1:
+                await asyncio.sleep((time.perf_counter() - batch_started) * (1 - duty_cycle) / duty_cycle)
+
+        status["state"] = "switching"
+        await switch_vectors(session_factory, version, status)
+        if status["switched"]:
+            await recommendation_cache.invalidate_catalog()
+        status.update(state="done", finished_at=time.time())
+        logger.info(f"Re-embed finished: {status}")
+    except Exception as e:
+        logger.exception("Re-embedding failed.")
+        status.update(state="failed", finished_at=time.time(), error=str(e))
@@ -1,5 +1,6 @@
 from uuid import UUID
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, List, Literal, Optional
 from pydantic import BaseModel
 import json
 import ast
@@ -47,6 +48,12 @@ class MovieBase(BaseModel):
 class MovieCreate(MovieBase):
     pass
 
+class MovieDetail(MovieBase):
+    id: UUID
+
+class MovieBatchRequest(BaseModel):
+    ids: List[UUID]
+
 class Movie(MovieBase):
     id: UUID
     vector: Optional[List[float]] = None
@@ -56,10 +63,35 @@ class Movie(MovieBase):
 
 class MovieRecommendationRequest(BaseModel):
     liked_movie_ids: List[str]
+    weights: Optional[Dict[str, float]] = None
+    fusion: Optional[str] = None
+
+class MovieSearchResponse(BaseModel):
+    query: str
+    results: List[MovieLite]
+    query_cache_hit: bool
+    query_cache_hit_rate: float
+    embedding_ms: float
+    search_ms: float
+
+class LikeEvent(BaseModel):
+    user_id: UUID
+    movie_id: UUID
+    action: Literal["like", "unlike"] = "like"
+    timestamp: Optional[datetime] = None
+
+class BatchRecommendationEntry(BaseModel):
+    user_id: Optional[UUID] = None
+    liked_movie_ids: Optional[List[UUID]] = None
+
+class BatchRecommendationRequest(BaseModel):
+    entries: List[BatchRecommendationEntry]
 
 class DBSyncRequest(BaseModel):
-    host: str
-    port: int
-    user: str
-    password: str
-    db_name: str 
\ No newline at end of file
+    driver: Literal["postgresql", "sqlite"] = "postgresql"
+    host: Optional[str] = None
+    port: Optional[int] = None
+    user: Optional[str] = None
+    password: Optional[str] = None
+    db_name: str  # database name, or the file path for sqlite
+    table: str = "movies" 
\ No newline at end of file
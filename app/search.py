@@ -0,0 +1,91 @@
+import re
+import time
+from typing import List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import TTLCache
+from app.config import settings
+from app.embedding_executor import query_batcher
+from app.facet_index import ensure_facet_index
+from app.recommendation import fetch_lite, nearest_movie_scores, top_k_batch
+from app.vector_index import vector_index
+
+query_cache = TTLCache(max_entries=settings.QUERY_CACHE_SIZE)
+
+
+def normalize_query(q: str) -> str:
+    """Collapse whitespace and case so trivially different spellings share a cache entry."""
+    return re.sub(r"\s+", " ", q).strip().casefold()
+
+
+async def embed_query(q: str) -> Tuple[np.ndarray, bool]:
+    """Embedding for a search query and whether it came from the query cache."""
+    key = normalize_query(q)
+    vector = query_cache.get(key)
+    if vector is not None:
+        return vector, True
+    vector = (await query_batcher.embed_texts([key]))[0]
+    query_cache.set(key, vector)
+    return vector, False
+
+
+def query_cache_hit_rate() -> float:
+    lookups = query_cache.hits + query_cache.misses
+    return query_cache.hits / lookups if lookups else 0.0
+
+
+async def search_vector(query_vector, db: AsyncSession, limit: int, allowed: Optional[Sequence[UUID]] = None) -> List[UUID]:
+    """
+    Ids of the `limit` movies nearest to `query_vector`, restricted to `allowed` when given.
+
+    Small allowed sets are searched exactly (in memory when the ANN index is loaded, otherwise
+    with an id filter in SQL). Sets above SEARCH_PREFILTER_MAX_IDS are post-filtered from an
+    unfiltered search of limit * SEARCH_OVERFETCH candidates instead.
+    """
+    if allowed is None:
+        return [mid for mid, _ in await nearest_movie_scores(query_vector, db, limit)]
+    if not allowed:
+        return []
+
+    if len(allowed) <= settings.SEARCH_PREFILTER_MAX_IDS:
+        if settings.ANN_ENABLED and vector_index.ready:
+            ids = [mid for mid in allowed if mid in vector_index.id_to_row]
+            if not ids:
+                return []
+            catalog = vector_index.get_vectors(ids)
+            query = np.asarray(query_vector, dtype=np.float32)[None, :]
+            top = top_k_batch(catalog, query, [[]], limit, settings.VECTOR_METRIC)[0]
+            return [ids[row] for row in top if row >= 0]
+        return [mid for mid, _ in await nearest_movie_scores(query_vector, db, limit, allowed_ids=allowed)]
+
+    allowed = set(allowed)
+    hits = await nearest_movie_scores(query_vector, db, limit * settings.SEARCH_OVERFETCH)
+    return [mid for mid, _ in hits if mid in allowed][:limit]
+
+
+async def search_movies(q: str, db: AsyncSession, limit: int, filters: Optional[dict] = None) -> dict:
+    """Semantic search for `q`; `filters` as produced by the movie_filters dependency."""
+    started = time.perf_counter()
+    query_vector, cache_hit = await embed_query(q)
+    embedding_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    allowed = None
+    if filters and (any(filters["filters"].values()) or filters["year_min"] is not None or filters["year_max"] is not None):
+        index = await ensure_facet_index(db)
+        allowed = index.filter(limit=len(index), **filters)
+    ids = await search_vector(query_vector, db, limit, allowed)
+    results = await fetch_lite(ids, db)
+    search_ms = (time.perf_counter() - started) * 1000
+
+    return {
+        "query": q,
+        "results": results,
+        "query_cache_hit": cache_hit,
+        "query_cache_hit_rate": query_cache_hit_rate(),
+        "embedding_ms": embedding_ms,
+        "search_ms": search_ms,
+    }
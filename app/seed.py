@@ -0,0 +1,173 @@
+"""
+Catalog seeding pipeline.
+
+Streams the processed movies CSV in chunks, embeds every chunk with one batched
+model call and bulk-inserts the rows. Progress is checkpointed after each chunk,
+so an interrupted run picks up where it stopped.
+
+Usage:
+    python -m app.seed [--csv processed_movies.csv] [--chunk-size 1000] [--reset]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional
+from uuid import UUID, uuid5
+
+import pandas as pd
+from sqlalchemy import select, text
+
+from app.config import settings
+from app.db import engine, AsyncSessionLocal, Base, Movie
+from app.db.dialect import insert_ignore, is_sqlite
+from app.schemas import MovieCreate, parse_stringified_list
+from app.utils import embedding_version, flush_embedding_cache, movie_content_hash, vectorize_batch
+
+logger = logging.getLogger("uvicorn.error")
+
+LIST_COLUMNS = ["genres", "tags", "actors"]
+SEED_NAMESPACE = UUID("6f1d7c1e-6a57-4f0b-9a43-3d2b8f1f6c11")
+
+
+def seed_movie_id(row: int, title: str, release_year) -> UUID:
+    """
+    Deterministic id so re-running a chunk never duplicates movies. The CSV row number is part
+    of the key, so different movies sharing a title and year are all kept.
+    """
+    return uuid5(SEED_NAMESPACE, f"{row}|{title}|{release_year}")
+
+
+def read_chunks(csv_path: str, chunk_size: int, skip_rows: int = 0) -> Iterator[List[MovieCreate]]:
+    """Yield the CSV as lists of MovieCreate, `chunk_size` rows at a time."""
+    reader = pd.read_csv(
+        csv_path,
+        chunksize=chunk_size,
+        skiprows=range(1, skip_rows + 1) if skip_rows else None,
+    )
+    for df in reader:
+        for col in LIST_COLUMNS:
+            df[col] = df[col].apply(parse_stringified_list)
+        df = df.astype(object).where(df.notna(), None)
+        yield [MovieCreate(**row) for row in df.to_dict(orient="records")]
+
+
+def read_checkpoint(path: str, csv_path: str) -> Optional[int]:
+    """Rows done by an unfinished seed of `csv_path`, or None when there is none."""
+    checkpoint = Path(path)
+    if not checkpoint.exists():
+        return None
+    try:
+        data = json.loads(checkpoint.read_text())
+    except (OSError, ValueError):
+        logger.warning(f"Ignoring unreadable seed checkpoint {path}")
+        return None
+    if data.get("csv") != str(Path(csv_path).resolve()):
+        return None
+    return int(data.get("rows_done", 0))
+
+
+def load_checkpoint(path: str, csv_path: str) -> int:
+    return read_checkpoint(path, csv_path) or 0
+
+
+def save_checkpoint(path: str, csv_path: str, rows_done: int):
+    checkpoint = Path(path)
+    tmp = checkpoint.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"csv": str(Path(csv_path).resolve()), "rows_done": rows_done}))
+    tmp.replace(checkpoint)
+
+
+async def insert_chunk(movies: List[MovieCreate], encode_batch_size: int, first_row: int = 0) -> int:
+    """Embed and insert one chunk; `first_row` is the CSV row number of its first movie."""
+    vectors = await asyncio.to_thread(vectorize_batch, movies, encode_batch_size)
+    version = embedding_version()
+    rows = [
+        {
+            **movie.model_dump(),
+            "id": seed_movie_id(first_row + i, movie.title, movie.release_year),
+            "vector": vector,
+            "content_hash": movie_content_hash(movie),
+            "embedding_version": version,
+        }
+        for i, (movie, vector) in enumerate(zip(movies, vectors))
+    ]
+    async with AsyncSessionLocal() as session:
+        await session.execute(insert_ignore(session, Movie, [Movie.id]), rows)
+        await session.commit()
+    return len(rows)
+
+
+async def seed_catalog(
+    csv_path: str = settings.SEED_CSV_PATH,
+    chunk_size: int = settings.SEED_CHUNK_SIZE,
+    encode_batch_size: int = settings.SEED_ENCODE_BATCH_SIZE,
+    checkpoint_path: str = settings.SEED_CHECKPOINT_PATH,
+    reset: bool = False,
+) -> int:
+    """
+    Load the catalog CSV into the movies table.
+
+    Returns the number of rows processed in this run.
+    """
+    skip_rows = 0 if reset else load_checkpoint(checkpoint_path, csv_path)
+    if skip_rows:
+        logger.info(f"Resuming seed from row {skip_rows}")
+
+    # Written before the first chunk, so a run interrupted at any point is known to be unfinished.
+    save_checkpoint(checkpoint_path, csv_path, skip_rows)
+    rows_done = skip_rows
+    started = time.perf_counter()
+    for movies in read_chunks(csv_path, chunk_size, skip_rows):
+        rows_done += await insert_chunk(movies, encode_batch_size, first_row=rows_done)
+        save_checkpoint(checkpoint_path, csv_path, rows_done)
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Seeded {rows_done} rows ({(rows_done - skip_rows) / elapsed:.1f} rows/s)"
+        )
+
+    Path(checkpoint_path).unlink(missing_ok=True)
+    flush_embedding_cache()
+    processed = rows_done - skip_rows
+    elapsed = time.perf_counter() - started
+    logger.info(f"Seeding finished: {processed} rows in {elapsed:.1f}s")
+    return processed
+
+
+async def seed_if_empty():
+    """Seed the catalog when the movies table has no rows yet, or resume an interrupted seed."""
+    csv_path, checkpoint_path = settings.SEED_CSV_PATH, settings.SEED_CHECKPOINT_PATH
+    if read_checkpoint(checkpoint_path, csv_path) is None:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(Movie.id).limit(1))
+            if result.scalar_one_or_none() is not None:
+                return
+    await seed_catalog(csv_path=csv_path, checkpoint_path=checkpoint_path)
+
+
+async def main(args):
+    async with engine.begin() as conn:
+        if not is_sqlite(conn):
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector;"))
+        await conn.run_sync(Base.metadata.create_all)
+    await seed_catalog(
+        csv_path=args.csv,
+        chunk_size=args.chunk_size,
+        encode_batch_size=args.encode_batch_size,
+        checkpoint_path=args.checkpoint,
+        reset=args.reset,
+    )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the movie catalog from a CSV file.")
+    parser.add_argument("--csv", default=settings.SEED_CSV_PATH)
+    parser.add_argument("--chunk-size", type=int, default=settings.SEED_CHUNK_SIZE)
+    parser.add_argument("--encode-batch-size", type=int, default=settings.SEED_ENCODE_BATCH_SIZE)
+    parser.add_argument("--checkpoint", default=settings.SEED_CHECKPOINT_PATH)
+    parser.add_argument("--reset", action="store_true", help="Ignore any existing checkpoint")
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(parser.parse_args()))
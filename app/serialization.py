@@ -0,0 +1,76 @@
+"""
+Field projection and fast JSON rendering for movie list responses.
+
+Only the requested columns are selected, `vector` is left out unless asked for, and vectors
+can be sent as base64 float32/float16 instead of 384 JSON numbers. Bodies are rendered with
+orjson when it is installed.
+"""
+import base64
+import json
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MOVIE_FIELDS = ("id", "title", "description", "genres", "tags", "release_year", "director", "actors", "vector")
+DEFAULT_MOVIE_FIELDS = tuple(field for field in MOVIE_FIELDS if field != "vector")
+
+# float: JSON array; f32 / f16: base64 of the little-endian float32 / float16 bytes
+VECTOR_ENCODINGS = ("float", "f32", "f16")
+
+
+def parse_fields(values: Optional[Sequence[str]]) -> List[str]:
+    """
+    Requested fields from repeated and/or comma-separated `fields` values, in MOVIE_FIELDS
+    order and always including `id`. Raises ValueError for unknown names.
+    """
+    if not values:
+        return list(DEFAULT_MOVIE_FIELDS)
+    requested = {name.strip() for value in values for name in value.split(",") if name.strip()}
+    unknown = requested - set(MOVIE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}. Choose from {', '.join(MOVIE_FIELDS)}.")
+    requested.add("id")
+    return [field for field in MOVIE_FIELDS if field in requested]
+
+
+def encode_vector(vector, encoding: str):
+    if vector is None:
+        return None
+    if encoding == "float":
+        return np.asarray(vector, dtype=np.float32).tolist()
+    dtype = "<f2" if encoding == "f16" else "<f4"
+    return base64.b64encode(np.asarray(vector, dtype=dtype).tobytes()).decode("ascii")
+
+
+def decode_vector(data: str, encoding: str) -> np.ndarray:
+    """Inverse of encode_vector for the base64 encodings (what a client does)."""
+    dtype = "<f2" if encoding == "f16" else "<f4"
+    return np.frombuffer(base64.b64decode(data), dtype=dtype).astype(np.float32)
+
+
+def project_rows(rows: Iterable, fields: Sequence[str], vector_encoding: str = "f32") -> List[dict]:
+    """Dicts of `fields` from rows selected in that column order."""
+    items = []
+    for row in rows:
+        item = dict(zip(fields, row))
+        if "vector" in item:
+            item["vector"] = encode_vector(item["vector"], vector_encoding)
+        items.append(item)
+    return items
+
+
+def _default(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, default=_default, separators=(",", ":")).encode()
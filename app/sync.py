@@ -0,0 +1,225 @@
+"""
+Incremental catalog sync from another database (POST /admin/sync).
+
+The source table is read in server-side-cursor chunks. Each movie's embedding text is hashed
+(`movie_content_hash`) and compared with the local row, so only new movies and movies whose
+text changed are re-embedded and upserted; a changed release year alone is updated without
+embedding. The taste vectors of users who liked a re-embedded movie are rebuilt in the same
+transaction. Movies missing from the source are left in place.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, List
+
+from pydantic import ValidationError
+from sqlalchemy import Column, Integer, MetaData, String, Table, Uuid, select, update
+from sqlalchemy.engine import URL
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.cache import recommendation_cache
+from app.config import settings
+from app.db import AsyncSessionLocal, Movie
+from app.db.dialect import upsert
+from app.facet_index import build_facet_index, facet_index
+from app.movie_details import DETAIL_COLUMNS, invalidate_details
+from app.popularity import popularity_store
+from app.schemas import DBSyncRequest, MovieCreate, parse_stringified_list
+from app.taste import recompute_liker_tastes
+from app.utils import embedding_version, movie_content_hash, vectorize_batch
+from app.vector_index import vector_index
+from app.vector_store import vector_store
+
+logger = logging.getLogger("uvicorn.error")
+
+LIST_FIELDS = ("genres", "tags", "actors")
+UPSERT_COLUMNS = (
+    "title", "description", "genres", "tags", "release_year", "director", "actors",
+    "vector", "content_hash", "embedding_version",
+)
+COUNTERS = ("scanned", "new", "updated", "metadata_only", "unchanged", "skipped", "embedded")
+
+sync_status = {
+    "state": "idle", "source": None, "started_at": None, "finished_at": None, "error": None,
+    **{name: 0 for name in COUNTERS}, "rows_per_s": 0.0, "embed_seconds": 0.0,
+}
+
+
+def source_url(request: DBSyncRequest) -> URL:
+    if request.driver == "sqlite":
+        return URL.create("sqlite+aiosqlite", database=request.db_name)
+    if not request.host:
+        raise ValueError("host is required for a postgresql source.")
+    return URL.create(
+        "postgresql+asyncpg",
+        username=request.user,
+        password=request.password,
+        host=request.host,
+        port=request.port,
+        database=request.db_name,
+    )
+
+
+def source_table(name: str) -> Table:
+    """
+    The source movies table. List columns are read as text (JSON, or the stringified lists of
+    the seed CSV) unless the driver already returns lists.
+    """
+    return Table(
+        name, MetaData(),
+        Column("id", Uuid(as_uuid=True), primary_key=True),
+        Column("title", String),
+        Column("description", String),
+        Column("genres", String),
+        Column("tags", String),
+        Column("release_year", Integer),
+        Column("director", String),
+        Column("actors", String),
+    )
+
+
+def parse_list(value) -> list:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = parse_stringified_list(value)
+    return list(value) if isinstance(value, (list, tuple)) else []
+
+
+def to_movie(row) -> MovieCreate:
+    values = dict(row._mapping)
+    values.pop("id", None)
+    values.pop("content_hash", None)
+    for field in LIST_FIELDS:
+        values[field] = parse_list(values.get(field))
+    return MovieCreate(**values)
+
+
+async def sync_chunk(rows, session: AsyncSession, status: dict) -> bool:
+    """
+    Apply one chunk of source rows in a single transaction.
+    Returns True when existing movies changed facet fields (the facet index needs a rebuild).
+    """
+    movies: Dict = {}
+    for row in rows:
+        try:
+            movies[row.id] = to_movie(row)
+        except ValidationError:
+            status["skipped"] += 1
+    status["scanned"] += len(rows)
+    if not movies:
+        return False
+
+    hashes = {movie_id: movie_content_hash(movie) for movie_id, movie in movies.items()}
+    result = await session.execute(select(*DETAIL_COLUMNS, Movie.content_hash).where(Movie.id.in_(movies)))
+    local = {}
+    for row in result.all():
+        local[row.id] = (row.content_hash or movie_content_hash(to_movie(row)), row.release_year, row.content_hash)
+
+    to_embed: List = []
+    metadata_rows: List[dict] = []
+    facets_changed = False
+    for movie_id, movie in movies.items():
+        if movie_id not in local or local[movie_id][0] != hashes[movie_id]:
+            to_embed.append(movie_id)
+            continue
+        _, release_year, stored_hash = local[movie_id]
+        if release_year != movie.release_year:
+            status["metadata_only"] += 1
+            facets_changed = True
+            metadata_rows.append({"id": movie_id, "release_year": movie.release_year, "content_hash": hashes[movie_id]})
+        else:
+            status["unchanged"] += 1
+            if stored_hash is None:
+                metadata_rows.append({"id": movie_id, "release_year": release_year, "content_hash": hashes[movie_id]})
+
+    vectors = []
+    if to_embed:
+        started = time.perf_counter()
+        vectors = await asyncio.to_thread(
+            vectorize_batch, [movies[movie_id] for movie_id in to_embed], settings.SEED_ENCODE_BATCH_SIZE
+        )
+        status["embed_seconds"] += time.perf_counter() - started
+        status["embedded"] += len(to_embed)
+        version = embedding_version()
+        await session.execute(
+            upsert(session, Movie, [Movie.id], UPSERT_COLUMNS),
+            [
+                {
+                    **movies[movie_id].model_dump(), "id": movie_id, "vector": vector,
+                    "content_hash": hashes[movie_id], "embedding_version": version,
+                }
+                for movie_id, vector in zip(to_embed, vectors)
+            ],
+        )
+        await recompute_liker_tastes(session, [movie_id for movie_id in to_embed if movie_id in local])
+    if metadata_rows:
+        await session.execute(update(Movie), metadata_rows)
+    await session.commit()
+
+    for movie_id, vector in zip(to_embed, vectors):
+        if movie_id in local:
+            status["updated"] += 1
+            facets_changed = True
+        else:
+            status["new"] += 1
+            if facet_index.ready:
+                movie = movies[movie_id]
+                facet_index.add(movie_id, movie.release_year, movie.genres, movie.tags, movie.actors, movie.director)
+        if settings.ANN_ENABLED:
+            vector_index.add(movie_id, vector)
+        vector_store.add(movie_id, vector)
+    changed = to_embed + [row["id"] for row in metadata_rows]
+    for movie_id in changed:
+        if movie_id in local:
+            popularity_store.update_details(movie_id, movies[movie_id].title, movies[movie_id].release_year)
+    invalidate_details(changed)
+    return facets_changed
+
+
+async def run_sync(request: DBSyncRequest, chunk_size: int = None, session_factory=None, status: dict = None):
+    """Background job: stream the source table and apply it chunk by chunk, updating `status`."""
+    if chunk_size is None:
+        chunk_size = settings.SYNC_CHUNK_SIZE
+    if session_factory is None:
+        session_factory = AsyncSessionLocal
+    if status is None:
+        status = sync_status
+
+    url = source_url(request)
+    status.update(
+        state="running", source=url.render_as_string(hide_password=True), started_at=time.time(),
+        finished_at=None, error=None, rows_per_s=0.0, embed_seconds=0.0, **{name: 0 for name in COUNTERS},
+    )
+    source = create_async_engine(url)
+    started = time.perf_counter()
+    try:
+        table = source_table(request.table)
+        facets_changed = False
+        async with source.connect() as conn:
+            result = await conn.stream(select(table).execution_options(yield_per=chunk_size))
+            async for rows in result.partitions():
+                async with session_factory() as session:
+                    facets_changed |= await sync_chunk(rows, session, status)
+                status["rows_per_s"] = status["scanned"] / (time.perf_counter() - started)
+                logger.info(
+                    f"Sync: {status['scanned']} rows scanned, {status['embedded']} embedded "
+                    f"({status['rows_per_s']:.1f} rows/s)"
+                )
+
+        if facets_changed and facet_index.ready:
+            async with session_factory() as session:
+                await build_facet_index(session)
+        if status["new"] or status["updated"] or status["metadata_only"]:
+            await recommendation_cache.invalidate_catalog()
+        status.update(state="done", finished_at=time.time())
+        logger.info(f"Sync finished: {status}")
+    except Exception as e:
+        logger.exception("Catalog sync failed.")
+        status.update(state="failed", finished_at=time.time(), error=str(e))
+    finally:
+        await source.dispose()
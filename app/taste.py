@@ -0,0 +1,169 @@
+"""
+Per-user taste vectors kept next to the User row.
+
+`taste_sum / taste_count` is the mean of the user's liked movie vectors. The recency-decayed
+variant keeps an exponentially decayed sum and weight (half-life TASTE_DECAY_HALF_LIFE_DAYS),
+both decayed to `taste_updated_at`; their ratio is a recency-weighted mean that does not need
+to be decayed again at read time.
+"""
+import math
+from datetime import datetime
+from typing import Optional, Sequence
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import Movie, User, UserLikedMovie
+
+
+def _decay_factor(since: Optional[datetime], now: datetime) -> float:
+    if since is None:
+        return 1.0
+    half_life = settings.TASTE_DECAY_HALF_LIFE_DAYS * 86400
+    return math.exp(-math.log(2) * max((now - since).total_seconds(), 0.0) / half_life)
+
+
+def _decay_to(user: User, now: datetime):
+    factor = _decay_factor(user.taste_updated_at, now)
+    if user.taste_decayed is not None:
+        user.taste_decayed = np.asarray(user.taste_decayed, dtype=np.float32) * factor
+    user.taste_decayed_weight = (user.taste_decayed_weight or 0.0) * factor
+    user.taste_updated_at = now
+
+
+def _reset_if_empty(user: User):
+    if not user.taste_count:
+        user.taste_count = 0
+        user.taste_sum = None
+        user.taste_decayed = None
+        user.taste_decayed_weight = 0.0
+
+
+def add_like(user: User, vector, liked_at: Optional[datetime] = None):
+    """
+    O(1) update for one new like. A like older than `taste_updated_at` (e.g. a replayed event)
+    is added already decayed to that time, which stays put.
+    """
+    if vector is None:
+        return
+    liked_at = liked_at or datetime.utcnow()
+    vector = np.asarray(vector, dtype=np.float32)
+    if user.taste_updated_at is not None and liked_at < user.taste_updated_at:
+        weight = _decay_factor(liked_at, user.taste_updated_at)
+        user.taste_decayed_weight = user.taste_decayed_weight or 0.0
+    else:
+        weight = 1.0
+        _decay_to(user, liked_at)
+    user.taste_sum = vector if user.taste_sum is None else np.asarray(user.taste_sum, dtype=np.float32) + vector
+    user.taste_count = (user.taste_count or 0) + 1
+    user.taste_decayed = (
+        vector * weight if user.taste_decayed is None
+        else np.asarray(user.taste_decayed, dtype=np.float32) + vector * weight
+    )
+    user.taste_decayed_weight += weight
+
+
+def remove_like(user: User, vector, liked_at: Optional[datetime]):
+    """O(1) update for one removed like; `liked_at` is when the like was made."""
+    if vector is None or user.taste_sum is None:
+        return
+    now = datetime.utcnow()
+    vector = np.asarray(vector, dtype=np.float32)
+    weight = _decay_factor(liked_at, now)
+    _decay_to(user, now)
+    user.taste_sum = np.asarray(user.taste_sum, dtype=np.float32) - vector
+    user.taste_count = max((user.taste_count or 0) - 1, 0)
+    user.taste_decayed = user.taste_decayed - vector * weight
+    user.taste_decayed_weight = max(user.taste_decayed_weight - weight, 0.0)
+    _reset_if_empty(user)
+
+
+async def rebuild_taste(session: AsyncSession, user: User):
+    """Recompute the user's taste vectors from scratch with one query, decaying each like from its liked_at."""
+    now = datetime.utcnow()
+    result = await session.execute(
+        select(UserLikedMovie.liked_at, Movie.vector)
+        .join(Movie, Movie.id == UserLikedMovie.movie_id)
+        .where(UserLikedMovie.user_id == user.id, Movie.vector.isnot(None))
+    )
+    rows = [(_decay_factor(liked_at, now), np.asarray(vector, dtype=np.float32)) for liked_at, vector in result]
+    user.taste_count = len(rows)
+    user.taste_sum = np.sum([vector for _, vector in rows], axis=0) if rows else None
+    user.taste_decayed = np.sum([vector * weight for weight, vector in rows], axis=0) if rows else None
+    user.taste_decayed_weight = float(sum(weight for weight, _ in rows))
+    user.taste_updated_at = now
+
+
+async def _recompute_users(session: AsyncSession, user_ids: Sequence[UUID], now: datetime):
+    result = await session.execute(
+        select(UserLikedMovie.user_id, UserLikedMovie.liked_at, Movie.vector)
+        .join(Movie, Movie.id == UserLikedMovie.movie_id)
+        .where(UserLikedMovie.user_id.in_(user_ids), Movie.vector.isnot(None))
+    )
+    rows = {
+        user_id: {
+            "id": user_id, "taste_sum": None, "taste_count": 0,
+            "taste_decayed": None, "taste_decayed_weight": 0.0, "taste_updated_at": now,
+        }
+        for user_id in user_ids
+    }
+    for user_id, liked_at, vector in result:
+        row, vector = rows[user_id], np.asarray(vector, dtype=np.float32)
+        weight = _decay_factor(liked_at, now)
+        row["taste_sum"] = vector if row["taste_sum"] is None else row["taste_sum"] + vector
+        row["taste_count"] += 1
+        row["taste_decayed"] = vector * weight if row["taste_decayed"] is None else row["taste_decayed"] + vector * weight
+        row["taste_decayed_weight"] += weight
+    await session.execute(update(User), list(rows.values()))
+
+
+async def recompute_tastes(session: AsyncSession, batch_size: int = 1000) -> int:
+    """
+    Rebuild every liking user's taste vectors from the current movie vectors, decaying each like
+    from its liked_at. Used when the whole catalog is re-embedded; commits after each batch of
+    users so no user row stays locked for long.
+    """
+    now = datetime.utcnow()
+    updated, after = 0, None
+    while True:
+        query = select(UserLikedMovie.user_id).distinct().order_by(UserLikedMovie.user_id).limit(batch_size)
+        if after is not None:
+            query = query.where(UserLikedMovie.user_id > after)
+        user_ids = (await session.execute(query)).scalars().all()
+        if not user_ids:
+            return updated
+        after = user_ids[-1]
+        await _recompute_users(session, user_ids, now)
+        await session.commit()
+        updated += len(user_ids)
+
+
+async def recompute_liker_tastes(session: AsyncSession, movie_ids: Sequence[UUID], batch_size: int = 1000) -> int:
+    """
+    Rebuild the taste vectors of every user who liked one of `movie_ids`, after those movies were
+    re-embedded. Does not commit, so it runs in the transaction that rewrote the vectors.
+    """
+    if not movie_ids:
+        return 0
+    result = await session.execute(
+        select(UserLikedMovie.user_id).distinct().where(UserLikedMovie.movie_id.in_(movie_ids))
+    )
+    user_ids = result.scalars().all()
+    now = datetime.utcnow()
+    for start in range(0, len(user_ids), batch_size):
+        await _recompute_users(session, user_ids[start:start + batch_size], now)
+    return len(user_ids)
+
+
+def taste_vector(user: User, decayed: bool = False) -> Optional[np.ndarray]:
+    """The user's mean (or recency-weighted mean) liked vector, or None without likes."""
+    if decayed:
+        if user.taste_decayed is None or user.taste_decayed_weight <= 0:
+            return None
+        return np.asarray(user.taste_decayed, dtype=np.float32) / user.taste_decayed_weight
+    if user.taste_sum is None or not user.taste_count:
+        return None
+    return np.asarray(user.taste_sum, dtype=np.float32) / user.taste_count
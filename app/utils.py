@@ -1,14 +1,83 @@
-from sentence_transformers import SentenceTransformer
+import hashlib
+import logging
+import threading
+import time
+import numpy as np
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from typing import List, Optional
 from app.config import settings
 from app.schemas import MovieCreate
+from app.embedding_backends import load_model, model_id
+from app.embedding_cache import EmbeddingCache
 
-model = SentenceTransformer("all-MiniLM-L6-v2")  
+logger = logging.getLogger("uvicorn.error")
+
+_model = None
+_model_lock = threading.Lock()
+model_load_seconds = None
+
+_embedding_cache = None
+_embedding_cache_enabled = settings.EMBEDDING_CACHE_ENABLED
+_embedding_cache_lock = threading.Lock()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
+def get_model():
+    """
+    Return the sentence transformer, loading it on first use.
+
+    The backend is chosen by EMBEDDING_BACKEND (see app.embedding_backends).
+    torch and sentence_transformers are imported here rather than at module import time,
+    so routes that never embed (auth, health checks) don't wait for the model.
+    """
+    global _model, model_load_seconds
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                started = time.perf_counter()
+                _model = load_model(settings.EMBEDDING_BACKEND)
+                model_load_seconds = time.perf_counter() - started
+                logger.info(f"Embedding model {model_id()} loaded in {model_load_seconds:.2f}s")
+    return _model
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Return the on-disk embedding cache, opening it on first use; None when it is disabled.
+    Opening it lazily lets a process (e.g. an embedding worker) disable it before anything is mapped.
+    """
+    global _embedding_cache
+    if _embedding_cache is None and _embedding_cache_enabled:
+        with _embedding_cache_lock:
+            if _embedding_cache is None and _embedding_cache_enabled:
+                _embedding_cache = EmbeddingCache(
+                    settings.EMBEDDING_CACHE_DIR,
+                    model_id(),
+                    settings.EMBEDDING_DIM,
+                    settings.EMBEDDING_CACHE_SIZE,
+                )
+    return _embedding_cache if _embedding_cache_enabled else None
+
+def disable_embedding_cache():
+    global _embedding_cache_enabled
+    _embedding_cache_enabled = False
+
+def flush_embedding_cache():
+    """Persist the cache index and log its stats, if this process opened the cache."""
+    if _embedding_cache is not None and _embedding_cache_enabled:
+        _embedding_cache.flush()
+        logger.info(f"Embedding cache stats: {_embedding_cache.stats()}")
+
+def model_loaded() -> bool:
+    return _model is not None
+
+def warm_model_in_background() -> threading.Thread:
+    """Load the model on a daemon thread so the app can serve traffic meanwhile."""
+    thread = threading.Thread(target=get_model, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
+
 def verify_credentials(username: str, password: str) -> bool:
     return username == settings.ADMIN_USERNAME and password == settings.ADMIN_PASSWORD
 
@@ -28,9 +97,19 @@ async def get_current_admin(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-def vectorize(movie: MovieCreate):
+# Bump whenever build_movie_text changes what gets embedded, so stored vectors are re-embedded (app.reembed).
+EMBEDDING_FORMAT_VERSION = 1
+
+def embedding_version() -> str:
+    """
+    Identifies how a stored vector was made: the model and the build_movie_text format.
+    Backends of the same model (torch, onnx, onnx-int8) produce interchangeable vectors.
     """
-    Convert a each movie into a single formatted text string and encode it into a dense vector using a pretrained model.
+    return f"{settings.EMBEDDING_MODEL_NAME}/format-{EMBEDDING_FORMAT_VERSION}"
+
+def build_movie_text(movie: MovieCreate) -> str:
+    """
+    Convert a movie into the single formatted text string that gets embedded.
 
     The movie attributes are concatenated into a structured string with explicit field markers and consistent separators:
     - Each field is prefixed with an uppercase key in square brackets, e.g. [TITLE], [GENRES].
@@ -38,14 +117,8 @@ def vectorize(movie: MovieCreate):
     - Multiple items in list fields (like genres or actors) are separated by " | ".
 
     This formatting helps the model recognize different movie attributes distinctly and produce more meaningful embeddings.
-
-    Args:
-        movie (MovieCreate): Movie data containing attributes like title, description, genres, tags, director, and actors.
-
-    Returns:
-        numpy.ndarray: A fixed-size dense vector embedding representing the combined semantic content of the movie.
     """
-    
+
     parts = []
 
     if movie.title:
@@ -61,6 +134,56 @@ def vectorize(movie: MovieCreate):
     if movie.actors:
         parts.append(f"[ACTORS] {' | '.join(movie.actors)}")
 
-    text_content = " || ".join(parts)
-    vector = model.encode(text_content)
-    return vector
\ No newline at end of file
+    return " || ".join(parts)
+
+def movie_content_hash(movie: MovieCreate) -> str:
+    """sha256 of the text `vectorize` embeds; equal hashes mean the stored vector is still current."""
+    return hashlib.sha256(build_movie_text(movie).encode()).hexdigest()
+
+def vectorize(movie: MovieCreate):
+    """
+    Encode a movie into a dense vector using a pretrained model.
+
+    Args:
+        movie (MovieCreate): Movie data containing attributes like title, description, genres, tags, director, and actors.
+
+    Returns:
+        numpy.ndarray: A fixed-size dense vector embedding representing the combined semantic content of the movie.
+    """
+
+    text_content = build_movie_text(movie)
+    vector = encode_texts([text_content])[0]
+    return vector
+
+def vectorize_batch(movies: List[MovieCreate], batch_size: int = 64):
+    """
+    Encode many movies with a single batched model call.
+
+    Returns:
+        numpy.ndarray: Matrix of shape (len(movies), dim), one row per movie, in input order.
+    """
+
+    texts = [build_movie_text(movie) for movie in movies]
+    return encode_texts(texts, batch_size=batch_size)
+
+def encode_texts(texts: List[str], batch_size: int = 64):
+    """
+    Encode texts, reusing cached embeddings and running the model once for all misses.
+    """
+
+    embedding_cache = get_embedding_cache()
+    if embedding_cache is None:
+        return get_model().encode(texts, batch_size=batch_size)
+
+    vectors = embedding_cache.get_many(texts)
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        encoded = get_model().encode([texts[i] for i in missing], batch_size=batch_size)
+        for i, vector in zip(missing, encoded):
+            embedding_cache.put(texts[i], vector)
+            vectors[i] = vector
+    return np.stack(vectors)
+
+def encode_queries(texts: List[str], batch_size: int = 64):
+    """Encode search queries; they bypass the movie embedding cache."""
+    return get_model().encode(texts, batch_size=batch_size)
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import Movie
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class IVFIndex:
+    """
+    In-process approximate nearest-neighbour index over movie vectors (IVF-Flat, L2).
+
+    Vectors are clustered with k-means into `nlist` inverted lists. A query scans only the
+    `nprobe` lists whose centroids are closest to it, so `nprobe` is the recall/speed knob:
+    `nprobe == nlist` is an exact search, smaller values trade recall for latency.
+    New movies are appended to the list of their nearest centroid without retraining.
+    """
+
+    def __init__(self, dim: int = 384, nlist: int = 0, nprobe: int = 8, train_iters: int = 10, seed: int = 0):
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_iters = train_iters
+        self.seed = seed
+
+        self.ids: List[UUID] = []
+        self.id_to_row: Dict[UUID, int] = {}
+        self.centroids = np.zeros((0, dim), dtype=np.float32)
+        self.lists: List[np.ndarray] = []
+        self.ready = False
+
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:len(self.ids)]
+
+    def build(self, ids: Sequence[UUID], vectors: np.ndarray):
+        """Train centroids on `vectors` and replace the index contents."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        nlist = self.nlist or max(1, int(np.sqrt(len(vectors))))
+        nlist = min(nlist, max(1, len(vectors)))
+        centroids = self._kmeans(vectors, nlist) if len(vectors) else np.zeros((0, self.dim), dtype=np.float32)
+        assignments = self._nearest_centroid(vectors, centroids) if len(vectors) else np.zeros(0, dtype=np.int64)
+
+        with self._lock:
+            self.ids = list(ids)
+            self.id_to_row = {movie_id: row for row, movie_id in enumerate(self.ids)}
+            self._vectors = vectors.copy()
+            self.centroids = centroids
+            self.lists = [np.flatnonzero(assignments == c) for c in range(len(centroids))]
+            self.ready = True
+        logger.info(f"Vector index built: {len(self.ids)} vectors in {len(centroids)} lists")
+
+    def add(self, movie_id: UUID, vector: Iterable[float]):
+        """Insert or update one vector without retraining the centroids."""
+        vector = np.asarray(vector, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            if not len(self.centroids):
+                self.centroids = vector[None, :].copy()
+                self.lists = [np.zeros(0, dtype=np.int64)]
+
+            row = self.id_to_row.get(movie_id)
+            if row is None:
+                row = len(self.ids)
+                if row == len(self._vectors):
+                    grown = np.zeros((max(16, 2 * row), self.dim), dtype=np.float32)
+                    grown[:row] = self._vectors[:row]
+                    self._vectors = grown
+                self.ids.append(movie_id)
+                self.id_to_row[movie_id] = row
+            else:
+                self.lists = [lst[lst != row] for lst in self.lists]
+
+            self._vectors[row] = vector
+            cluster = int(self._nearest_centroid(vector[None, :], self.centroids)[0])
+            self.lists[cluster] = np.append(self.lists[cluster], row)
+
+    def get_vectors(self, ids: Iterable[UUID]) -> np.ndarray:
+        rows = [self.id_to_row[movie_id] for movie_id in ids if movie_id in self.id_to_row]
+        return self._vectors[rows]
+
+    def search(
+        self,
+        query: Iterable[float],
+        k: int,
+        exclude: Optional[Iterable[UUID]] = None,
+        nprobe: Optional[int] = None,
+    ) -> List[Tuple[UUID, float]]:
+        """Return up to `k` (movie_id, squared L2 distance) pairs, closest first."""
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            if not self.ids:
+                return []
+            nprobe = min(nprobe or self.nprobe, len(self.centroids))
+            centroid_dist = ((self.centroids - query) ** 2).sum(axis=1)
+            probe = np.argpartition(centroid_dist, nprobe - 1)[:nprobe]
+            candidates = np.concatenate([self.lists[c] for c in probe])
+            if exclude:
+                excluded = [self.id_to_row[m] for m in exclude if m in self.id_to_row]
+                candidates = candidates[~np.isin(candidates, excluded)]
+            if not len(candidates):
+                return []
+
+            dist = ((self._vectors[candidates] - query) ** 2).sum(axis=1)
+            k = min(k, len(candidates))
+            top = np.argpartition(dist, k - 1)[:k]
+            top = top[np.argsort(dist[top])]
+            return [(self.ids[candidates[i]], float(dist[i])) for i in top]
+
+    def _kmeans(self, vectors: np.ndarray, nlist: int) -> np.ndarray:
+        rng = np.random.default_rng(self.seed)
+        sample = vectors
+        if len(vectors) > 256 * nlist:
+            sample = vectors[rng.choice(len(vectors), 256 * nlist, replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(self.train_iters):
+            assignments = self._nearest_centroid(sample, centroids)
+            for c in range(nlist):
+                members = sample[assignments == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+        return centroids
+
+    @staticmethod
+    def _nearest_centroid(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        dist = (
+            (vectors ** 2).sum(axis=1, keepdims=True)
+            - 2 * vectors @ centroids.T
+            + (centroids ** 2).sum(axis=1)
+        )
+        return dist.argmin(axis=1)
+
+
+async def load_catalog_vectors(db: AsyncSession) -> Tuple[List[UUID], np.ndarray]:
+    """Stream every stored movie vector into (ids, float32 matrix)."""
+    result = await db.stream(select(Movie.id, Movie.vector).where(Movie.vector.isnot(None)))
+    ids, vectors = [], []
+    async for movie_id, vector in result:
+        ids.append(movie_id)
+        vectors.append(vector)
+    matrix = np.stack(vectors).astype(np.float32) if vectors else np.zeros((0, 384), dtype=np.float32)
+    return ids, matrix
+
+
+async def build_vector_index(db: AsyncSession, index: Optional[IVFIndex] = None):
+    """Load every stored movie vector and (re)build the in-process index."""
+    if index is None:
+        index = vector_index
+    ids, matrix = await load_catalog_vectors(db)
+    await asyncio.to_thread(index.build, ids, matrix)
+
+
+vector_index = IVFIndex(nlist=settings.ANN_NLIST, nprobe=settings.ANN_NPROBE)
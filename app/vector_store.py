@@ -0,0 +1,281 @@
+"""
+Exact nearest-neighbour search over Movie.vector behind one interface.
+
+`PgVectorStore` orders by pgvector's distance operator in Postgres. `MemmapVectorStore` keeps
+a copy of every vector in a memory-mapped float32 file and answers with one matrix-vector
+product, so SQLite deployments need no vector support in the database. Both return
+(movie_id, distance) pairs with pgvector's distances: L2 for `l2`, 1 - cosine for `cosine`.
+"""
+import asyncio
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import Float, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import Movie, UserLikedMovie
+from app.db.indexes import apply_search_settings, distance_operator
+
+logger = logging.getLogger("uvicorn.error")
+
+LOAD_BATCH_SIZE = 5000
+
+
+def process_alive(pid: int) -> bool:
+    if os.name != "posix":
+        # os.kill would terminate the process on Windows; assume it is alive.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def restrict(stmt, exclude_ids: Sequence = (), exclude_user_id: Optional[UUID] = None, allowed_ids: Optional[Sequence] = None):
+    if exclude_ids:
+        stmt = stmt.where(~Movie.id.in_(exclude_ids))
+    if exclude_user_id is not None:
+        stmt = stmt.where(~Movie.id.in_(
+            select(UserLikedMovie.movie_id).where(UserLikedMovie.user_id == exclude_user_id)
+        ))
+    if allowed_ids is not None:
+        stmt = stmt.where(Movie.id.in_(allowed_ids))
+    return stmt
+
+
+class PgVectorStore:
+    name = "pgvector"
+    in_process = False
+
+    async def nearest(
+        self,
+        query_vector,
+        db: AsyncSession,
+        limit: int,
+        exclude_ids: Sequence = (),
+        exclude_user_id: Optional[UUID] = None,
+        allowed_ids: Optional[Sequence] = None,
+    ) -> List[Tuple[UUID, float]]:
+        await apply_search_settings(db)
+        distance = Movie.vector.op(distance_operator(), return_type=Float)(literal(np.asarray(query_vector).tolist()))
+        stmt = restrict(
+            select(Movie.id, distance.label("distance")).order_by(distance).limit(limit),
+            exclude_ids, exclude_user_id, allowed_ids,
+        )
+        result = await db.execute(stmt)
+        return [(mid, float(dist)) for mid, dist in result.all()]
+
+    async def nearest_lite(
+        self,
+        query_vector,
+        db: AsyncSession,
+        limit: int,
+        exclude_ids: Sequence = (),
+        exclude_user_id: Optional[UUID] = None,
+    ) -> List[dict]:
+        """id/title/release_year of the nearest movies in the same query as the ordering."""
+        await apply_search_settings(db)
+        stmt = restrict(
+            select(Movie.id, Movie.title, Movie.release_year)
+            .order_by(Movie.vector.op(distance_operator())(literal(np.asarray(query_vector).tolist())))
+            .limit(limit),
+            exclude_ids, exclude_user_id,
+        )
+        result = await db.execute(stmt)
+        return [{"id": mid, "title": title, "release_year": year} for mid, title, year in result.all()]
+
+    def add(self, movie_id: UUID, vector):
+        """Vectors live in the movies table already."""
+
+    def close(self):
+        pass
+
+
+class MemmapVectorStore:
+    """
+    Brute-force search over a memory-mapped float32 matrix of every movie vector.
+
+    The matrix is rebuilt from the database by `load` (lazily on first use) into a file owned by
+    this process, so the OS can page it in and out instead of keeping it on the heap. New movies
+    are appended with `add`; capacity doubles when the file is full.
+    """
+
+    name = "memmap"
+    in_process = True
+
+    def __init__(self, directory: str, dim: int = 384, metric: str = "l2"):
+        self.path = Path(directory) / f"movies-{os.getpid()}.f32"
+        self.dim = dim
+        self.metric = metric
+
+        self.ids: List[UUID] = []
+        self.id_to_row: Dict[UUID, int] = {}
+        self.ready = False
+
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+        self._sq_norms = np.zeros(0, dtype=np.float32)
+        self._lock = threading.Lock()
+        self._load_lock = asyncio.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._matrix[:len(self.ids)]
+
+    def _map(self, capacity: int) -> np.memmap:
+        """Map the file with room for `capacity` rows, growing the file if needed."""
+        capacity = max(16, capacity)
+        size = capacity * self.dim * 4
+        if self.path.stat().st_size < size:
+            os.truncate(self.path, size)
+        return np.memmap(self.path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def remove_stale_files(self):
+        """Delete files left behind by processes that exited without `close` (e.g. crashed workers)."""
+        for path in self.path.parent.glob("movies-*"):
+            pid = path.name.split("-", 1)[1].split(".", 1)[0]
+            if pid.isdigit() and int(pid) != os.getpid() and not process_alive(int(pid)):
+                path.unlink(missing_ok=True)
+                logger.info(f"Removed stale vector store file {path}")
+
+    async def load(self, db: AsyncSession):
+        """Stream every stored vector from the database into a fresh file and swap it in."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.remove_stale_files()
+        tmp = self.path.with_suffix(".tmp")
+        ids, sq_norms = [], []
+        result = await db.stream(
+            select(Movie.id, Movie.vector).where(Movie.vector.isnot(None)).execution_options(yield_per=LOAD_BATCH_SIZE)
+        )
+        with open(tmp, "wb") as f:
+            async for rows in result.partitions():
+                block = np.asarray([vector for _, vector in rows], dtype=np.float32).reshape(-1, self.dim)
+                f.write(block.tobytes())
+                ids.extend(movie_id for movie_id, _ in rows)
+                sq_norms.append((block ** 2).sum(axis=1))
+
+        with self._lock:
+            os.replace(tmp, self.path)
+            self._matrix = self._map(len(ids))
+            self._sq_norms = np.zeros(len(self._matrix), dtype=np.float32)
+            if ids:
+                self._sq_norms[:len(ids)] = np.concatenate(sq_norms)
+            self.ids = ids
+            self.id_to_row = {movie_id: row for row, movie_id in enumerate(ids)}
+            self.ready = True
+        logger.info(f"Vector store loaded: {len(ids)} vectors mapped from {self.path}")
+
+    async def ensure_loaded(self, db: AsyncSession):
+        if self.ready:
+            return
+        async with self._load_lock:
+            if not self.ready:
+                await self.load(db)
+
+    def add(self, movie_id: UUID, vector):
+        """Insert or overwrite one vector (a no-op until the store is loaded)."""
+        if not self.ready:
+            return
+        vector = np.asarray(vector, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            row = self.id_to_row.get(movie_id)
+            if row is None:
+                row = len(self.ids)
+                if row == len(self._matrix):
+                    self._matrix.flush()
+                    self._matrix = self._map(2 * row)
+                    self._sq_norms = np.concatenate([self._sq_norms, np.zeros(len(self._matrix) - row, dtype=np.float32)])
+                self.ids.append(movie_id)
+                self.id_to_row[movie_id] = row
+            self._matrix[row] = vector
+            self._sq_norms[row] = vector @ vector
+
+    def get_vectors(self, ids: Iterable[UUID]) -> np.ndarray:
+        rows = [self.id_to_row[movie_id] for movie_id in ids if movie_id in self.id_to_row]
+        return np.array(self._matrix[rows])
+
+    def _distances(self, matrix: np.ndarray, sq_norms: np.ndarray, query: np.ndarray) -> np.ndarray:
+        dots = matrix @ query
+        if self.metric == "cosine":
+            norms = np.sqrt(sq_norms) * np.linalg.norm(query)
+            return 1 - dots / np.where(norms == 0, 1, norms)
+        return np.sqrt(np.maximum(sq_norms - 2 * dots + query @ query, 0))
+
+    def search(
+        self,
+        query: Iterable[float],
+        k: int,
+        exclude: Optional[Iterable[UUID]] = None,
+        allowed: Optional[Iterable[UUID]] = None,
+    ) -> List[Tuple[UUID, float]]:
+        """Up to `k` (movie_id, distance) pairs, closest first, optionally limited to `allowed`."""
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            n = len(self.ids)
+            excluded = np.array([self.id_to_row[m] for m in exclude or () if m in self.id_to_row], dtype=np.int64)
+            if allowed is None:
+                rows = None
+                dist = self._distances(self._matrix[:n], self._sq_norms[:n], query)
+                dist[excluded] = np.inf
+            else:
+                rows = np.array([self.id_to_row[m] for m in allowed if m in self.id_to_row], dtype=np.int64)
+                rows = rows[~np.isin(rows, excluded)]
+                dist = self._distances(self._matrix[rows], self._sq_norms[rows], query)
+
+            k = min(k, len(dist))
+            if k <= 0:
+                return []
+            top = np.argpartition(dist, k - 1)[:k]
+            top = top[np.argsort(dist[top], kind="stable")]
+            return [
+                (self.ids[i if rows is None else rows[i]], float(dist[i]))
+                for i in top if np.isfinite(dist[i])
+            ]
+
+    async def nearest(
+        self,
+        query_vector,
+        db: AsyncSession,
+        limit: int,
+        exclude_ids: Sequence = (),
+        exclude_user_id: Optional[UUID] = None,
+        allowed_ids: Optional[Sequence] = None,
+    ) -> List[Tuple[UUID, float]]:
+        await self.ensure_loaded(db)
+        exclude = list(exclude_ids)
+        if exclude_user_id is not None:
+            result = await db.execute(select(UserLikedMovie.movie_id).where(UserLikedMovie.user_id == exclude_user_id))
+            exclude.extend(result.scalars().all())
+        return self.search(query_vector, limit, exclude=exclude, allowed=allowed_ids)
+
+    def close(self):
+        """Unmap and delete this process's file."""
+        with self._lock:
+            self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+            self.ids, self.id_to_row, self.ready = [], {}, False
+        self.path.unlink(missing_ok=True)
+
+
+def make_vector_store(kind: Optional[str] = None):
+    kind = kind or settings.VECTOR_STORE
+    if kind == "auto":
+        kind = "memmap" if settings.DB_BACKEND == "sqlite" else "pgvector"
+    if kind == "pgvector":
+        return PgVectorStore()
+    if kind == "memmap":
+        return MemmapVectorStore(settings.VECTOR_STORE_DIR, settings.EMBEDDING_DIM, settings.VECTOR_METRIC)
+    raise ValueError(f"Unknown VECTOR_STORE {kind!r}")
+
+
+vector_store = make_vector_store()
@@ -0,0 +1,44 @@
+"""
+Compare two benchmark result files scenario by scenario.
+
+    python -m benchmarks.compare results/baseline.json results/candidate.json
+"""
+import argparse
+import json
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput_per_s")
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return {result["name"]: result for result in json.load(f)["results"]}
+
+
+def compare(old: dict, new: dict) -> list:
+    """Rows of (scenario, metric, old, new, relative change) for scenarios present in both."""
+    rows = []
+    for name in old:
+        if name not in new:
+            continue
+        for metric in METRICS:
+            before, after = old[name].get(metric), new[name].get(metric)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before if before else 0.0
+            rows.append((name, metric, before, after, change))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("old")
+    parser.add_argument("new")
+    args = parser.parse_args(argv)
+
+    print(f"{'scenario':32} {'metric':18} {'old':>10} {'new':>10} {'change':>8}")
+    for name, metric, before, after, change in compare(load(args.old), load(args.new)):
+        print(f"{name:32} {metric:18} {before:10.2f} {after:10.2f} {change:+8.1%}")
+
+
+if __name__ == "__main__":
+    main()
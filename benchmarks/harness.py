@@ -0,0 +1,72 @@
+import asyncio
+import resource
+import sys
+import time
+from typing import Awaitable, Callable, List
+
+import numpy as np
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(name: str, samples: List[float], wall_seconds: float, errors: int = 0, **extra) -> dict:
+    """Latency percentiles (ms) and throughput for one scenario."""
+    latencies = np.asarray(samples) * 1000
+    result = {
+        "name": name,
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_per_s": len(samples) / wall_seconds if wall_seconds else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        **extra,
+    }
+    if len(latencies):
+        result.update(
+            mean_ms=float(latencies.mean()),
+            p50_ms=float(np.percentile(latencies, 50)),
+            p95_ms=float(np.percentile(latencies, 95)),
+            p99_ms=float(np.percentile(latencies, 99)),
+            max_ms=float(latencies.max()),
+        )
+    return result
+
+
+async def measure(
+    name: str,
+    call: Callable[[int], Awaitable[bool]],
+    requests: int,
+    concurrency: int = 1,
+    warmup: int = 5,
+    **extra,
+) -> dict:
+    """
+    Run `call(i)` `requests` times from `concurrency` workers and summarize latencies.
+    `call` returns False (or raises) for a failed request; failures are counted, not timed.
+    """
+    for i in range(min(warmup, requests)):
+        await call(i)
+
+    samples: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                ok = await call(i)
+            except Exception:
+                ok = False
+            if ok:
+                samples.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(name, samples, time.perf_counter() - started, errors, concurrency=concurrency, **extra)
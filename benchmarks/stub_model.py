@@ -0,0 +1,41 @@
+"""
+Offline stand-in for the SentenceTransformer so benchmarks never download a model.
+
+Vectors are derived from a hash of each text (same text, same vector). `seconds_per_text`
+simulates model cost when measuring the batching pipeline around the model.
+"""
+import hashlib
+import time
+from typing import List
+
+import numpy as np
+
+
+class StubModel:
+    def __init__(self, dim: int = 384, seconds_per_text: float = 0.0):
+        self.dim = dim
+        self.seconds_per_text = seconds_per_text
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, texts, batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(texts, str)
+        texts: List[str] = [texts] if single else list(texts)
+        if self.seconds_per_text:
+            time.sleep(self.seconds_per_text * len(texts))
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+            vectors[i] = np.random.default_rng(seed).standard_normal(self.dim)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors[0] if single else vectors
+
+
+def install(dim: int = 384, seconds_per_text: float = 0.0) -> StubModel:
+    """Make app.utils.get_model() return a StubModel instead of loading the real one."""
+    import app.utils as utils
+
+    model = StubModel(dim, seconds_per_text)
+    utils._model = model
+    return model
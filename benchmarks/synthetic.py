@@ -0,0 +1,76 @@
+"""
+Deterministic synthetic catalogs and interactions.
+
+Genres, tags, actors and directors are drawn from Zipf-like vocabularies and movie
+popularity follows a power law, so a few movies collect most likes, as in real traffic.
+"""
+from typing import Iterator, List, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+
+GENRES = [
+    "Drama", "Comedy", "Action", "Thriller", "Romance", "Horror", "Adventure", "Crime",
+    "Science Fiction", "Fantasy", "Animation", "Mystery", "Family", "Documentary", "War",
+    "History", "Music", "Western", "TV Movie",
+]
+
+
+def zipf_weights(n: int, alpha: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, n + 1) ** alpha
+    return weights / weights.sum()
+
+
+def uuids(rng: np.random.Generator, n: int) -> List[UUID]:
+    return [UUID(bytes=bytes(row), version=4) for row in rng.integers(0, 256, size=(n, 16), dtype=np.uint8)]
+
+
+def synthetic_movies(n: int, dim: int = 384, seed: int = 0, chunk_size: int = 10000) -> Iterator[List[dict]]:
+    """Yield chunks of movie rows (dicts with every Movie column) with unit-norm random vectors."""
+    rng = np.random.default_rng(seed)
+    tags = [f"tag{i}" for i in range(2000)]
+    people = [f"Person {i}" for i in range(20000)]
+    genre_p, tag_p, people_p = zipf_weights(len(GENRES), 1.1), zipf_weights(len(tags), 1.1), zipf_weights(len(people), 1.0)
+    for start in range(0, n, chunk_size):
+        size = min(chunk_size, n - start)
+        ids = uuids(rng, size)
+        vectors = rng.standard_normal((size, dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        years = rng.integers(1920, 2025, size=size)
+        rows = []
+        for i in range(size):
+            rows.append({
+                "id": ids[i],
+                "title": f"Movie {start + i}",
+                "description": f"Synthetic movie number {start + i}.",
+                "genres": list(rng.choice(GENRES, size=rng.integers(1, 4), replace=False, p=genre_p)),
+                "tags": list(rng.choice(tags, size=rng.integers(0, 6), replace=False, p=tag_p)),
+                "release_year": int(years[i]),
+                "director": str(rng.choice(people, p=people_p)),
+                "actors": list(rng.choice(people, size=rng.integers(1, 6), replace=False, p=people_p)),
+                "vector": vectors[i],
+            })
+        yield rows
+
+
+def power_law_likes(
+    movie_ids: Sequence[UUID],
+    n_users: int,
+    mean_likes: float = 20.0,
+    alpha: float = 1.0,
+    seed: int = 0,
+) -> Tuple[List[UUID], List[Tuple[UUID, UUID]]]:
+    """
+    (user ids, (user_id, movie_id) likes). Movie popularity is Zipf(alpha) over a random
+    ranking of the catalog; likes per user are geometric with the given mean.
+    """
+    rng = np.random.default_rng(seed)
+    users = uuids(rng, n_users)
+    ranking = rng.permutation(len(movie_ids))
+    p = zipf_weights(len(movie_ids), alpha)
+    counts = np.minimum(rng.geometric(1.0 / mean_likes, size=n_users), len(movie_ids))
+    likes = []
+    for user_id, count in zip(users, counts):
+        rows = np.unique(rng.choice(len(movie_ids), size=count, p=p))
+        likes.extend((user_id, movie_ids[ranking[row]]) for row in rows)
+    return users, likes
@@ -1,11 +1,13 @@
 import pytest
 import asyncio
-from typing import AsyncGenerator, Generator
+import numpy as np
+from typing import AsyncGenerator, Callable, Generator
 from httpx import AsyncClient
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from app.main import app
 from app.db import Base, get_db, User
+from app.db.session import make_engine
 from app.config import settings
 import sys
 import os
@@ -66,4 +68,45 @@ async def test_user(test_db: AsyncSession) -> dict:
     test_db.add(user)
     await test_db.commit()
     await test_db.refresh(user)
-    return {"id": str(user_id)} 
\ No newline at end of file
+    return {"id": str(user_id)}
+
+@pytest.fixture
+async def sqlite_engine() -> AsyncGenerator[AsyncEngine, None]:
+    # In-memory SQLite database with every table created, for tests that need no server
+    engine = make_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+@pytest.fixture
+def sqlite_session_factory(sqlite_engine: AsyncEngine):
+    return sessionmaker(sqlite_engine, class_=AsyncSession, expire_on_commit=False)
+
+@pytest.fixture
+async def sqlite_session(sqlite_session_factory) -> AsyncGenerator[AsyncSession, None]:
+    async with sqlite_session_factory() as session:
+        yield session
+
+class FakeVectorizer:
+    """Stands in for vectorize_batch: records the titles of every batch and fills each vector with vector_for(movie)."""
+
+    def __init__(self, vector_for: Callable):
+        self.vector_for = vector_for
+        self.calls = []
+        self.fail_after = None
+
+    def __call__(self, movies, batch_size):
+        if self.fail_after is not None and len(self.calls) >= self.fail_after:
+            raise RuntimeError("worker killed")
+        self.calls.append([movie.title for movie in movies])
+        return [np.full(settings.EMBEDDING_DIM, self.vector_for(movie), dtype=np.float32) for movie in movies]
+
+@pytest.fixture
+def fake_vectorize_batch(monkeypatch):
+    # Replaces vectorize_batch in the given module: fake_vectorize_batch(module, vector_for)
+    def install(module, vector_for: Callable = lambda movie: 1.0) -> FakeVectorizer:
+        fake = FakeVectorizer(vector_for)
+        monkeypatch.setattr(module, "vectorize_batch", fake)
+        return fake
+    return install
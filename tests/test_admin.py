@@ -0,0 +1,56 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+
+from app.config import settings
+from app.db.indexes import ensure_vector_index, get_vector_index_definition, vector_index_sql
+
+def test_vector_index_sql_hnsw(monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_INDEX_TYPE", "hnsw")
+    monkeypatch.setattr(settings, "VECTOR_METRIC", "cosine")
+    sql = vector_index_sql(concurrently=True)
+    assert sql.startswith("CREATE INDEX CONCURRENTLY IF NOT EXISTS movies_vector_idx")
+    assert "USING hnsw (vector vector_cosine_ops)" in sql
+    assert f"m = {settings.HNSW_M}" in sql
+
+def test_vector_index_sql_ivfflat(monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_INDEX_TYPE", "ivfflat")
+    monkeypatch.setattr(settings, "VECTOR_METRIC", "l2")
+    sql = vector_index_sql()
+    assert "USING ivfflat (vector vector_l2_ops)" in sql
+    assert f"lists = {settings.IVFFLAT_LISTS}" in sql
+
+def test_vector_index_sql_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_INDEX_TYPE", "none")
+    assert vector_index_sql() is None
+
+async def test_ivfflat_is_not_built_on_an_empty_catalog(test_engine, monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_INDEX_TYPE", "ivfflat")
+    async with test_engine.connect() as conn:
+        async with conn.begin() as transaction:
+            await conn.execute(text("DROP INDEX IF EXISTS movies_vector_idx"))
+            await conn.execute(text("UPDATE movies SET vector = NULL"))
+            await ensure_vector_index(conn)
+            assert await get_vector_index_definition(conn) is None
+            await transaction.rollback()
+
+async def test_embedding_cache_stats(client: AsyncClient, auth_headers: dict):
+    response = await client.get("/admin/embedding-cache", headers=auth_headers)
+    assert response.status_code == 200
+    assert "enabled" in response.json()
+
+async def test_admin_requires_token(client: AsyncClient):
+    response = await client.get("/admin/vector-index")
+    assert response.status_code == 401
+
+async def test_db_stats(client: AsyncClient, auth_headers: dict):
+    response = await client.get("/admin/db", headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert {"pool", "statements", "avg_checkout_wait_ms", "slow_query_log"} <= set(body)
+
+async def test_metrics_endpoint(client: AsyncClient):
+    await client.get("/health/live")
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert 'recapi_request_seconds_count{by="",method="GET",route="/health/live",status="200"}' in response.text
@@ -0,0 +1,54 @@
+import numpy as np
+
+from benchmarks.compare import compare
+from benchmarks.harness import measure, summarize
+from benchmarks.stub_model import StubModel
+from benchmarks.synthetic import power_law_likes, synthetic_movies
+
+def test_synthetic_catalog_is_deterministic():
+    first = [row for chunk in synthetic_movies(25, dim=8, seed=3, chunk_size=10) for row in chunk]
+    second = [row for chunk in synthetic_movies(25, dim=8, seed=3, chunk_size=10) for row in chunk]
+    assert len(first) == 25
+    assert [row["id"] for row in first] == [row["id"] for row in second]
+    assert np.allclose(np.linalg.norm([row["vector"] for row in first], axis=1), 1.0)
+
+def test_power_law_likes_are_skewed():
+    movie_ids = [row["id"] for chunk in synthetic_movies(200, dim=4) for row in chunk]
+    users, likes = power_law_likes(movie_ids, 300, mean_likes=10, alpha=1.2)
+    assert len(users) == 300
+    assert len(set(likes)) == len(likes)
+    counts = np.bincount([movie_ids.index(movie_id) for _, movie_id in likes], minlength=200)
+    top = np.sort(counts)[::-1]
+    assert top[:20].sum() > top[100:].sum()
+
+def test_stub_model_is_stable_per_text():
+    model = StubModel(dim=16)
+    vectors = model.encode(["a", "b", "a"])
+    assert vectors.shape == (3, 16)
+    assert np.array_equal(vectors[0], vectors[2])
+    assert not np.array_equal(vectors[0], vectors[1])
+
+def test_summarize_percentiles():
+    result = summarize("x", [i / 1000 for i in range(1, 101)], wall_seconds=2.0, errors=1)
+    assert result["requests"] == 100
+    assert result["throughput_per_s"] == 50.0
+    assert round(result["p50_ms"], 1) == 50.5
+    assert result["max_ms"] == 100.0
+
+async def test_measure_counts_failures():
+    async def call(i):
+        if i == 4:
+            raise RuntimeError("boom")
+        return i % 2 == 0
+
+    result = await measure("x", call, requests=10, concurrency=3, warmup=0)
+    assert result["errors"] == 6
+    assert result["requests"] == 4
+
+def test_compare_reports_relative_change():
+    old = {"a": {"name": "a", "p50_ms": 10.0, "throughput_per_s": 100.0}, "gone": {"p50_ms": 1.0}}
+    new = {"a": {"name": "a", "p50_ms": 5.0, "throughput_per_s": 150.0}}
+    rows = compare(old, new)
+    assert ("a", "p50_ms", 10.0, 5.0, -0.5) in rows
+    assert ("a", "throughput_per_s", 100.0, 150.0, 0.5) in rows
+    assert all(name == "a" for name, *_ in rows)
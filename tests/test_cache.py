@@ -0,0 +1,83 @@
+from uuid import uuid4
+
+from app.cache import TTLCache, MemoryBackend, RecommendationCache, check_cache_backend
+from app.config import settings
+
+def test_ttl_cache_lru_eviction():
+    cache = TTLCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+def test_ttl_cache_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(max_entries=10, ttl_seconds=5)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    now[0] += 6
+    assert cache.get("a") is None
+    assert cache.stats()["hit_ratio"] == 0.5
+
+def test_ttl_cache_byte_budget():
+    cache = TTLCache(max_entries=100, max_bytes=10)
+    cache.set("a", b"1234")
+    cache.set("b", b"1234")
+    cache.get("a")
+    cache.set("c", b"1234")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1234"
+    assert cache.bytes == 8
+    cache.set("a", b"12")
+    assert cache.bytes == 6
+    cache.set("big", b"x" * 11)
+    assert cache.get("big") is None
+    assert cache.stats()["max_bytes"] == 10
+
+async def test_recommendation_cache_key_ignores_order():
+    cache = RecommendationCache(MemoryBackend(100, 60))
+    ids = [uuid4(), uuid4()]
+    await cache.set(await cache.key(ids, "content", 10), [{"id": "x"}])
+
+    assert await cache.get(await cache.key(list(reversed(ids)), "content", 10)) == [{"id": "x"}]
+    assert await cache.get(await cache.key(ids, "content", 5)) is None
+    assert cache.stats()["hits"] == 1
+
+async def test_likes_invalidate_only_like_dependent_strategies():
+    cache = RecommendationCache(MemoryBackend(100, 60))
+    ids = [uuid4()]
+    await cache.set(await cache.key(ids, "content", 10), ["content"])
+    await cache.set(await cache.key(ids, "popularity", 10), ["popularity"])
+
+    await cache.invalidate_likes()
+    assert await cache.get(await cache.key(ids, "content", 10)) == ["content"]
+    assert await cache.get(await cache.key(ids, "popularity", 10)) is None
+
+async def test_catalog_change_invalidates_everything():
+    cache = RecommendationCache(MemoryBackend(100, 60))
+    ids = [uuid4()]
+    await cache.set(await cache.key(ids, "content", 10), ["content"])
+
+    await cache.invalidate_catalog()
+    assert await cache.get(await cache.key(ids, "content", 10)) is None
+
+async def test_result_computed_across_an_invalidation_is_not_served():
+    cache = RecommendationCache(MemoryBackend(100, 60))
+    ids = [uuid4()]
+    key = await cache.key(ids, "popularity", 10)
+    await cache.invalidate_likes()  # a like lands while the result is being computed
+    await cache.set(key, ["stale"])
+    assert await cache.get(await cache.key(ids, "popularity", 10)) is None
+
+def test_memory_backend_is_flagged_with_several_workers(monkeypatch):
+    monkeypatch.setattr(settings, "REC_CACHE_BACKEND", "memory")
+    assert check_cache_backend(1)
+    assert not check_cache_backend(4)
+    monkeypatch.setattr(settings, "REC_CACHE_BACKEND", "redis")
+    assert check_cache_backend(4)
@@ -0,0 +1,100 @@
+from uuid import uuid4
+
+import numpy as np
+
+from app.cooccurrence import CooccurrenceIndex
+
+def random_likes(n_users=30, n_movies=20, seed=0):
+    rng = np.random.default_rng(seed)
+    users = [uuid4() for _ in range(n_users)]
+    movies = [uuid4() for _ in range(n_movies)]
+    likes = {u: set(rng.choice(movies, size=rng.integers(1, 6), replace=False)) for u in users}
+    return users, movies, likes
+
+def pairs(likes):
+    return [(u, m) for u, ms in likes.items() for m in ms]
+
+def as_dict(hits):
+    return {mid: score for mid, score in hits}
+
+def test_score_counts_co_likes():
+    a, b, c = uuid4(), uuid4(), uuid4()
+    u1, u2 = uuid4(), uuid4()
+    index = CooccurrenceIndex()
+    index.build([(u1, a), (u1, b), (u2, a), (u2, b), (u2, c)])
+
+    assert index.score([a], 10) == [(b, 2.0), (c, 1.0)]
+    assert index.score([uuid4()], 10) == []
+
+def test_incremental_updates_match_rebuild():
+    users, movies, likes = random_likes()
+    index = CooccurrenceIndex()
+    index.build(pairs(likes))
+
+    rng = np.random.default_rng(1)
+    for user in users[:10]:
+        new_movie = movies[int(rng.integers(len(movies)))]
+        if new_movie not in likes[user]:
+            index.add_like(user, list(likes[user]), new_movie)
+            likes[user].add(new_movie)
+    for user in users[10:15]:
+        removed = next(iter(likes[user]))
+        likes[user].discard(removed)
+        index.remove_like(user, list(likes[user]), removed)
+    for user in users[15:20]:
+        new = set(rng.choice(movies, size=4, replace=False))
+        index.replace_likes(user, likes[user], new)
+        likes[user] = new
+
+    expected = CooccurrenceIndex()
+    expected.build(pairs(likes))
+    for movie in movies:
+        assert as_dict(index.score([movie], 50)) == as_dict(expected.score([movie], 50))
+
+    index.compact()
+    assert index.pending() == 0
+    for movie in movies:
+        assert as_dict(index.score([movie], 50)) == as_dict(expected.score([movie], 50))
+
+def test_new_movies_after_build():
+    a, b = uuid4(), uuid4()
+    index = CooccurrenceIndex()
+    index.build([(uuid4(), a)])
+    index.add_like(uuid4(), [a], b)
+
+    assert index.score([a], 5) == [(b, 1.0)]
+    index.compact()
+    assert index.score([b], 5) == [(a, 1.0)]
+
+def test_cosine_normalization_downweights_popular_movies():
+    a, popular, niche = uuid4(), uuid4(), uuid4()
+    likes = [(uuid4(), popular) for _ in range(10)]
+    u1, u2 = uuid4(), uuid4()
+    likes += [(u1, a), (u1, popular), (u2, a), (u2, niche)]
+    index = CooccurrenceIndex(normalize="cosine")
+    index.build(likes)
+
+    assert index.score([a], 2)[0][0] == niche
+
+def test_events_during_a_rebuild_are_applied_once():
+    users, movies, likes = random_likes()
+    index = CooccurrenceIndex()
+    index.build(pairs(likes))
+
+    # Both likes are applied to the index during the rebuild; the snapshot read from the
+    # database already contains the early one but not the late one.
+    early, late = users[0], users[1]
+    early_movie = next(m for m in movies if m not in likes[early])
+    late_movie = next(m for m in movies if m not in likes[late])
+    index.begin_rebuild()
+    index.add_like(early, list(likes[early]), early_movie)
+    likes[early].add(early_movie)
+    snapshot = pairs(likes)
+    index.add_like(late, list(likes[late]), late_movie)
+    likes[late].add(late_movie)
+    index.build(snapshot)
+
+    expected = CooccurrenceIndex()
+    expected.build(pairs(likes))
+    for movie in movies:
+        assert as_dict(index.score([movie], 50)) == as_dict(expected.score([movie], 50))
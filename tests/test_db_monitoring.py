@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db import monitoring
+from app.db.monitoring import QueryStats, TimedQueuePool, describe, explain
+
+def test_slow_queries_are_captured_newest_first():
+    stats = QueryStats(slow_ms=100, log_size=2)
+    stats.record_statement("SELECT 1", (), 0.01)
+    for n in range(3):
+        stats.record_statement(f"SELECT {n}", ("x" * 1000,), 0.5)
+    stats.record_statement("EXPLAIN SELECT 1", (), 0.5)
+
+    assert stats.statements == 5
+    assert [e["statement"] for e in stats.recent_slow()] == ["SELECT 2", "SELECT 1"]
+    assert len(describe(stats.recent_slow()[0])["parameters"]) == monitoring.MAX_PARAMETERS_REPR
+    stats.reset()
+    assert stats.stats()["statements"] == 0 and stats.recent_slow() == []
+
+async def test_hooks_time_statements_and_pool_checkouts(tmp_path, monkeypatch):
+    stats = QueryStats(slow_ms=0)
+    monkeypatch.setattr(monitoring, "query_stats", stats)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}", poolclass=TimedQueuePool)
+    monitoring.install(engine)
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT :n"), {"n": 1})
+    await engine.dispose()
+
+    assert stats.statements >= 1
+    assert stats.checkouts >= 1
+    assert any(e["statement"].startswith("SELECT ?") for e in stats.recent_slow())
+
+async def test_failed_statements_leave_no_timing_state(tmp_path, monkeypatch):
+    stats = QueryStats(slow_ms=0)
+    monkeypatch.setattr(monitoring, "query_stats", stats)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}")
+    monitoring.install(engine)
+    async with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                await conn.execute(text("SELECT * FROM missing"))
+        await conn.execute(text("SELECT 2"))
+        assert conn.sync_connection.info.get("query_started", []) == []
+    await engine.dispose()
+
+    assert stats.recent_slow()[0]["statement"] == "SELECT 2"
+
+async def test_explain_only_plans_queries_and_rolls_back(sqlite_engine):
+    stats = QueryStats(slow_ms=0)
+    stats.record_statement("SELECT id FROM movies WHERE title = ?", ("Alien",), 0.5)
+    stats.record_statement("DELETE FROM movies", (), 0.5)
+    stats.record_statement("SELECT id FROM movies WHERE id IN (?)", ("x" * 30000,), 0.5)
+    large, delete, select = stats.recent_slow()
+
+    assert "bound" not in describe(select)
+    async with sqlite_engine.connect() as conn:
+        assert "movies" in await explain(conn, select)
+        assert await explain(conn, delete) is None
+        assert await explain(conn, large) is None
+        assert not conn.in_transaction()
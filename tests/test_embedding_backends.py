@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+import app.embedding_backends as backends
+from app.config import settings
+
+class FakeModel:
+    def __init__(self, noise):
+        self.noise = noise
+
+    def encode(self, texts, batch_size=32):
+        rng = np.random.default_rng(0)
+        base = np.stack([np.full(4, len(text), dtype=np.float32) + np.arange(4) for text in texts])
+        return base + self.noise * rng.standard_normal(base.shape)
+
+def test_compare_backends_reports_parity_and_throughput(monkeypatch):
+    monkeypatch.setattr(backends, "load_model", lambda backend: FakeModel(0.0 if backend == "torch" else 0.01))
+    report = backends.compare_backends(["a", "bb", "ccc"], backends=("onnx", "onnx-int8"), batch_size=2)
+
+    assert list(report["backends"]) == ["torch", "onnx", "onnx-int8"]
+    assert report["backends"]["onnx"]["cosine_mean"] > 0.99
+    assert "cosine_mean" not in report["backends"]["torch"]
+    assert report["backends"]["onnx-int8"]["texts_per_second"] > 0
+
+def test_model_id_distinguishes_backends(monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_QUANTIZATION", "avx2")
+    assert backends.model_id("torch") != backends.model_id("onnx")
+    assert backends.model_id("onnx-int8").endswith("onnx-int8-avx2")
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        backends.load_model("tensorrt")
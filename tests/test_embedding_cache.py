@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from app.embedding_cache import EmbeddingCache
+
+def make_cache(path, capacity=4, model_name="test-model"):
+    return EmbeddingCache(str(path), model_name, dim=3, capacity=capacity, flush_every=1000)
+
+def test_hit_and_miss_counters(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.get("[TITLE] Alien") is None
+    cache.put("[TITLE] Alien", np.array([1.0, 2.0, 3.0]))
+    np.testing.assert_allclose(cache.get("[TITLE] Alien"), [1.0, 2.0, 3.0])
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+def test_persists_across_instances(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("[TITLE] Heat", np.array([0.5, 0.5, 0.5]))
+    cache.flush()
+
+    reopened = make_cache(tmp_path)
+    np.testing.assert_allclose(reopened.get("[TITLE] Heat"), [0.5, 0.5, 0.5])
+
+def test_key_includes_model_name(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("[TITLE] Heat", np.ones(3))
+    cache.flush()
+
+    other_model = make_cache(tmp_path, model_name="other-model")
+    assert other_model.get("[TITLE] Heat") is None
+
+def test_lru_eviction(tmp_path):
+    cache = make_cache(tmp_path, capacity=2)
+    cache.put("a", np.zeros(3))
+    cache.put("b", np.ones(3))
+    cache.get("a")
+    cache.put("c", np.full(3, 2.0))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["entries"] == 2
+
+def test_layout_change_resets_cache(tmp_path):
+    cache = make_cache(tmp_path, capacity=2)
+    cache.put("a", np.zeros(3))
+    cache.flush()
+
+    resized = make_cache(tmp_path, capacity=8)
+    assert resized.get("a") is None
+
+def test_importing_the_app_does_not_open_the_cache(tmp_path):
+    # Spawned worker processes re-import app.utils; only the first lookup may open the cache.
+    directory = tmp_path / "cache"
+    env = {**os.environ, "EMBEDDING_CACHE_DIR": str(directory), "EMBEDDING_CACHE_ENABLED": "true"}
+    subprocess.run([sys.executable, "-c", "import app.utils"], env=env, check=True, cwd=Path(__file__).parent.parent)
+    assert not directory.exists()
@@ -0,0 +1,62 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app import utils
+from app.embedding_executor import EmbeddingBatcher
+
+def fake_encode(texts):
+    return np.array([[float(len(text))] for text in texts])
+
+def cache_is_disabled(texts):
+    return np.array([[float(utils.get_embedding_cache() is None)] for _ in texts])
+
+async def test_concurrent_callers_share_a_batch():
+    calls = []
+
+    def encode(texts):
+        calls.append(len(texts))
+        return fake_encode(texts)
+
+    batcher = EmbeddingBatcher(encode, max_batch_size=8, max_wait_ms=50)
+    results = await asyncio.gather(*(batcher.embed_texts(["x" * i]) for i in range(1, 6)))
+    await batcher.stop()
+
+    assert [float(r[0][0]) for r in results] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert calls == [5]
+    assert batcher.stats()["avg_batch_size"] == 5
+
+async def test_batches_are_capped_at_max_size():
+    calls = []
+
+    def encode(texts):
+        calls.append(len(texts))
+        return fake_encode(texts)
+
+    batcher = EmbeddingBatcher(encode, max_batch_size=2, max_wait_ms=50)
+    await batcher.embed_texts(["a", "b", "c", "d", "e"])
+    await batcher.stop()
+
+    assert max(calls) == 2
+    assert sum(calls) == 5
+
+async def test_encode_errors_reach_callers():
+    def encode(texts):
+        raise RuntimeError("model failed")
+
+    batcher = EmbeddingBatcher(encode, max_wait_ms=1)
+    try:
+        with pytest.raises(RuntimeError, match="model failed"):
+            await batcher.embed_texts(["a"])
+    finally:
+        await batcher.stop()
+
+async def test_process_workers_run_without_the_embedding_cache(monkeypatch):
+    monkeypatch.setattr(utils, "_embedding_cache", object())
+    monkeypatch.setattr(utils, "_embedding_cache_enabled", True)
+    batcher = EmbeddingBatcher(cache_is_disabled, executor_kind="process", max_wait_ms=1)
+    try:
+        assert (await batcher.embed_texts(["a"]))[0][0] == 1.0
+    finally:
+        await batcher.stop()
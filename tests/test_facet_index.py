@@ -0,0 +1,69 @@
+import asyncio
+from uuid import uuid4
+
+import numpy as np
+
+from app.config import settings
+from app.db import Movie
+from app.facet_index import FacetIndex, build_facet_index, facet_values, maintain_facet_index
+
+def make_index():
+    ids = [uuid4() for _ in range(5)]
+    index = FacetIndex()
+    index.build([
+        (ids[0], 1990, ["Action", "Comedy"], ["heist"], ["Ann"], "Kim"),
+        (ids[1], 2001, ["Action"], ["space"], ["Bob", "Ann"], "Lee"),
+        (ids[2], 2010, ["Drama"], ["space", "heist"], ["Cid"], "Kim"),
+        (ids[3], None, "['Comedy']", [], [], None),
+        (ids[4], 2020, ["action", "Drama"], [], ["Ann"], "Lee"),
+    ])
+    return index, ids
+
+def test_facet_values_normalizes_inputs():
+    assert facet_values(None) == []
+    assert facet_values("Kim") == ["Kim"]
+    assert facet_values("['A', 'B']") == ["A", "B"]
+    assert facet_values([" A ", "", None]) == ["A"]
+
+def test_filter_all_any_and_years():
+    index, ids = make_index()
+    assert index.filter({"genres": ["action"]}, 10) == [ids[0], ids[1], ids[4]]
+    assert index.filter({"genres": ["Action", "Drama"]}, 10) == [ids[4]]
+    assert index.filter({"genres": ["Comedy", "Drama"]}, 10, match="any") == [ids[0], ids[2], ids[3], ids[4]]
+    assert index.filter({"genres": ["Action"], "director": ["Lee"]}, 10) == [ids[1], ids[4]]
+    assert index.filter({}, 10, year_min=2000, year_max=2010) == [ids[1], ids[2]]
+    assert index.filter({"tags": ["unknown"]}, 10) == []
+    assert index.filter({}, 2) == ids[:2]
+
+def test_facets_count_every_value_for_the_mask():
+    index, ids = make_index()
+    facets = index.facets(index.mask({"actors": ["Ann"]}))
+    assert facets["genres"] == {"Action": 3, "Comedy": 1, "Drama": 1}
+    assert list(facets["director"].items()) == [("Lee", 2), ("Kim", 1)]
+    assert index.facets(np.zeros(len(ids), dtype=bool))["tags"] == {}
+
+def test_add_updates_filters_and_facets():
+    index, ids = make_index()
+    index.facets(index.mask({}))
+    new = uuid4()
+    index.add(new, 2021, ["Horror"], [], [], "Kim")
+    assert index.filter({"genres": ["horror"]}, 10) == [new]
+    assert index.facets(index.mask({}))["director"]["Kim"] == 3
+
+async def test_refresh_picks_up_movies_written_elsewhere(sqlite_session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "FACET_REFRESH_SECONDS", 0.01)
+    index = FacetIndex()
+    async with sqlite_session_factory() as session:
+        await build_facet_index(session, index)
+        session.add(Movie(id=uuid4(), title="written by another worker", genres=["Drama"]))
+        await session.commit()
+
+    task = asyncio.create_task(maintain_facet_index(sqlite_session_factory, index))
+    try:
+        for _ in range(100):
+            if len(index):
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        task.cancel()
+    assert len(index.filter({"genres": ["drama"]}, 10)) == 1
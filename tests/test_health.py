@@ -0,0 +1,70 @@
+import pytest
+from httpx import AsyncClient
+
+from app import facet_index, main, popularity, utils
+from app.config import settings
+from app.embedding_executor import embedding_batcher, query_batcher
+from app.popularity import PopularityStore
+
+@pytest.fixture
+async def client():
+    async with AsyncClient(app=main.app, base_url="http://test") as client:
+        yield client
+
+@pytest.fixture
+def model_not_loaded(monkeypatch):
+    def get_model():
+        raise AssertionError("the model must not be loaded")
+    monkeypatch.setattr(utils, "_model", None)
+    monkeypatch.setattr(main, "get_model", get_model)
+    monkeypatch.setattr(main, "warm_model_in_background", get_model)
+
+async def test_ready_is_503_until_startup_completes(client, monkeypatch):
+    monkeypatch.setattr(utils, "_model", object())
+    monkeypatch.setattr(main, "startup_complete", False)
+    response = await client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "starting"
+
+    monkeypatch.setattr(main, "startup_complete", True)
+    response = await client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+    assert "import" in response.json()["timings"]
+
+async def test_ready_waits_for_the_model_unless_lazy(client, monkeypatch, model_not_loaded):
+    monkeypatch.setattr(main, "startup_complete", True)
+    monkeypatch.setattr(settings, "MODEL_WARMUP", "background")
+    assert (await client.get("/health/ready")).status_code == 503
+    monkeypatch.setattr(settings, "MODEL_WARMUP", "lazy")
+    assert (await client.get("/health/ready")).status_code == 200
+
+async def test_live_answers_during_startup(client, monkeypatch):
+    monkeypatch.setattr(main, "startup_complete", False)
+    assert (await client.get("/health/live")).status_code == 200
+
+async def test_lazy_warmup_does_not_load_the_model_at_startup(client, monkeypatch, model_not_loaded, sqlite_engine, sqlite_session_factory):
+    for name, value in {
+        "MODEL_WARMUP": "lazy", "SEED_ON_STARTUP": False, "ANN_ENABLED": False,
+        "COOCCURRENCE_ENABLED": False, "REEMBED_ON_STARTUP": False,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+    monkeypatch.setattr(main, "engine", sqlite_engine)
+    monkeypatch.setattr(main, "AsyncSessionLocal", sqlite_session_factory)
+    monkeypatch.setattr(main, "startup_complete", False)
+    monkeypatch.setattr(main, "startup_timings", {})
+    monkeypatch.setattr(main, "background_tasks", [])
+    # Build into throwaway indexes so the shared singletons stay unloaded for other tests.
+    monkeypatch.setattr(popularity, "popularity_store", PopularityStore())
+    monkeypatch.setattr(main, "build_facet_index", lambda session: facet_index.build_facet_index(session, facet_index.FacetIndex()))
+    try:
+        await main.startup()
+        assert not utils.model_loaded()
+        response = await client.get("/health/ready")
+        assert response.status_code == 200
+        assert {"db_init", "facet_index", "popularity"} <= set(response.json()["timings"])
+    finally:
+        for task in main.background_tasks:
+            task.cancel()
+        await embedding_batcher.stop()
+        await query_batcher.stop()
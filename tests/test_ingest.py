@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from app.db import Movie
+from app.ingest import IngestReport, collapse, ingest_batch, parse_event, read_ndjson
+from app.popularity import unlike_weight
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+async def test_read_ndjson_splits_across_chunks_and_rejects_bad_lines():
+    user, movie = uuid4(), uuid4()
+    line = f'{{"user_id": "{user}", "movie_id": "{movie}"}}'.encode()
+    report = IngestReport()
+    events = [item async for item in read_ndjson(chunks(line[:10], line[10:] + b"\n\n{oops\n", line), report)]
+    assert [n for n, _ in events] == [1, 4]
+    assert all(e.user_id == user and e.action == "like" for _, e in events)
+    assert report.rejected == 1 and report.errors[0]["line"] == 3
+
+def test_parse_event_validates_and_normalizes_timestamps():
+    report = IngestReport()
+    assert parse_event({"user_id": "x", "movie_id": str(uuid4())}, 1, report) is None
+    assert parse_event({"user_id": str(uuid4()), "movie_id": str(uuid4()), "action": "love"}, 2, report) is None
+    event = parse_event({"user_id": str(uuid4()), "movie_id": str(uuid4()), "timestamp": "2024-01-01T02:00:00+02:00"}, 3, report)
+    assert event.timestamp == datetime(2024, 1, 1)
+    assert report.rejected == 2
+
+def test_collapse_keeps_latest_event_per_pair():
+    report = IngestReport()
+    user, movie = uuid4(), uuid4()
+    events = [
+        (1, parse_event({"user_id": str(user), "movie_id": str(movie), "timestamp": "2024-01-02T00:00:00"}, 1, report)),
+        (2, parse_event({"user_id": str(user), "movie_id": str(movie), "action": "unlike", "timestamp": "2024-01-01T00:00:00"}, 2, report)),
+        (3, parse_event({"user_id": str(user), "movie_id": str(uuid4())}, 3, report)),
+    ]
+    latest = collapse(events, report)
+    assert len(latest) == 2
+    assert latest[(user, movie)][1].action == "like"
+    assert report.duplicates == 1
+
+async def test_historical_likes_add_their_decayed_weight(sqlite_session):
+    movie_id, liked_at = uuid4(), datetime.utcnow() - timedelta(days=365)
+    sqlite_session.add(Movie(id=movie_id, title="old", vector=np.ones(384)))
+    await sqlite_session.commit()
+    report = IngestReport()
+    events = [
+        (n, parse_event({"user_id": str(uuid4()), "movie_id": str(movie_id), "timestamp": liked_at.isoformat()}, n, report))
+        for n in (1, 2)
+    ]
+    await ingest_batch(sqlite_session, events, report)
+    movie = await sqlite_session.get(Movie, movie_id)
+    await sqlite_session.refresh(movie)
+    assert report.liked == 2
+    assert movie.like_count == 2
+    assert movie.popularity_score == pytest.approx(2 * unlike_weight(liked_at), rel=1e-3)
+    assert movie.popularity_score < 1
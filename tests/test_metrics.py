@@ -0,0 +1,14 @@
+from prometheus_client import REGISTRY
+
+from app.metrics import record_error, statement_label, strategy_label
+
+def test_labels_are_bounded():
+    assert strategy_label("hybrid") == "hybrid"
+    assert strategy_label("'; DROP") == "other"
+    assert statement_label("  select 1") == "SELECT"
+    assert statement_label("CREATE INDEX ix ON movies (title)") == "OTHER"
+
+def test_record_error_counts_by_component_and_class():
+    before = REGISTRY.get_sample_value("recapi_errors_total", {"component": "test", "exception": "KeyError"}) or 0
+    record_error("test", KeyError("x"))
+    assert REGISTRY.get_sample_value("recapi_errors_total", {"component": "test", "exception": "KeyError"}) == before + 1
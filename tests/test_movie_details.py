@@ -0,0 +1,23 @@
+from uuid import uuid4
+
+from app.movie_details import etag_matches, render_detail
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('"x", W/"abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abcd"', '"abc"')
+
+def test_render_detail_etag_follows_body():
+    class Row:
+        def __init__(self, **values):
+            self._mapping = values
+
+    movie_id = uuid4()
+    values = {"id": movie_id, "title": "A", "description": None, "genres": ["Drama"], "tags": [],
+              "release_year": 2001, "director": None, "actors": []}
+    body, etag = render_detail(Row(**values))
+    assert str(movie_id).encode() in body
+    assert render_detail(Row(**values))[1] == etag
+    assert render_detail(Row(**{**values, "title": "B"}))[1] != etag
+    assert b"vector" not in body
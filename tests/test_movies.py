@@ -1,3 +1,5 @@
+import base64
+import json
 import pytest
 from httpx import AsyncClient
 from uuid import uuid4
@@ -39,18 +41,112 @@ async def test_get_movie(client: AsyncClient, auth_headers: dict, test_movie_dat
     data = response.json()
     assert data["title"] == test_movie_data["title"]
 
+async def test_get_movie_etag_and_batch(client: AsyncClient, auth_headers: dict, test_movie_data: dict):
+    ids = []
+    for title in ("ETag One", "ETag Two"):
+        response = await client.post("/movies/movies", json={**test_movie_data, "title": title}, headers=auth_headers)
+        ids.append(response.json()["id"])
+
+    response = await client.get(f"/movies/movie?movie_id={ids[0]}", headers=auth_headers)
+    etag = response.headers["ETag"]
+    assert response.json()["id"] == ids[0]
+
+    response = await client.get(f"/movies/movie?movie_id={ids[0]}", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    response = await client.get(f"/movies/movie?movie_id={ids[0]}", headers={**auth_headers, "If-None-Match": '"stale"'})
+    assert response.status_code == 200
+
+    response = await client.post(
+        "/movies/movies/batch", json={"ids": [ids[1], str(uuid4()), ids[0]]}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert [m["title"] for m in response.json()] == ["ETag Two", "ETag One"]
+
+async def test_list_movies_fields_projection(client: AsyncClient, auth_headers: dict, test_movie_data: dict):
+    await client.post("/movies/movies", json={**test_movie_data, "genres": ["Projection"]}, headers=auth_headers)
+
+    response = await client.get("/movies/movies", params={"genre": "Projection"}, headers=auth_headers)
+    assert "vector" not in response.json()[0]
+
+    response = await client.get(
+        "/movies/movies", params={"genre": "Projection", "fields": "title,vector", "vector_encoding": "f16"}, headers=auth_headers
+    )
+    movie = response.json()[0]
+    assert set(movie) == {"id", "title", "vector"}
+    assert len(base64.b64decode(movie["vector"])) == 384 * 2
+
+    response = await client.get("/movies/movies", params={"fields": "budget"}, headers=auth_headers)
+    assert response.status_code == 422
+
 async def test_list_movies(client: AsyncClient, auth_headers: dict):
     response = await client.get("/movies/movies", headers=auth_headers)
     assert response.status_code == 200
     data = response.json()
     assert isinstance(data, list)
 
+async def test_list_movies_filters_and_facets(client: AsyncClient, auth_headers: dict, test_movie_data: dict):
+    await client.post("/movies/movies", json={**test_movie_data, "genres": ["Facet Noir"], "release_year": 1950}, headers=auth_headers)
+    await client.post("/movies/movies", json={**test_movie_data, "genres": ["Facet Noir", "Drama"], "release_year": 1960}, headers=auth_headers)
+
+    response = await client.get("/movies/movies", params=[("genre", "facet noir"), ("genre", "Drama")], headers=auth_headers)
+    assert response.status_code == 200
+    assert [m["release_year"] for m in response.json()] == [1960]
+
+    response = await client.get("/movies/movies", params={"genre": "Facet Noir", "year_max": 1955}, headers=auth_headers)
+    assert [m["release_year"] for m in response.json()] == [1950]
+
+    response = await client.get("/movies/movies/facets", params={"genre": "Facet Noir"}, headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 2
+    assert body["facets"]["genres"]["Facet Noir"] == 2
+
+async def test_search_movies(client: AsyncClient, auth_headers: dict, test_movie_data: dict):
+    await client.post("/movies/movies", json=test_movie_data, headers=auth_headers)
+
+    params = {"q": "a test movie", "genre": "Action", "limit": 5}
+    first = await client.get("/movies/search", params=params, headers=auth_headers)
+    assert first.status_code == 200
+    body = first.json()
+    assert body["results"]
+    assert {"embedding_ms", "search_ms", "query_cache_hit", "query_cache_hit_rate"} <= set(body)
+
+    second = (await client.get("/movies/search", params=params, headers=auth_headers)).json()
+    assert second["query_cache_hit"] is True
+    assert second["results"] == body["results"]
+
 async def test_movies_lookup(client: AsyncClient, auth_headers: dict):
     response = await client.get("/movies/movies/lookup", headers=auth_headers)
     assert response.status_code == 200
     data = response.json()
     assert isinstance(data, list)
 
+async def test_movies_lookup_pages_follow_cursor(client: AsyncClient, auth_headers: dict, test_movie_data: dict):
+    for n in range(3):
+        await client.post("/movies/movies", json={**test_movie_data, "title": f"Lookup {n}"}, headers=auth_headers)
+
+    full = (await client.get("/movies/movies/lookup", headers=auth_headers)).json()
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = await client.get("/movies/movies/lookup", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        seen.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == full
+
+    response = await client.get("/movies/movies/lookup", params={"cursor": "garbage"}, headers=auth_headers)
+    assert response.status_code == 400
+
+async def test_movies_lookup_stream(client: AsyncClient, auth_headers: dict):
+    full = (await client.get("/movies/movies/lookup", params={"order": "id"}, headers=auth_headers)).json()
+    response = await client.get("/movies/movies/lookup", params={"order": "id", "stream": True}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in response.text.splitlines()] == full
+
 async def test_recommend_movies(client: AsyncClient, auth_headers: dict, test_movie_data: dict):
     create_response = await client.post(
         "/movies/movies",
@@ -102,4 +198,22 @@ async def test_delete_movie(client: AsyncClient, auth_headers: dict, test_movie_
         f"/movies/movie?movie_id={movie_id}",
         headers=auth_headers
     )
-    assert get_response.status_code == 200 
\ No newline at end of file
+    assert get_response.status_code == 200
+
+async def test_batch_recommendations(client: AsyncClient, auth_headers: dict, test_movie_data: dict):
+    first = (await client.post("/movies/movies", json=test_movie_data, headers=auth_headers)).json()["id"]
+    second = (await client.post("/movies/movies", json=test_movie_data, headers=auth_headers)).json()["id"]
+
+    response = await client.post(
+        "/movies/recommend/batch?limit=5",
+        json={"entries": [{"liked_movie_ids": [first]}, {"liked_movie_ids": [second]}]},
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines] == [0, 1]
+    assert first not in [movie["id"] for movie in lines[0]["recommendations"]]
+
+async def test_batch_recommendations_requires_entries(client: AsyncClient, auth_headers: dict):
+    response = await client.post("/movies/recommend/batch", json={"entries": [{}]}, headers=auth_headers)
+    assert response.status_code == 422
@@ -0,0 +1,19 @@
+from uuid import uuid4
+
+import pytest
+
+from app.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+def test_cursor_round_trip():
+    movie_id = uuid4()
+    assert decode_cursor(encode_cursor("title", movie_id, "Alien"), "title") == ("Alien", movie_id)
+    assert decode_cursor(encode_cursor("id", movie_id), "id") == (None, movie_id)
+
+@pytest.mark.parametrize("token", ["", "not-base64!", "eyJvIjoidGl0bGUifQ"])
+def test_malformed_cursor_is_rejected(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, "title")
+
+def test_cursor_from_other_order_is_rejected():
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor("id", uuid4()), "title")
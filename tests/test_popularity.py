@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+
+from app import popularity
+from app.popularity import PopularityStore, apply_like_counts, unlike_weight
+
+def make_store(scores, size=10):
+    store = PopularityStore(size=size)
+    ids = [uuid4() for _ in scores]
+    store.load((mid, f"movie {n}", 2000 + n, score) for n, (mid, score) in enumerate(zip(ids, scores)))
+    return store, ids
+
+def test_top_orders_by_score_and_skips_excluded():
+    store, ids = make_store([3, 7, 5, 0])
+    assert [m["id"] for m in store.top(10)] == [ids[1], ids[2], ids[0]]
+    assert [m["id"] for m in store.top(2, exclude=[ids[1]])] == [ids[2], ids[0]]
+    assert set(store.top(1)[0]) == {"id", "title", "release_year"}
+
+def test_bump_adjusts_known_movies():
+    store, ids = make_store([3, 7])
+    store.bump(ids[0], +1, score=8.0)
+    assert store.top(1)[0]["id"] == ids[0]
+    store.bump(ids[0], -5)
+    assert store.top(1)[0]["id"] == ids[1]
+
+def test_bump_admits_new_movie_only_above_floor():
+    store, ids = make_store([3, 7], size=2)
+    low, high = uuid4(), uuid4()
+    store.bump(low, +1, "low", 2001, score=2.0)
+    store.bump(high, +1, "high", 2002, score=5.0)
+    assert [m["id"] for m in store.top(10)] == [ids[1], high]
+    store.bump(uuid4(), +1)  # unknown movie without a score is ignored
+    assert len(store.entries) == 2
+
+def test_decayed_like_admits_movie_outside_snapshot(monkeypatch):
+    store = PopularityStore(size=5, mode="decayed")
+    store.load([])
+    monkeypatch.setattr(popularity, "popularity_store", store)
+    movie_id = uuid4()
+    apply_like_counts([(movie_id, "new", 2020, 1, 0.98)], +1)
+    assert store.top(1) == [{"id": movie_id, "title": "new", "release_year": 2020}]
+
+def test_can_serve_requires_enough_snapshot():
+    store = PopularityStore(size=5)
+    assert not store.can_serve(1)
+    store.load([])
+    assert store.can_serve(3, exclude=[uuid4(), uuid4()])
+    assert not store.can_serve(5, exclude=[uuid4()])
+
+def test_unlike_weight_decays():
+    assert unlike_weight(None) == 1.0
+    assert unlike_weight(datetime.utcnow()) == pytest.approx(1.0, abs=1e-3)
+    assert unlike_weight(datetime.utcnow() - timedelta(days=365)) < unlike_weight(datetime.utcnow() - timedelta(days=1))
@@ -0,0 +1,63 @@
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from app.db import Movie
+from app.recommendation import fuse_scores, recommend, top_k_batch
+
+def brute_force_l2(catalog, taste, exclude, k):
+    dist = ((catalog - taste) ** 2).sum(axis=1)
+    dist[list(exclude)] = np.inf
+    return list(np.argsort(dist)[:k])
+
+def test_top_k_batch_matches_brute_force():
+    rng = np.random.default_rng(0)
+    catalog = rng.standard_normal((200, 16)).astype(np.float32)
+    tastes = rng.standard_normal((5, 16)).astype(np.float32)
+    exclude = [[0, 1], [], [5], [10, 11, 12], []]
+
+    top = top_k_batch(catalog, tastes, exclude, 7)
+    assert top.shape == (5, 7)
+    for i in range(5):
+        assert list(top[i]) == brute_force_l2(catalog, tastes[i], exclude[i], 7)
+
+def test_top_k_batch_excludes_liked_rows():
+    catalog = np.eye(4, dtype=np.float32)
+    top = top_k_batch(catalog, catalog[:1], [[0]], 4, metric="cosine")
+    assert 0 not in top[0][top[0] >= 0]
+    assert list(top[0]).count(-1) == 1
+
+def test_fuse_scores_rrf_rewards_agreement():
+    a, b, c, d = uuid4(), uuid4(), uuid4(), uuid4()
+    candidates = {
+        "content": [(a, -0.1), (b, -0.2), (c, -0.3)],
+        "popularity": [(c, 50.0), (b, 40.0), (d, 1.0)],
+    }
+    fused = fuse_scores(candidates, {"content": 1.0, "popularity": 1.0}, 4)
+    assert [mid for mid, _ in fused] == [c, b, a, d]
+    assert fused[0][1] == pytest.approx(1 / 63 + 1 / 61)
+
+def test_fuse_scores_weighted_normalizes_each_source():
+    a, b, c = uuid4(), uuid4(), uuid4()
+    candidates = {
+        "content": [(a, -0.1), (b, -0.5)],
+        "popularity": [(b, 1000.0), (c, 10.0)],
+    }
+    only_content = fuse_scores(candidates, {"content": 1.0, "popularity": 0.0}, 3, method="weighted")
+    assert [mid for mid, _ in only_content] == [a, b]
+    fused = fuse_scores(candidates, {"content": 0.5, "popularity": 0.5}, 3, method="weighted")
+    assert [mid for mid, _ in fused] == [a, b, c]
+    assert [score for _, score in fused] == pytest.approx([0.5, 0.5, 0.0])
+
+def test_fuse_scores_handles_empty_sources():
+    assert fuse_scores({"content": [], "popularity": []}, {"content": 1.0, "popularity": 1.0}, 5) == []
+
+async def test_hybrid_legs_use_the_callers_database(sqlite_session):
+    liked, popular = uuid4(), uuid4()
+    sqlite_session.add_all([Movie(id=liked, title="liked"), Movie(id=popular, title="popular", like_count=3, popularity_score=3.0)])
+    await sqlite_session.commit()
+    movies = await recommend(
+        [liked], sqlite_session, limit=5, by="hybrid", weights={"content": 0, "popularity": 1, "cooccurrence": 1}
+    )
+    assert [movie["id"] for movie in movies] == [popular]
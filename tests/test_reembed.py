@@ -0,0 +1,89 @@
+from datetime import datetime
+from uuid import uuid4
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from app import reembed
+from app.config import settings
+from app.db import Movie, User, UserLikedMovie
+from app.reembed import catalog_versions, run_reembed
+from app.utils import embedding_version
+
+DIM = 384
+
+@pytest.fixture
+async def factory(monkeypatch, sqlite_session_factory):
+    monkeypatch.setattr(settings, "ANN_ENABLED", False)
+    old_version = embedding_version()
+    factory = sqlite_session_factory
+    async with factory() as session:
+        movie_ids = [uuid4() for _ in range(5)]
+        session.add_all(
+            Movie(id=mid, title=f"m{i}", description="plot", vector=np.ones(DIM), embedding_version=old_version)
+            for i, mid in enumerate(movie_ids)
+        )
+        user = User(id=uuid4(), taste_sum=np.full(DIM, 2.0), taste_count=2)
+        session.add(user)
+        await session.flush()
+        now = datetime.utcnow()
+        session.add_all(UserLikedMovie(user_id=user.id, movie_id=mid, liked_at=now) for mid in movie_ids[:2])
+        await session.commit()
+    # The deployed model changed: stored vectors are now stale.
+    monkeypatch.setattr(settings, "EMBEDDING_MODEL_NAME", "other-model")
+    factory.movie_ids, factory.user_id = movie_ids, user.id
+    return factory
+
+@pytest.fixture
+def model(fake_vectorize_batch):
+    return fake_vectorize_batch(reembed, lambda movie: 2.0)
+
+async def movie_rows(factory):
+    async with factory() as session:
+        return {movie.id: movie for movie in (await session.execute(select(Movie))).scalars()}
+
+async def test_reembeds_into_shadow_then_switches(factory, model):
+    status = {}
+    await run_reembed(batch_size=2, duty_cycle=1, session_factory=factory, status=status)
+    assert status["state"] == "done", status["error"]
+    assert (status["embedded"], status["switched"], status["pending"]) == (5, 5, 0)
+    assert [len(batch) for batch in model.calls] == [2, 2, 1]
+
+    for movie in (await movie_rows(factory)).values():
+        assert movie.embedding_version == "other-model/format-1"
+        assert movie.vector[0] == 2.0
+        assert movie.vector_next is None and movie.vector_next_version is None
+    async with factory() as session:
+        assert await catalog_versions(session) == {"other-model/format-1": 5}
+        user = await session.get(User, factory.user_id)
+    assert user.taste_count == 2
+    assert np.allclose(user.taste_sum, 4.0)
+    assert np.allclose(user.taste_decayed / user.taste_decayed_weight, 2.0)
+
+async def test_resumes_after_a_crash(factory, model):
+    status = {}
+    model.fail_after = 1
+    await run_reembed(batch_size=2, duty_cycle=1, session_factory=factory, status=status)
+    assert status["state"] == "failed"
+    rows = await movie_rows(factory)
+    assert sum(movie.vector_next is not None for movie in rows.values()) == 2
+    assert all(movie.vector[0] == 1.0 for movie in rows.values())
+
+    model.fail_after, model.calls[:] = None, []
+    await run_reembed(batch_size=2, duty_cycle=1, session_factory=factory, status=status)
+    assert status["state"] == "done", status["error"]
+    assert (status["embedded"], status["switched"]) == (3, 5)
+    assert all(movie.vector[0] == 2.0 for movie in (await movie_rows(factory)).values())
+
+async def test_keeps_movies_rewritten_at_the_new_version(factory, model):
+    rewritten = factory.movie_ids[0]
+    async with factory() as session:
+        movie = await session.get(Movie, rewritten)
+        movie.vector, movie.embedding_version = np.full(DIM, 7.0), embedding_version()
+        await session.commit()
+
+    status = {}
+    await run_reembed(batch_size=10, duty_cycle=1, session_factory=factory, status=status)
+    assert (status["embedded"], status["switched"]) == (4, 4)
+    assert (await movie_rows(factory))[rewritten].vector[0] == 7.0
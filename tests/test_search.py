@@ -0,0 +1,25 @@
+import numpy as np
+
+from app import search
+from app.search import embed_query, normalize_query
+
+def test_normalize_query():
+    assert normalize_query("  Slow-burn   Space\tHORROR ") == "slow-burn space horror"
+
+async def test_embed_query_caches_by_normalized_text(monkeypatch):
+    calls = []
+
+    async def fake_embed_texts(texts):
+        calls.append(texts)
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+    monkeypatch.setattr(search.query_batcher, "embed_texts", fake_embed_texts)
+    monkeypatch.setattr(search, "query_cache", search.TTLCache(max_entries=8))
+
+    first, hit = await embed_query("Space horror")
+    assert not hit
+    second, hit = await embed_query("space  HORROR")
+    assert hit
+    assert calls == [["space horror"]]
+    assert np.array_equal(first, second)
+    assert search.query_cache_hit_rate() == 0.5
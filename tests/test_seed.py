@@ -0,0 +1,63 @@
+from sqlalchemy import select
+
+from app import seed, utils
+from app.config import settings
+from app.db import Movie
+from app.seed import read_chunks, seed_movie_id, load_checkpoint, save_checkpoint
+
+CSV = """title,description,genres,tags,release_year,director,actors
+Alien,Space horror,"['Horror', 'Sci-Fi']","['space']",1979,Ridley Scott,"['Sigourney Weaver']"
+Heat,Crime saga,"['Crime']","[]",1995,Michael Mann,"['Al Pacino', 'Robert De Niro']"
+Untitled,,"[]","[]",,,"[]"
+"""
+
+def test_read_chunks_streams_and_parses(tmp_path):
+    csv_path = tmp_path / "movies.csv"
+    csv_path.write_text(CSV)
+
+    chunks = list(read_chunks(str(csv_path), chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert chunks[0][0].genres == ["Horror", "Sci-Fi"]
+    assert chunks[1][0].release_year is None
+    assert chunks[1][0].description is None
+
+def test_read_chunks_skips_checkpointed_rows(tmp_path):
+    csv_path = tmp_path / "movies.csv"
+    csv_path.write_text(CSV)
+
+    chunks = list(read_chunks(str(csv_path), chunk_size=10, skip_rows=2))
+    assert [movie.title for movie in chunks[0]] == ["Untitled"]
+
+def test_checkpoint_roundtrip(tmp_path):
+    csv_path = str(tmp_path / "movies.csv")
+    checkpoint = str(tmp_path / "checkpoint.json")
+    assert load_checkpoint(checkpoint, csv_path) == 0
+    save_checkpoint(checkpoint, csv_path, 2000)
+    assert load_checkpoint(checkpoint, csv_path) == 2000
+    assert load_checkpoint(checkpoint, str(tmp_path / "other.csv")) == 0
+
+def test_seed_movie_id_is_deterministic():
+    assert seed_movie_id(0, "Alien", 1979) == seed_movie_id(0, "Alien", 1979)
+    assert seed_movie_id(0, "Alien", 1979) != seed_movie_id(0, "Alien", 1986)
+
+def test_seed_movie_id_keeps_movies_sharing_a_title_and_year():
+    assert seed_movie_id(0, "Hamlet", None) != seed_movie_id(1, "Hamlet", None)
+
+async def test_seed_if_empty_resumes_an_interrupted_seed(tmp_path, monkeypatch, sqlite_session_factory, fake_vectorize_batch):
+    csv_path, checkpoint = tmp_path / "movies.csv", str(tmp_path / "checkpoint.json")
+    csv_path.write_text(CSV)
+    monkeypatch.setattr(settings, "SEED_CSV_PATH", str(csv_path))
+    monkeypatch.setattr(settings, "SEED_CHECKPOINT_PATH", checkpoint)
+    monkeypatch.setattr(seed, "AsyncSessionLocal", sqlite_session_factory)
+    monkeypatch.setattr(utils, "_embedding_cache_enabled", False)
+    fake = fake_vectorize_batch(seed)
+
+    # Killed after the first chunk: one movie stored, the checkpoint left behind.
+    await seed.insert_chunk(next(read_chunks(str(csv_path), chunk_size=1)), 64)
+    save_checkpoint(checkpoint, str(csv_path), 1)
+    await seed.seed_if_empty()
+
+    async with sqlite_session_factory() as session:
+        assert len((await session.execute(select(Movie.id))).all()) == 3
+    assert [len(batch) for batch in fake.calls] == [1, 2]
+    assert load_checkpoint(checkpoint, str(csv_path)) == 0
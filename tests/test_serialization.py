@@ -0,0 +1,28 @@
+import json
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from app.serialization import DEFAULT_MOVIE_FIELDS, decode_vector, dumps, encode_vector, parse_fields, project_rows
+
+def test_parse_fields():
+    assert parse_fields(None) == list(DEFAULT_MOVIE_FIELDS)
+    assert "vector" not in parse_fields(None)
+    assert parse_fields(["vector,title", "title"]) == ["id", "title", "vector"]
+    with pytest.raises(ValueError):
+        parse_fields(["title,budget"])
+
+def test_vector_encodings_round_trip():
+    vector = np.random.default_rng(0).standard_normal(384).astype(np.float32)
+    f32 = encode_vector(vector, "f32")
+    f16 = encode_vector(vector, "f16")
+    assert np.array_equal(decode_vector(f32, "f32"), vector)
+    assert np.allclose(decode_vector(f16, "f16"), vector, atol=1e-2)
+    assert len(f16) < len(f32) < len(json.dumps(encode_vector(vector, "float")))
+
+def test_project_rows_and_dumps():
+    movie_id = uuid4()
+    rows = [(movie_id, "A", np.ones(2, dtype=np.float32))]
+    items = project_rows(rows, ["id", "title", "vector"], "float")
+    assert json.loads(dumps(items)) == [{"id": str(movie_id), "title": "A", "vector": [1.0, 1.0]}]
@@ -0,0 +1,121 @@
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app import sync
+from app.db import Base, Movie, User, UserLikedMovie
+from app.db.session import make_engine
+from app.popularity import PopularityStore
+from app.schemas import DBSyncRequest
+from app.sync import parse_list, run_sync, source_url
+from app.taste import add_like
+
+@pytest.fixture
+async def source(tmp_path):
+    path = str(tmp_path / "source.db")
+    engine = make_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield path, engine
+    await engine.dispose()
+
+@pytest.fixture
+def embedded(fake_vectorize_batch):
+    return fake_vectorize_batch(sync, lambda movie: len(movie.description or ""))
+
+async def add_source_movies(engine, n):
+    ids = [uuid4() for _ in range(n)]
+    async with sessionmaker(engine, class_=AsyncSession)() as session:
+        session.add_all(
+            Movie(id=mid, title=f"m{i}", description="plot", genres=["Drama"], release_year=2000 + i)
+            for i, mid in enumerate(ids)
+        )
+        await session.commit()
+    return ids
+
+def test_source_url():
+    url = source_url(DBSyncRequest(driver="postgresql", host="db", port=5432, user="u", password="secret", db_name="films"))
+    assert url.render_as_string(hide_password=True) == "postgresql+asyncpg://u:***@db:5432/films"
+    assert str(source_url(DBSyncRequest(driver="sqlite", db_name="/data/films.db"))) == "sqlite+aiosqlite:////data/films.db"
+    with pytest.raises(ValueError):
+        source_url(DBSyncRequest(driver="postgresql", db_name="films"))
+
+def test_parse_list():
+    assert parse_list('["Drama", "Crime"]') == ["Drama", "Crime"]
+    assert parse_list("['Drama', 'Crime']") == ["Drama", "Crime"]
+    assert parse_list(["Drama"]) == ["Drama"]
+    assert parse_list(None) == []
+
+async def test_second_sync_only_embeds_changes(source, sqlite_session_factory, embedded):
+    path, engine = source
+    ids = await add_source_movies(engine, 25)
+    request = DBSyncRequest(driver="sqlite", db_name=path)
+
+    status = {}
+    await run_sync(request, chunk_size=10, session_factory=sqlite_session_factory, status=status)
+    assert status["state"] == "done", status["error"]
+    assert (status["scanned"], status["new"], status["embedded"]) == (25, 25, 25)
+    assert [len(batch) for batch in embedded.calls] == [10, 10, 5]
+
+    async with sessionmaker(engine, class_=AsyncSession)() as session:
+        await session.execute(update(Movie).where(Movie.id == ids[0]).values(description="a new plot"))
+        await session.execute(update(Movie).where(Movie.id == ids[1]).values(release_year=1999))
+        await session.commit()
+    new_ids = await add_source_movies(engine, 1)
+
+    embedded.calls.clear()
+    await run_sync(request, chunk_size=10, session_factory=sqlite_session_factory, status=status)
+    assert status["state"] == "done", status["error"]
+    assert status["scanned"] == 26
+    assert (status["new"], status["updated"], status["metadata_only"], status["unchanged"]) == (1, 1, 1, 23)
+    assert status["embedded"] == 2
+    assert sorted(title for batch in embedded.calls for title in batch) == ["m0", "m0"]
+
+    async with sqlite_session_factory() as session:
+        rows = {row.id: row for row in (await session.execute(select(Movie))).scalars()}
+    assert len(rows) == 26
+    assert rows[ids[0]].description == "a new plot"
+    assert rows[ids[0]].vector[0] == len("a new plot")
+    assert rows[ids[1]].release_year == 1999
+    assert rows[new_ids[0]].content_hash is not None
+
+async def test_missing_table_fails_the_job(source, sqlite_session_factory, embedded):
+    path, _ = source
+    status = {}
+    await run_sync(DBSyncRequest(driver="sqlite", db_name=path, table="films"), session_factory=sqlite_session_factory, status=status)
+    assert status["state"] == "failed"
+    assert "films" in status["error"]
+
+async def test_resync_rebuilds_tastes_of_users_who_liked_a_changed_movie(source, sqlite_session_factory, embedded, monkeypatch):
+    path, engine = source
+    ids = await add_source_movies(engine, 2)
+    request = DBSyncRequest(driver="sqlite", db_name=path)
+    await run_sync(request, session_factory=sqlite_session_factory, status={})
+
+    store = PopularityStore()
+    store.load([(ids[0], "m0", 2000, 1.0)])
+    monkeypatch.setattr(sync, "popularity_store", store)
+    async with sqlite_session_factory() as session:
+        user = User(id=uuid4(), taste_count=0, taste_decayed_weight=0.0)
+        add_like(user, (await session.get(Movie, ids[0])).vector)
+        session.add(user)
+        await session.flush()
+        session.add(UserLikedMovie(user_id=user.id, movie_id=ids[0], liked_at=datetime.utcnow()))
+        await session.commit()
+
+    async with sessionmaker(engine, class_=AsyncSession)() as session:
+        await session.execute(update(Movie).where(Movie.id == ids[0]).values(title="m0 (cut)", description="a new plot"))
+        await session.commit()
+    status = {}
+    await run_sync(request, session_factory=sqlite_session_factory, status=status)
+    assert status["updated"] == 1, status["error"]
+
+    async with sqlite_session_factory() as session:
+        user = await session.get(User, user.id)
+    assert user.taste_count == 1
+    assert user.taste_sum[0] == len("a new plot")
+    assert store.top(1)[0]["title"] == "m0 (cut)"
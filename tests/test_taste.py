@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.db import Movie, User, UserLikedMovie
+from app.taste import add_like, rebuild_taste, remove_like, taste_vector
+
+def new_user():
+    return User(id=uuid4(), taste_count=0, taste_decayed_weight=0.0)
+
+def test_mean_taste_add_and_remove():
+    user = new_user()
+    a, b = np.array([1.0, 0.0]), np.array([0.0, 1.0])
+    add_like(user, a)
+    add_like(user, b)
+    np.testing.assert_allclose(taste_vector(user), [0.5, 0.5])
+
+    remove_like(user, a, datetime.utcnow())
+    np.testing.assert_allclose(taste_vector(user), [0.0, 1.0])
+
+    remove_like(user, b, datetime.utcnow())
+    assert taste_vector(user) is None
+    assert user.taste_count == 0
+
+def test_decayed_taste_prefers_recent_likes():
+    user = new_user()
+    now = datetime.utcnow()
+    half_life = timedelta(days=settings.TASTE_DECAY_HALF_LIFE_DAYS)
+    add_like(user, np.array([1.0, 0.0]), now - half_life)
+    add_like(user, np.array([0.0, 1.0]), now)
+
+    np.testing.assert_allclose(taste_vector(user), [0.5, 0.5])
+    # the old like has half the weight of the new one
+    np.testing.assert_allclose(taste_vector(user, decayed=True), [1 / 3, 2 / 3], rtol=1e-5)
+
+def test_decayed_remove_uses_like_time():
+    user = new_user()
+    now = datetime.utcnow()
+    old = now - timedelta(days=settings.TASTE_DECAY_HALF_LIFE_DAYS)
+    add_like(user, np.array([1.0, 0.0]), old)
+    add_like(user, np.array([0.0, 1.0]), now)
+
+    remove_like(user, np.array([1.0, 0.0]), old)
+    np.testing.assert_allclose(taste_vector(user, decayed=True), [0.0, 1.0], atol=1e-5)
+
+def test_out_of_order_like_is_added_decayed():
+    user = new_user()
+    now = datetime.utcnow()
+    add_like(user, np.array([1.0, 0.0]), now)
+    add_like(user, np.array([0.0, 1.0]), now - timedelta(days=365))
+
+    assert user.taste_updated_at == now
+    np.testing.assert_allclose(taste_vector(user), [0.5, 0.5])
+    decayed = taste_vector(user, decayed=True)
+    assert decayed[0] > 0.99 and decayed[1] < 0.01
+
+async def test_rebuild_decays_each_like_from_when_it_was_made(sqlite_session):
+    now = datetime.utcnow()
+    half_life = timedelta(days=settings.TASTE_DECAY_HALF_LIFE_DAYS)
+    old, new = uuid4(), uuid4()
+    user = new_user()
+    sqlite_session.add_all([
+        user,
+        Movie(id=old, title="old", vector=np.eye(384)[0]),
+        Movie(id=new, title="new", vector=np.eye(384)[1]),
+    ])
+    await sqlite_session.flush()
+    sqlite_session.add_all([
+        UserLikedMovie(user_id=user.id, movie_id=old, liked_at=now - half_life),
+        UserLikedMovie(user_id=user.id, movie_id=new, liked_at=now),
+    ])
+    await sqlite_session.flush()
+
+    await rebuild_taste(sqlite_session, user)
+    assert user.taste_count == 2
+    assert user.taste_decayed_weight == pytest.approx(1.5, rel=1e-3)
+    np.testing.assert_allclose(taste_vector(user, decayed=True)[:2], [1 / 3, 2 / 3], rtol=1e-3)
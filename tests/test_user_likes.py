@@ -1,6 +1,10 @@
+import json
 import pytest
 from httpx import AsyncClient
-from uuid import uuid4
+from sqlalchemy import select
+from uuid import UUID, uuid4
+
+from app.db import UserLikedMovie
 
 @pytest.fixture
 def test_movie_data():
@@ -84,4 +88,62 @@ async def test_unlike_nonexistent_movie(client: AsyncClient, auth_headers: dict,
         f"/users/{test_user['id']}/likes/00000000-0000-0000-0000-000000000000",
         headers=auth_headers
     )
-    assert response.status_code == 404 
\ No newline at end of file
+    assert response.status_code == 404
+
+async def test_user_recommendations_from_taste(client: AsyncClient, auth_headers: dict, test_movie_data: dict, test_user: dict):
+    liked = (await client.post("/movies/movies", json=test_movie_data, headers=auth_headers)).json()["id"]
+    await client.post("/movies/movies", json=test_movie_data, headers=auth_headers)
+    await client.post(f"/users/{test_user['id']}/likes?movie_id={liked}", headers=auth_headers)
+
+    response = await client.get(f"/users/{test_user['id']}/recommendations?limit=5", headers=auth_headers)
+    assert response.status_code == 200
+    assert liked not in [movie["id"] for movie in response.json()]
+
+    response = await client.get(f"/users/{test_user['id']}/recommendations?decayed=true", headers=auth_headers)
+    assert response.status_code == 200
+
+async def test_user_recommendations_without_likes(client: AsyncClient, auth_headers: dict):
+    response = await client.get(f"/users/{uuid4()}/recommendations", headers=auth_headers)
+    assert response.status_code == 404
+
+async def test_bulk_ingest_likes(client: AsyncClient, auth_headers: dict, test_movie_data: dict):
+    movie_id = (await client.post("/movies/movies", json=test_movie_data, headers=auth_headers)).json()["id"]
+    user_id = str(uuid4())
+    events = [
+        {"user_id": user_id, "movie_id": movie_id},
+        {"user_id": user_id, "movie_id": str(uuid4())},
+    ]
+
+    response = await client.post("/users/likes/bulk", json=events, headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["liked"], body["duplicates"], body["rejected"]) == (1, 0, 1)
+
+    ndjson = json.dumps(events[0]) + "\n" + json.dumps({**events[0], "action": "unlike"}) + "\n"
+    response = await client.post(
+        "/users/likes/bulk", content=ndjson, headers={**auth_headers, "Content-Type": "application/x-ndjson"}
+    )
+    body = response.json()
+    assert (body["unliked"], body["duplicates"]) == (1, 1)
+    assert (await client.get(f"/users/{user_id}/likes", headers=auth_headers)).json() == []
+
+async def test_replacing_likes_keeps_existing_like_times(client: AsyncClient, auth_headers: dict, test_movie_data: dict, test_db):
+    kept, removed, added = [
+        (await client.post("/movies/movies", json=test_movie_data, headers=auth_headers)).json()["id"] for _ in range(3)
+    ]
+    user_id = str(uuid4())
+    for movie_id in (kept, removed):
+        await client.post(f"/users/{user_id}/likes?movie_id={movie_id}", headers=auth_headers)
+    liked_at = await like_times(test_db, user_id)
+
+    response = await client.put(f"/users/{user_id}/likes", json=[kept, added], headers=auth_headers)
+    assert response.status_code == 200
+    updated = await like_times(test_db, user_id)
+    assert set(updated) == {UUID(kept), UUID(added)}
+    assert updated[UUID(kept)] == liked_at[UUID(kept)]
+
+async def like_times(db, user_id):
+    result = await db.execute(
+        select(UserLikedMovie.movie_id, UserLikedMovie.liked_at).where(UserLikedMovie.user_id == UUID(user_id))
+    )
+    return dict(result.all())
@@ -0,0 +1,52 @@
+from uuid import uuid4
+
+import numpy as np
+
+from app.vector_index import IVFIndex
+
+def make_catalog(n=500, dim=8, seed=1):
+    rng = np.random.default_rng(seed)
+    return [uuid4() for _ in range(n)], rng.standard_normal((n, dim)).astype(np.float32)
+
+def exact_top_k(vectors, query, k):
+    return list(np.argsort(((vectors - query) ** 2).sum(axis=1))[:k])
+
+def test_full_probe_matches_exact_search():
+    ids, vectors = make_catalog()
+    index = IVFIndex(dim=8, nlist=10, nprobe=10)
+    index.build(ids, vectors)
+
+    query = vectors[0] + 0.01
+    hits = index.search(query, 5)
+    assert [mid for mid, _ in hits] == [ids[i] for i in exact_top_k(vectors, query, 5)]
+
+def test_partial_probe_has_reasonable_recall():
+    ids, vectors = make_catalog(n=2000)
+    index = IVFIndex(dim=8, nlist=20, nprobe=5)
+    index.build(ids, vectors)
+
+    rng = np.random.default_rng(2)
+    recall = []
+    for query in rng.standard_normal((20, 8)).astype(np.float32):
+        expected = {ids[i] for i in exact_top_k(vectors, query, 10)}
+        found = {mid for mid, _ in index.search(query, 10)}
+        recall.append(len(expected & found) / 10)
+    assert np.mean(recall) > 0.6
+
+def test_exclude_and_incremental_add():
+    ids, vectors = make_catalog(n=50)
+    index = IVFIndex(dim=8, nlist=4, nprobe=4)
+    index.build(ids, vectors)
+
+    new_id = uuid4()
+    target = np.full(8, 10.0, dtype=np.float32)
+    index.add(new_id, target)
+    assert index.search(target, 1)[0][0] == new_id
+    assert new_id not in [mid for mid, _ in index.search(target, 3, exclude=[new_id])]
+    assert len(index) == 51
+
+def test_add_to_empty_index():
+    index = IVFIndex(dim=8)
+    movie_id = uuid4()
+    index.add(movie_id, np.ones(8))
+    assert index.search(np.ones(8), 5) == [(movie_id, 0.0)]
@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+from uuid import uuid4
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from app.db import Movie, User
+from app.db.dialect import insert_ignore
+from app.vector_store import MemmapVectorStore
+
+DIM = 384
+
+async def add_movies(session, n=200, seed=1):
+    rng = np.random.default_rng(seed)
+    ids, vectors = [uuid4() for _ in range(n)], rng.standard_normal((n, DIM)).astype(np.float32)
+    session.add_all(Movie(id=mid, title=f"m{i}", vector=vectors[i]) for i, mid in enumerate(ids))
+    await session.commit()
+    return ids, vectors
+
+async def test_vectors_round_trip_through_sqlite(sqlite_session):
+    ids, vectors = await add_movies(sqlite_session, n=3)
+    stored = (await sqlite_session.execute(select(Movie.vector).where(Movie.id == ids[1]))).scalar_one()
+    assert isinstance(stored, np.ndarray)
+    assert np.array_equal(stored, vectors[1])
+
+async def test_insert_ignore_skips_existing_rows(sqlite_session):
+    user_id = uuid4()
+    for _ in range(2):
+        await sqlite_session.execute(insert_ignore(sqlite_session, User, [User.id]), [{"id": user_id}])
+    await sqlite_session.commit()
+    assert len((await sqlite_session.execute(select(User.id))).all()) == 1
+
+async def test_matches_exact_l2_search(sqlite_session, tmp_path):
+    ids, vectors = await add_movies(sqlite_session)
+    store = MemmapVectorStore(str(tmp_path), dim=DIM)
+    await store.load(sqlite_session)
+
+    query = vectors[0] + 0.01
+    hits = await store.nearest(query, sqlite_session, 5, exclude_ids=[ids[0]])
+    distances = np.linalg.norm(vectors - query, axis=1)
+    expected = [i for i in np.argsort(distances) if i != 0][:5]
+    assert [mid for mid, _ in hits] == [ids[i] for i in expected]
+    assert np.allclose([d for _, d in hits], distances[expected], atol=1e-3)
+    store.close()
+
+async def test_allowed_ids_and_cosine(sqlite_session, tmp_path):
+    ids, vectors = await add_movies(sqlite_session)
+    store = MemmapVectorStore(str(tmp_path), dim=DIM, metric="cosine")
+    await store.ensure_loaded(sqlite_session)
+
+    allowed = ids[50:60]
+    hits = store.search(vectors[55], 3, allowed=allowed)
+    assert hits[0][0] == ids[55]
+    assert hits[0][1] == pytest.approx(0.0, abs=1e-5)
+    assert {mid for mid, _ in hits} <= set(allowed)
+    assert store.search(vectors[55], 3, allowed=[]) == []
+    store.close()
+
+async def test_add_grows_the_mapped_file(sqlite_session, tmp_path):
+    ids, vectors = await add_movies(sqlite_session, n=16)
+    store = MemmapVectorStore(str(tmp_path), dim=DIM)
+    await store.load(sqlite_session)
+
+    new_ids = [uuid4() for _ in range(20)]
+    new_vectors = np.random.default_rng(3).standard_normal((20, DIM)).astype(np.float32)
+    for mid, vector in zip(new_ids, new_vectors):
+        store.add(mid, vector)
+    store.add(ids[0], new_vectors[0])
+
+    assert len(store) == 36
+    assert store.search(new_vectors[7], 1)[0][0] == new_ids[7]
+    assert np.array_equal(store.get_vectors([ids[0]])[0], new_vectors[0])
+    store.close()
+    assert not store.path.exists()
+
+async def test_load_removes_files_of_exited_processes(sqlite_session, tmp_path):
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    stale, live = tmp_path / f"movies-{exited.pid}.f32", tmp_path / f"movies-{os.getppid()}.f32"
+    stale.write_bytes(b"x")
+    live.write_bytes(b"x")
+
+    store = MemmapVectorStore(str(tmp_path), dim=DIM)
+    await store.load(sqlite_session)
+    assert not stale.exists()
+    assert live.exists() and store.path.exists()
+    store.close()